@@ -0,0 +1,147 @@
+"""Buffered download statistics.
+
+Counting a download with an ``UPDATE`` per request would add a database
+write to every read. Downloads are instead tallied in process memory and
+folded into ``FileVersion.download_count`` and ``last_accessed_at`` by a few
+bulk updates, issued by the API download that finds the buffer due. Signed
+downloads never query the database, so they leave that write to a background
+thread. Configured through ``settings.FILE_VERSION_ACCESS_STATS``:
+
+* ``FLUSH_INTERVAL`` - seconds after which buffered counts are written
+* ``MAX_PENDING`` - number of buffered versions that forces a write sooner
+
+Counts a process has not flushed yet are lost if it dies, which statistics
+can afford.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError, connections
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.db.models.functions import Greatest
+from django.dispatch import receiver
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+
+class AccessBuffer:
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, pk: int, accessed_at) -> bool:
+        """Count one access of ``pk``; returns whether the buffer is due for a flush."""
+        with self._lock:
+            entry = self._pending.get(pk)
+            if entry is None:
+                self._pending[pk] = [1, accessed_at]
+            else:
+                entry[0] += 1
+                entry[1] = accessed_at
+            return len(self._pending) >= self.max_pending or time.monotonic() - self._last_flush >= self.flush_interval
+
+    def drain(self) -> dict:
+        """Take the buffered ``{pk: [count, last_accessed_at]}`` and start a new interval."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        return pending
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_access_buffer() -> AccessBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = settings.FILE_VERSION_ACCESS_STATS
+                _buffer = AccessBuffer(config["FLUSH_INTERVAL"], config["MAX_PENDING"])
+    return _buffer
+
+
+def record_download(pk: int, flush: bool = True):
+    """Count a download of ``pk``.
+
+    Once the buffer is due it is written inline, or with ``flush=False`` by a
+    background thread, keeping the caller free of queries.
+    """
+    if get_access_buffer().record(pk, timezone.now()):
+        if flush:
+            flush_access_stats()
+        else:
+            _flush_in_background()
+
+
+def flush_access_stats() -> int:
+    """Write the buffered counts to the database; returns the number of versions updated."""
+    from .models import FileVersion
+
+    pending = sorted(get_access_buffer().drain().items())
+    updated = 0
+    try:
+        for start in range(0, len(pending), CHUNK_SIZE):
+            chunk = pending[start : start + CHUNK_SIZE]
+            updated += FileVersion.all_objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                download_count=F("download_count")
+                + Case(*(When(pk=pk, then=Value(count)) for pk, (count, _) in chunk), default=Value(0)),
+                # Other processes flush too, so a timestamp never moves backwards.
+                last_accessed_at=Greatest(
+                    "last_accessed_at",
+                    Case(
+                        *(When(pk=pk, then=Value(accessed_at)) for pk, (_, accessed_at) in chunk),
+                        output_field=DateTimeField(),
+                    ),
+                ),
+            )
+    except DatabaseError:
+        logger.warning("Dropped download statistics of %d file versions", len(pending), exc_info=True)
+    return updated
+
+
+_flusher = None
+
+
+def _flush_in_background():
+    global _flusher
+    with _buffer_lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_background_flush, name="access-stats-flush", daemon=True)
+        _flusher.start()
+
+
+def _background_flush():
+    try:
+        flush_access_stats()
+    finally:
+        # Connections are per thread, and this one's is not reused.
+        connections.close_all()
+
+
+def _flush_at_exit():
+    if _buffer is not None:
+        flush_access_stats()
+
+
+atexit.register(_flush_at_exit)
+
+
+@receiver(setting_changed)
+def _reset_buffer(setting, **kwargs):
+    global _buffer
+    if setting == "FILE_VERSION_ACCESS_STATS":
+        _buffer = None
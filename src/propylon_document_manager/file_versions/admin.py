@@ -1 +1,36 @@
 from django.contrib import admin
+
+from .models import FileVersion
+
+
+@admin.register(FileVersion)
+class FileVersionAdmin(admin.ModelAdmin):
+    """Versions ranked by downloads, most popular first.
+
+    Read-only: versions are created and deleted through the API, which keeps
+    storage usage, the change feed and stored files in step.
+    """
+
+    list_display = [
+        "file_name",
+        "path",
+        "version_number",
+        "created_by",
+        "download_count",
+        "last_accessed_at",
+        "storage_tier",
+    ]
+    list_filter = ["storage_tier"]
+    list_select_related = ["created_by"]
+    ordering = ["-download_count", "pk"]
+    search_fields = ["file_name", "path", "created_by__email"]
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
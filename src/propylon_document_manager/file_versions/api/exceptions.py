@@ -0,0 +1,14 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class StorageQuotaExceeded(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Storage quota exceeded."
+    default_code = "storage_quota_exceeded"
+
+
+class UploadNotOpen(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The upload is already being completed."
+    default_code = "upload_not_open"
@@ -0,0 +1,83 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets views negotiate ``text/event-stream``.
+
+    Streaming views write their events themselves; only responses built by
+    DRF, such as authentication errors, are rendered here, as one ``error``
+    event.
+    """
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n".encode(self.charset)
+
+
+def _is_records(value) -> bool:
+    if not isinstance(value, list) or not value or not isinstance(value[0], dict):
+        return False
+    keys = list(value[0])
+    return all(isinstance(item, dict) and list(item) == keys for item in value)
+
+
+def to_columns(data):
+    """Turn lists of records sharing the same keys into ``{"columns", "rows"}``.
+
+    A top-level list is converted, as are the lists held directly by a
+    top-level object, such as ``results`` of a page. Empty lists stay ``[]``.
+    """
+    if _is_records(data):
+        return {"columns": list(data[0]), "rows": [list(record.values()) for record in data]}
+    if isinstance(data, dict):
+        return {key: to_columns(value) if _is_records(value) else value for key, value in data.items()}
+    return data
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """JSON that names the fields of listed records once instead of per row.
+
+    ``{"results": [{"id": 1, "path": "a"}, {"id": 2, "path": "b"}]}`` is sent
+    as ``{"results": {"columns": ["id", "path"], "rows": [[1, "a"], [2, "b"]]}}``,
+    which is smaller and quicker to parse for bulk listing clients.
+    """
+
+    media_type = "application/vnd.propylon.columnar+json"
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columns(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack encoding of responses; offered when ``msgpack`` is installed."""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
+
+
+# Renderers of the listing endpoints: the defaults plus the compact encodings available.
+LISTING_RENDERER_CLASSES = [
+    *api_settings.DEFAULT_RENDERER_CLASSES,
+    ColumnarJSONRenderer,
+    *([MessagePackRenderer] if msgpack is not None else []),
+]
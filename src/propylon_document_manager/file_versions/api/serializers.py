@@ -1,15 +1,41 @@
 import re
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
-from rest_framework import serializers
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
 
-from ..models import FileVersion
+from ..models import FileVersion, FileVersionChange, MultipartUpload, MultipartUploadPart
+from .exceptions import StorageQuotaExceeded
 
 AuthUser = get_user_model()
 
 
+def validate_document_path(value: str) -> str:
+    if "\x00" in value:
+        raise serializers.ValidationError("Path cannot contain null byte")
+
+    if value.startswith("/"):
+        raise serializers.ValidationError("Path cannot start with /")
+
+    if re.search(r'[\\:\*\?"<>|]', value):
+        raise serializers.ValidationError(
+            'Path contains forbidden characters: \\ : * ? " < > |'
+        )
+
+    if len(value) > 255:
+        raise serializers.ValidationError("Path exceeds 255 characters")
+
+    if not re.match(r"^[\w\-./]+$", value):
+        raise serializers.ValidationError(
+            "Path may only contain letters, digits, underscore (_), hyphen (-), forward-slash (/),or dot"
+        )
+
+    return value
+
+
 class FileVersionSerializer(serializers.ModelSerializer):
     upload = serializers.FileField(write_only=True, required=True)
 
@@ -23,6 +49,7 @@ class FileVersionSerializer(serializers.ModelSerializer):
             "file_size",
             "mime_type",
             "content_hash",
+            "content_digest",
             "created_at",
             "created_by_id",
             "upload",
@@ -34,54 +61,28 @@ class FileVersionSerializer(serializers.ModelSerializer):
             "file_size",
             "mime_type",
             "content_hash",
+            "content_digest",
             "created_at",
             "created_by_id",
         ]
         write_only_fields = ["upload"]
 
     def validate_path(self, value: str) -> str:
-        if "\x00" in value:
-            raise serializers.ValidationError("Path cannot contain null byte")
-
-        if value.startswith("/"):
-            raise serializers.ValidationError("Path cannot start with /")
-
-        if re.search(r'[\\:\*\?"<>|]', value):
-            raise serializers.ValidationError(
-                'Path contains forbidden characters: \\ : * ? " < > |'
-            )
-
-        if len(value) > 255:
-            raise serializers.ValidationError("Path exceeds 255 characters")
-
-        if not re.match(r"^[\w\-./]+$", value):
-            raise serializers.ValidationError(
-                "Path may only contain letters, digits, underscore (_), hyphen (-), forward-slash (/),or dot"
-            )
+        return validate_document_path(value)
 
+    def validate_upload(self, value):
+        if not self.context["request"].user.storage_quota_allows(value.size):
+            raise StorageQuotaExceeded()
         return value
 
     def create(self, validated_data: dict):
         upload = validated_data.pop("upload")
-        user = self.context["request"].user
-        name = upload.name
-        with transaction.atomic():
-            last = (
-                FileVersion.objects.select_for_update()
-                .filter(file_name=name, created_by=user)
-                .order_by("-version_number")
-                .first()
-            )
-            next_version = last.version_number + 1 if last else 1
-
-            instance = FileVersion.objects.create(
-                file_name=name,
-                version_number=next_version,
-                created_by=user,
-                file=upload,
-                path=validated_data.get("path"),
-            )
-        return instance
+        return FileVersion.objects.create_next_version(
+            user=self.context["request"].user,
+            path=validated_data.get("path"),
+            file_name=upload.name,
+            file=upload,
+        )
 
     def perform_destroy(self, instance):
         if instance.created_by != self.request.user:
@@ -89,6 +90,237 @@ class FileVersionSerializer(serializers.ModelSerializer):
         instance.delete()
 
 
+class FileVersionReadSerializer:
+    """Read-only fast path producing ``FileVersionSerializer`` output.
+
+    Representations are built straight from ``values_list`` rows, skipping
+    model instantiation and per-field serializer dispatch. The output must
+    stay identical to ``FileVersionSerializer(instance).data``.
+    """
+
+    fields = [
+        field
+        for field in FileVersionSerializer.Meta.fields
+        if field not in FileVersionSerializer.Meta.write_only_fields
+    ]
+
+    def __init__(self, fields: list[str] | None = None, exclude: list[str] | None = None):
+        for name, selected in (("fields", fields), ("exclude", exclude)):
+            unknown = sorted(set(selected or []) - set(self.fields))
+            if unknown:
+                raise serializers.ValidationError({name: [f"Unknown field(s): {', '.join(unknown)}"]})
+
+        # Only the selected columns are queried; output keeps the canonical order.
+        self.columns = [
+            field
+            for field in self.fields
+            if (not fields or field in fields) and field not in (exclude or [])
+        ]
+        if not self.columns:
+            raise serializers.ValidationError({"fields": ["At least one field must be selected"]})
+        self._created_at = self.columns.index("created_at") if "created_at" in self.columns else None
+        self.format_datetime = self._datetime_formatter()
+
+    @staticmethod
+    def _datetime_formatter():
+        if api_settings.DATETIME_FORMAT is None or api_settings.DATETIME_FORMAT.lower() != ISO_8601:
+            return serializers.DateTimeField().to_representation
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+        def format_datetime(value):
+            value = value.astimezone(tz).isoformat() if tz else value.isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return format_datetime
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def to_representation(self, row: tuple) -> dict:
+        data = dict(zip(self.columns, row))
+        if self._created_at is not None:
+            data["created_at"] = self.format_datetime(row[self._created_at])
+        return data
+
+    def many(self, rows) -> list[dict]:
+        return [self.to_representation(row) for row in rows]
+
+
+class FileVersionTargetSerializer(serializers.Serializer):
+    """The document a new version is stored under."""
+
+    path = serializers.CharField(help_text="Document path")
+    file_name = serializers.RegexField(
+        r"^[^/\\\x00]{1,255}$", help_text="Document file name"
+    )
+
+    def validate_path(self, value: str) -> str:
+        return validate_document_path(value)
+
+
+class FileVersionPathSerializer(serializers.Serializer):
+    path = serializers.CharField(help_text="Folder whose versions, including those in subfolders, are deleted")
+
+    def validate_path(self, value: str) -> str:
+        return validate_document_path(value.rstrip("/"))
+
+
+class FileVersionPreflightSerializer(FileVersionTargetSerializer):
+    content_digest = serializers.RegexField(
+        r"^[0-9a-f]{64}$", help_text="Lowercase hex SHA-256 of the file contents"
+    )
+    file_size = serializers.IntegerField(min_value=0, help_text="File size in bytes")
+
+
+class FileVersionThumbnailQuerySerializer(serializers.Serializer):
+    size = serializers.IntegerField(
+        help_text="Edge of the bounding box in pixels, one of FILE_VERSION_THUMBNAILS['SIZES']"
+    )
+
+    def validate_size(self, value: int) -> int:
+        sizes = settings.FILE_VERSION_THUMBNAILS["SIZES"]
+        if value not in sizes:
+            raise serializers.ValidationError(
+                f"Must be one of {', '.join(str(size) for size in sizes)}"
+            )
+        return value
+
+
+class FileVersionHistoryQuerySerializer(serializers.Serializer):
+    path = serializers.CharField(help_text="Document path")
+    file_name = serializers.CharField(help_text="Document file name")
+    from_version = serializers.IntegerField(
+        required=False, min_value=1, help_text="First version number to return"
+    )
+    to_version = serializers.IntegerField(
+        required=False, min_value=1, help_text="Last version number to return"
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=10000,
+        default=1000,
+        help_text="Maximum number of versions to return",
+    )
+
+
+class FileVersionPopularQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=100,
+        default=10,
+        help_text="Number of versions to return",
+    )
+
+
+class FileVersionSignedUrlQuerySerializer(serializers.Serializer):
+    expires_in = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Seconds the URL stays valid; defaults to FILE_VERSION_SIGNED_URLS['MAX_AGE']",
+    )
+
+    def validate_expires_in(self, value: int) -> int:
+        limit = settings.FILE_VERSION_SIGNED_URLS["MAX_AGE_LIMIT"]
+        if value > limit:
+            raise serializers.ValidationError(f"Ensure this value is less than or equal to {limit}.")
+        return value
+
+
+class FileVersionReferenceSerializer(serializers.Serializer):
+    path = serializers.CharField(help_text="Document path")
+    file_name = serializers.CharField(help_text="Document file name")
+    revision = serializers.IntegerField(
+        required=False, min_value=1, help_text="Version number; the latest when omitted"
+    )
+
+
+class FileVersionLookupSerializer(serializers.Serializer):
+    MAX_ITEMS = 10000
+
+    documents = FileVersionReferenceSerializer(
+        many=True, required=False, max_length=MAX_ITEMS, help_text="Documents to resolve"
+    )
+    hashes = serializers.ListField(
+        child=serializers.RegexField(r"^[0-9a-fA-F]{64}$"),
+        required=False,
+        max_length=MAX_ITEMS,
+        help_text="Content hashes to resolve",
+    )
+
+    def validate_hashes(self, value: list[str]) -> list[str]:
+        return [content_hash.lower() for content_hash in value]
+
+    def validate(self, attrs: dict) -> dict:
+        if not attrs.get("documents") and not attrs.get("hashes"):
+            raise serializers.ValidationError("Provide documents or hashes to look up")
+        return attrs
+
+
+class FileVersionChangesQuerySerializer(serializers.Serializer):
+    cursor = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        default=0,
+        help_text="Id of the last change already applied; 0 replays the whole log",
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=1000,
+        default=100,
+        help_text="Maximum number of changes to return",
+    )
+
+
+class FileVersionChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FileVersionChange
+        fields = [
+            "id",
+            "kind",
+            "file_version_id",
+            "path",
+            "file_name",
+            "version_number",
+            "occurred_at",
+        ]
+        read_only_fields = fields
+
+
+class MultipartUploadPartSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MultipartUploadPart
+        fields = ["part_number", "size", "sha256"]
+
+
+class MultipartUploadSerializer(serializers.ModelSerializer):
+    file_name = serializers.RegexField(
+        r"^[^/\\\x00]{1,255}$", help_text="Document file name"
+    )
+    parts = MultipartUploadPartSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MultipartUpload
+        fields = ["id", "path", "file_name", "state", "created_at", "parts"]
+        read_only_fields = ["id", "state", "created_at"]
+
+    def validate_path(self, value: str) -> str:
+        return validate_document_path(value)
+
+
+class MultipartUploadCompleteSerializer(serializers.Serializer):
+    parts = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        help_text="Part numbers to join, in order; defaults to every received part by number",
+    )
+
+
 class UserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(
         validators=[
@@ -1,27 +1,135 @@
+import io
+from datetime import datetime, timezone
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import FileResponse, Http404
-from django.shortcuts import get_object_or_404
+from django.db.models import Count, F, Max, Min, Sum, Window
+from django.http import FileResponse, Http404, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
-from rest_framework import permissions, viewsets
+from rest_framework import permissions, status, viewsets
 from rest_framework.authentication import SessionAuthentication, TokenAuthentication
 from rest_framework.decorators import action
-from rest_framework.mixins import (
-    CreateModelMixin,
-    DestroyModelMixin,
-    ListModelMixin,
-    RetrieveModelMixin,
-)
-from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.mixins import CreateModelMixin, DestroyModelMixin, ListModelMixin, RetrieveModelMixin
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 
-from ..models import FileVersion
-from .serializers import FileVersionSerializer, UserSerializer
+from ..blobcache import get_blob_cache
+from ..bloom import might_have_content
+from ..changefeed import event_stream
+from ..db import immediate_atomic, pin_to_primary
+from ..lookup import exact_versions, latest_versions, versions_by_hash
+from ..models import FileVersion, FileVersionChange, MultipartUpload, MultipartUploadPart, StorageUsage
+from ..multipart import assemble, discard, store_part
+from ..signedurls import sign_download
+from ..thumbnails import get_thumbnail, thumbnail_content_type
+from ..uploadhandlers import HashedUploadedFile, HashingUploadHandler
+from .exceptions import StorageQuotaExceeded, UploadNotOpen
+from .renderers import LISTING_RENDERER_CLASSES, EventStreamRenderer
+from .serializers import (
+    FileVersionChangeSerializer,
+    FileVersionChangesQuerySerializer,
+    FileVersionHistoryQuerySerializer,
+    FileVersionLookupSerializer,
+    FileVersionPathSerializer,
+    FileVersionPopularQuerySerializer,
+    FileVersionPreflightSerializer,
+    FileVersionReadSerializer,
+    FileVersionSerializer,
+    FileVersionSignedUrlQuerySerializer,
+    FileVersionTargetSerializer,
+    FileVersionThumbnailQuerySerializer,
+    MultipartUploadCompleteSerializer,
+    MultipartUploadPartSerializer,
+    MultipartUploadSerializer,
+    UserSerializer,
+)
 
 User = get_user_model()
 
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        description="Comma-separated fields to include; only these columns are queried",
+        required=False,
+        type=str,
+        location="query",
+    ),
+    OpenApiParameter(
+        name="exclude",
+        description="Comma-separated fields to leave out",
+        required=False,
+        type=str,
+        location="query",
+    ),
+]
+
+CONTENT_SHA256_PARAMETER = OpenApiParameter(
+    name="X-Content-SHA256",
+    description="Hex SHA-256 of the body; the upload is rejected if it does not match",
+    required=False,
+    type=str,
+    location="header",
+)
+
+
+def receive_body(request, file_name: str) -> HashedUploadedFile:
+    """Spool the raw request body, checked against an optional ``X-Content-SHA256``.
+
+    The body is streamed through the upload handler in chunks; it never goes
+    through a parser and is never held in memory as a whole.
+    """
+    content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    handler = HashingUploadHandler(request._request)
+    handler.new_file("upload", file_name, request.content_type or "application/octet-stream", content_length)
+    received = 0
+    try:
+        while chunk := request._request.read(handler.chunk_size):
+            handler.receive_data_chunk(chunk, received)
+            received += len(chunk)
+        upload = handler.file_complete(received)
+    except Exception:
+        handler.file.close()
+        raise
+
+    try:
+        if not received:
+            raise ValidationError({"upload": ["The submitted file is empty."]})
+        expected = request.headers.get("X-Content-SHA256")
+        if expected and expected.lower() != upload.hasher.hexdigest():
+            raise ValidationError({"X-Content-SHA256": ["Does not match the uploaded content."]})
+    except ValidationError:
+        upload.close()
+        raise
+    return upload
+
+
+class ReplicaReadMixin:
+    """Lets safe requests read file versions from a database replica.
+
+    Writes pin the user to the primary for ``DATABASE_REPLICA_STICKINESS``
+    seconds so that they read their own changes.
+    """
+
+    def get_replica_hints(self) -> dict:
+        return {
+            "replica_ok": self.request.method in permissions.SAFE_METHODS,
+            "user": self.request.user,
+        }
+
+    def get_file_versions(self):
+        return FileVersion.objects.db_manager(hints=self.get_replica_hints()).filter(
+            created_by=self.request.user
+        )
+
 
 class FileVersionViewSet(
+    ReplicaReadMixin,
     CreateModelMixin,
     ListModelMixin,
     RetrieveModelMixin,
@@ -33,20 +141,414 @@ class FileVersionViewSet(
     authentication_classes = [SessionAuthentication, TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    renderer_classes = LISTING_RENDERER_CLASSES
 
     def get_queryset(self):
-        return FileVersion.objects.filter(created_by=self.request.user)
+        return self.get_file_versions()
+
+    def get_reader(self) -> FileVersionReadSerializer:
+        """Fast read serializer limited by the ``fields``/``exclude`` query parameters."""
+
+        def field_list(name):
+            value = self.request.query_params.get(name)
+            return [field.strip() for field in value.split(",") if field.strip()] if value else None
+
+        return FileVersionReadSerializer(
+            fields=field_list("fields"), exclude=field_list("exclude")
+        )
+
+    def initialize_request(self, request, *args, **kwargs):
+        drf_request = super().initialize_request(request, *args, **kwargs)
+        if self.action == "create":
+            # Installed before authentication, whose CSRF check may already parse
+            # the body; the handler looks the user's quota up once a file arrives.
+            request.upload_handlers = [HashingUploadHandler(request)]
+        return drf_request
+
+    @extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS)
+    def list(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        rows = reader.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.many(page))
+        return Response(reader.many(rows))
+
+    @extend_schema(parameters=SPARSE_FIELDSET_PARAMETERS)
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        rows = reader.rows(self.filter_queryset(self.get_queryset()))
+        return Response(reader.to_representation(get_object_or_404(rows, pk=kwargs["pk"])))
+
+    @extend_schema(
+        summary="Version history of a document",
+        parameters=[FileVersionHistoryQuerySerializer, *SPARSE_FIELDSET_PARAMETERS],
+        responses={200: OpenApiTypes.OBJECT, 404: OpenApiResponse(description="File not found")},
+    )
+    @action(detail=False, methods=["get"])
+    def history(self, request):
+        params = FileVersionHistoryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        reader = self.get_reader()
+
+        # The document's summary rides along on every row as window aggregates
+        # over the whole history; the range is applied on top of them, so one
+        # query on the (created_by, path, file_name, version_number) index
+        # serves the page, the summary and the next cursor.
+        document = self.get_queryset().filter(path=query["path"], file_name=query["file_name"])
+        summary_fields = {
+            "count": Window(Count("id")),
+            "total_bytes": Window(Sum("file_size")),
+            "first_version": Window(Min("version_number")),
+            "latest_version": Window(Max("version_number")),
+            "first_created_at": Window(Min("created_at")),
+            "last_created_at": Window(Max("created_at")),
+        }
+        # The row's own version number as a window expression, so that filters
+        # on it apply after the aggregates instead of narrowing them.
+        versions = document.annotate(
+            **summary_fields, row_version=Window(Max("version_number"), partition_by=F("pk"))
+        ).order_by("version_number")
+        if "from_version" in query:
+            versions = versions.filter(row_version__gte=query["from_version"])
+        if "to_version" in query:
+            versions = versions.filter(row_version__lte=query["to_version"])
+        rows = list(versions.values_list(*reader.columns, "row_version", *summary_fields)[: query["limit"] + 1])
+        width = len(reader.columns)
+        summary_start = width + 1
+
+        if rows:
+            summary = dict(zip(summary_fields, rows[0][summary_start:]))
+        else:
+            # An empty range still reports the document, unless it does not exist.
+            summary = document.aggregate(**{name: window.source_expression for name, window in summary_fields.items()})
+            if not summary["count"]:
+                raise Http404("File not found")
+        next_from_version = None
+        if len(rows) > query["limit"]:
+            next_from_version = rows[query["limit"]][width]
+            rows = rows[: query["limit"]]
+        rows = [row[:width] for row in rows]
+
+        for key in ("first_created_at", "last_created_at"):
+            summary[key] = reader.format_datetime(summary[key])
+        return Response(
+            {
+                "path": query["path"],
+                "file_name": query["file_name"],
+                "summary": summary,
+                "next_from_version": next_from_version,
+                "versions": reader.many(rows),
+            }
+        )
+
+    @extend_schema(
+        summary="Resolve many documents or content hashes in one call",
+        parameters=SPARSE_FIELDSET_PARAMETERS,
+        request=FileVersionLookupSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=["post"], parser_classes=[JSONParser])
+    def lookup(self, request):
+        params = FileVersionLookupSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        documents = params.validated_data.get("documents", [])
+        hashes = params.validated_data.get("hashes", [])
+        reader = self.get_reader()
+        # A lookup only reads, so it may use a replica despite being a POST.
+        versions = FileVersion.objects.db_manager(
+            hints={**self.get_replica_hints(), "replica_ok": True}
+        ).filter(created_by=request.user)
+
+        latest = latest_versions(
+            versions,
+            [(ref["path"], ref["file_name"]) for ref in documents if "revision" not in ref],
+            reader.columns,
+        )
+        exact = exact_versions(
+            versions,
+            [(ref["path"], ref["file_name"], ref["revision"]) for ref in documents if "revision" in ref],
+            reader.columns,
+        )
+        by_hash = versions_by_hash(versions, hashes, reader.columns)
+
+        def represent(row):
+            return reader.to_representation(row) if row is not None else None
+
+        results = {"documents": [], "hashes": []}
+        for ref in documents:
+            if "revision" in ref:
+                row = exact.get((ref["path"], ref["file_name"], ref["revision"]))
+            else:
+                row = latest.get((ref["path"], ref["file_name"]))
+            results["documents"].append({**ref, "file_version": represent(row)})
+        for content_hash in hashes:
+            results["hashes"].append(
+                {"content_hash": content_hash, "file_version": represent(by_hash.get(content_hash))}
+            )
+        return Response(results)
+
+    @extend_schema(
+        summary="Most downloaded versions",
+        description="Download statistics are written in batches, so the latest downloads may not be counted yet.",
+        parameters=[FileVersionPopularQuerySerializer, *SPARSE_FIELDSET_PARAMETERS],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=["get"])
+    def popular(self, request):
+        params = FileVersionPopularQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        reader = self.get_reader()
+        columns = len(reader.columns)
+        rows = (
+            self.get_queryset()
+            .filter(download_count__gt=0)
+            .order_by("-download_count", "pk")
+            .values_list(*reader.columns, "download_count", "last_accessed_at")[: params.validated_data["limit"]]
+        )
+        return Response(
+            {
+                "results": [
+                    {
+                        "file_version": reader.to_representation(row[:columns]),
+                        "download_count": row[columns],
+                        "last_accessed_at": reader.format_datetime(row[columns + 1]),
+                    }
+                    for row in rows
+                ]
+            }
+        )
+
+    @extend_schema(
+        summary="Version changes after a cursor",
+        parameters=[FileVersionChangesQuerySerializer],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=["get"])
+    def changes(self, request):
+        params = FileVersionChangesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        cursor, limit = params.validated_data["cursor"], params.validated_data["limit"]
+
+        changes = list(
+            FileVersionChange.objects.db_manager(hints=self.get_replica_hints())
+            .since(request.user.pk, cursor)[: limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        return Response(
+            {
+                "changes": FileVersionChangeSerializer(changes, many=True).data,
+                "cursor": changes[-1].pk if changes else cursor,
+                "has_more": has_more,
+            }
+        )
+
+    @extend_schema(
+        summary="Live stream of version changes (Server-Sent Events)",
+        parameters=[
+            OpenApiParameter(
+                name="cursor",
+                description="Id of the last change already applied; Last-Event-ID takes precedence",
+                required=False,
+                type=int,
+                location="query",
+            )
+        ],
+        responses={200: OpenApiResponse(description="text/event-stream of created and deleted events")},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="changes/stream",
+        renderer_classes=[EventStreamRenderer],
+    )
+    def changes_stream(self, request):
+        raw_cursor = request.headers.get("Last-Event-ID") or request.query_params.get("cursor") or 0
+        params = FileVersionChangesQuerySerializer(data={"cursor": raw_cursor})
+        params.is_valid(raise_exception=True)
+
+        def serialize(changes):
+            return FileVersionChangeSerializer(changes, many=True).data
+
+        response = StreamingHttpResponse(
+            event_stream(
+                request.user.pk,
+                params.validated_data["cursor"],
+                serialize,
+                self.get_replica_hints(),
+            ),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Keeps nginx from buffering the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @extend_schema(
+        summary="Pre-signed download URL of a version",
+        description=(
+            "The URL needs no credentials and is served without database queries until it expires. "
+            "It cannot be revoked, so keep its lifetime short."
+        ),
+        parameters=[FileVersionSignedUrlQuerySerializer],
+        responses={200: OpenApiTypes.OBJECT, 404: OpenApiResponse(description="File not found")},
+    )
+    @action(detail=True, methods=["get"])
+    def signed_url(self, request, pk=None):
+        params = FileVersionSignedUrlQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        file_version = get_object_or_404(
+            self.get_queryset().only("file", "file_name", "mime_type", "content_hash"), pk=pk
+        )
+        expires_in = params.validated_data.get("expires_in", settings.FILE_VERSION_SIGNED_URLS["MAX_AGE"])
+        token, expires_at = sign_download(file_version, expires_in)
+        url = reverse("signed-download", kwargs={"token": token, "file_name": file_version.file_name})
+        return Response(
+            {
+                "url": request.build_absolute_uri(url),
+                "expires_at": self.get_reader().format_datetime(datetime.fromtimestamp(expires_at, timezone.utc)),
+            }
+        )
+
+    @extend_schema(
+        summary="Delete every version under a folder",
+        request=FileVersionPathSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=["post"], parser_classes=[JSONParser, FormParser])
+    def delete_prefix(self, request):
+        params = FileVersionPathSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        path = params.validated_data["path"]
+        # One UPDATE of the markers; purge_deleted_file_versions releases the
+        # usage, logs the deletions and removes rows and files later.
+        deleted = FileVersion.objects.filter(created_by=request.user).under_path(path).soft_delete()
+        pin_to_primary(request.user)
+        return Response({"path": path, "deleted": deleted})
+
+    @extend_schema(
+        summary="Create a version from content the server already stores",
+        request=FileVersionPreflightSerializer,
+        responses={
+            201: OpenApiResponse(description="Version created by reference, no upload needed"),
+            200: OpenApiResponse(description="Content unknown, upload the file"),
+        },
+    )
+    @action(detail=False, methods=["post"], parser_classes=[JSONParser, FormParser])
+    def preflight(self, request):
+        params = FileVersionPreflightSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        user = request.user
+
+        # Only the user's own blobs are candidates, so a digest alone never
+        # grants access to somebody else's content.
+        stored = None
+        if might_have_content(user.pk, query["content_digest"]):
+            stored = (
+                FileVersion.objects.filter(
+                    created_by=user,
+                    content_digest=query["content_digest"],
+                    file_size=query["file_size"],
+                )
+                .values("file", "content_digest", "file_size", "mime_type", "storage_tier")
+                .first()
+            )
+        if stored is None:
+            return Response({"upload_required": True})
+        if not user.storage_quota_allows(query["file_size"]):
+            raise StorageQuotaExceeded()
+
+        instance = FileVersion.objects.create_next_version(
+            user=user,
+            path=query["path"],
+            file_name=query["file_name"],
+            **stored,
+        )
+        pin_to_primary(user)
+        reader = FileVersionReadSerializer()
+        row = reader.rows(FileVersion.objects.filter(pk=instance.pk)).get()
+        return Response(
+            {"upload_required": False, "file_version": reader.to_representation(row)},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(
+        summary="Thumbnail of an image or PDF version",
+        parameters=[FileVersionThumbnailQuerySerializer],
+        responses={
+            200: OpenApiResponse(response=OpenApiTypes.BINARY, description="Thumbnail image"),
+            304: OpenApiResponse(description="The cached thumbnail is current"),
+            404: OpenApiResponse(description="File not found or no preview available"),
+        },
+    )
+    @action(detail=True, methods=["get"])
+    def thumbnail(self, request, pk=None):
+        params = FileVersionThumbnailQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        size = params.validated_data["size"]
+        file_version = get_object_or_404(
+            self.get_queryset().only("file", "mime_type", "content_digest", "content_hash"), pk=pk
+        )
+
+        # Renditions are derived from immutable content, so they can be cached for good.
+        etag = f'"{file_version.content_digest or file_version.content_hash}-{size}"'
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            name = get_thumbnail(file_version, size)
+            if name is None:
+                raise Http404("No preview available")
+            response = FileResponse(
+                file_version.file.storage.open(name, "rb"), content_type=thumbnail_content_type()
+            )
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, max_age=365 * 24 * 60 * 60, immutable=True)
+        return response
 
     def perform_create(self, serializer):
         serializer.save()
+        pin_to_primary(self.request.user)
 
+    def perform_destroy(self, instance):
+        # Unlike a whole folder, a single deletion is recorded straight away.
+        if FileVersion.objects.filter(pk=instance.pk).soft_delete():
+            FileVersion.all_objects.filter(pk=instance.pk).record_deletions()
+        pin_to_primary(self.request.user)
 
-class FileDownloadViewSet(viewsets.GenericViewSet):
+
+class FileDownloadViewSet(ReplicaReadMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.IsAuthenticated]
     authentication_classes = [SessionAuthentication, TokenAuthentication]
 
     def get_queryset(self):
-        return FileVersion.objects.filter(created_by=self.request.user)
+        return self.get_file_versions()
+
+    def file_response(self, file_version: FileVersion) -> FileResponse:
+        """Stream a version's contents, from the hot-blob cache when possible."""
+        file_version.record_access()
+        blob_cache = get_blob_cache()
+        if blob_cache is not None:
+
+            def load() -> bytes:
+                with file_version.file.open("rb") as handle:
+                    return handle.read()
+
+            # Keyed by the bytes alone, so identical revisions share one entry.
+            data = blob_cache.get_or_load(
+                file_version.content_digest or file_version.content_hash, file_version.file_size, load
+            )
+            if data is not None:
+                return FileResponse(
+                    io.BytesIO(data),
+                    as_attachment=True,
+                    filename=file_version.file_name,
+                )
+        return FileResponse(
+            file_version.file, as_attachment=True, filename=file_version.file_name
+        )
 
     @extend_schema(
         summary="Download file by ID",
@@ -59,9 +561,7 @@ class FileDownloadViewSet(viewsets.GenericViewSet):
     )
     def retrieve(self, request, pk=None):
         file_version = get_object_or_404(self.get_queryset(), pk=pk)
-        return FileResponse(
-            file_version.file, as_attachment=True, filename=file_version.file_name
-        )
+        return self.file_response(file_version)
 
     @extend_schema(
         summary="Download file by path and name",
@@ -96,9 +596,37 @@ class FileDownloadViewSet(viewsets.GenericViewSet):
         file_version = qs.first()
         if not file_version:
             raise Http404("File not found")
-        return FileResponse(
-            file_version.file, as_attachment=True, filename=file_version.file_name
-        )
+        return self.file_response(file_version)
+
+    @extend_schema(
+        summary="Upload the next version of a file from the raw request body",
+        parameters=[CONTENT_SHA256_PARAMETER],
+        request={"application/octet-stream": OpenApiTypes.BINARY},
+        responses={
+            201: OpenApiTypes.OBJECT,
+            400: OpenApiResponse(description="Invalid path, name or checksum"),
+            413: OpenApiResponse(description="Storage quota exceeded"),
+        },
+    )
+    @download_by_url.mapping.put
+    def upload_by_url(self, request, path=None, filename=None):
+        target = FileVersionTargetSerializer(data={"path": path, "file_name": filename})
+        target.is_valid(raise_exception=True)
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        if not request.user.storage_quota_allows(content_length):
+            raise StorageQuotaExceeded()
+
+        with receive_body(request, filename) as upload:
+            instance = FileVersion.objects.create_next_version(
+                user=request.user,
+                path=target.validated_data["path"],
+                file_name=target.validated_data["file_name"],
+                file=upload,
+            )
+        pin_to_primary(request.user)
+        reader = FileVersionReadSerializer()
+        row = reader.rows(FileVersion.objects.filter(pk=instance.pk)).get()
+        return Response(reader.to_representation(row), status=status.HTTP_201_CREATED)
 
     @extend_schema(
         summary="Download file by content hash",
@@ -114,11 +642,131 @@ class FileDownloadViewSet(viewsets.GenericViewSet):
         file_version = self.get_queryset().filter(content_hash=hash).first()
         if not file_version:
             raise Http404("File not found")
-        return FileResponse(
-            file_version.file, as_attachment=True, filename=file_version.file_name
+        return self.file_response(file_version)
+
+    @extend_schema(
+        summary="Download cache statistics",
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="cache-stats",
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def cache_stats(self, request):
+        blob_cache = get_blob_cache()
+        return Response(
+            {"enabled": blob_cache is not None, **(blob_cache.stats() if blob_cache else {})}
         )
 
 
+class MultipartUploadViewSet(CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, viewsets.GenericViewSet):
+    """Uploads of large files as parts sent in parallel.
+
+    Create an upload, ``PUT`` its parts in any order and over as many
+    connections as useful, then ``complete`` it into the next version of the
+    document. Deleting an upload aborts it.
+    """
+
+    serializer_class = MultipartUploadSerializer
+    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, FormParser]
+
+    def get_queryset(self):
+        return MultipartUpload.objects.filter(user=self.request.user).prefetch_related("parts")
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        upload_id = instance.pk
+        instance.delete()
+        discard(upload_id)
+
+    @extend_schema(
+        summary="Upload one part",
+        parameters=[CONTENT_SHA256_PARAMETER],
+        request={"application/octet-stream": OpenApiTypes.BINARY},
+        responses={
+            200: MultipartUploadPartSerializer,
+            409: OpenApiResponse(description="The upload is being completed"),
+            413: OpenApiResponse(description="Storage quota exceeded"),
+        },
+    )
+    @action(detail=True, methods=["put"], url_path=r"parts/(?P<part_number>[0-9]+)")
+    def part(self, request, pk=None, part_number=None):
+        upload = self.get_object()
+        part_number = int(part_number)
+        max_parts = settings.FILE_VERSION_MULTIPART["MAX_PARTS"]
+        if not 1 <= part_number <= max_parts:
+            raise ValidationError({"part_number": [f"Must be between 1 and {max_parts}."]})
+        if upload.state != MultipartUpload.OPEN:
+            raise UploadNotOpen()
+        received = sum(part.size for part in upload.parts.all() if part.part_number != part_number)
+        if not request.user.storage_quota_allows(received + int(request.META.get("CONTENT_LENGTH") or 0)):
+            raise StorageQuotaExceeded()
+
+        with receive_body(request, upload.file_name) as spooled, immediate_atomic():
+            # Checked again with the upload locked, as complete or abort may have
+            # claimed it while the part was being received.
+            if not MultipartUpload.objects.select_for_update().filter(pk=upload.pk, state=MultipartUpload.OPEN):
+                raise UploadNotOpen()
+            store_part(upload.pk, part_number, spooled)
+            part, _ = MultipartUploadPart.objects.update_or_create(
+                upload=upload,
+                part_number=part_number,
+                defaults={"size": spooled.size, "sha256": spooled.hasher.hexdigest()},
+            )
+        return Response(MultipartUploadPartSerializer(part).data)
+
+    @extend_schema(
+        summary="Join the parts into the next version of the document",
+        request=MultipartUploadCompleteSerializer,
+        responses={
+            201: OpenApiTypes.OBJECT,
+            409: OpenApiResponse(description="The upload is already being completed"),
+            413: OpenApiResponse(description="Storage quota exceeded"),
+        },
+    )
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        upload = self.get_object()
+        params = MultipartUploadCompleteSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+
+        # Claimed without holding a lock while the parts are joined. Parts are
+        # only read once claimed, so none can be added unnoticed meanwhile.
+        if not MultipartUpload.objects.filter(pk=upload.pk, state=MultipartUpload.OPEN).update(
+            state=MultipartUpload.COMPLETING
+        ):
+            raise UploadNotOpen()
+        try:
+            received = {part.part_number: part for part in MultipartUploadPart.objects.filter(upload=upload)}
+            part_numbers = params.validated_data.get("parts") or sorted(received)
+            if not part_numbers:
+                raise ValidationError({"parts": ["No parts have been uploaded."]})
+            missing = sorted(set(part_numbers) - set(received))
+            if missing:
+                raise ValidationError({"parts": [f"Not uploaded: {', '.join(map(str, missing))}."]})
+            if not request.user.storage_quota_allows(sum(received[number].size for number in part_numbers)):
+                raise StorageQuotaExceeded()
+
+            with assemble(upload, part_numbers) as assembled:
+                instance = FileVersion.objects.create_next_version(
+                    user=request.user, path=upload.path, file_name=upload.file_name, file=assembled
+                )
+        except Exception:
+            MultipartUpload.objects.filter(pk=upload.pk).update(state=MultipartUpload.OPEN)
+            raise
+        self.perform_destroy(upload)
+        pin_to_primary(request.user)
+        reader = FileVersionReadSerializer()
+        row = reader.rows(FileVersion.objects.filter(pk=instance.pk)).get()
+        return Response(reader.to_representation(row), status=status.HTTP_201_CREATED)
+
+
 class UserViewSet(CreateModelMixin, viewsets.GenericViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -135,4 +783,15 @@ class UserViewSet(CreateModelMixin, viewsets.GenericViewSet):
     @action(detail=False, methods=["get"], url_path="me")
     def me(self, request):
         serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        usage = list(
+            StorageUsage.objects.filter(user=request.user)
+            .order_by("prefix")
+            .values("prefix", "bytes_used", "version_count")
+        )
+        storage = {
+            "quota": request.user.get_storage_quota(),
+            "bytes_used": sum(prefix["bytes_used"] for prefix in usage),
+            "version_count": sum(prefix["version_count"] for prefix in usage),
+            "prefixes": usage,
+        }
+        return Response({**serializer.data, "storage": storage})
@@ -1,7 +1,25 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class FileVersionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "propylon_document_manager.file_versions"
     verbose_name = "File Versions"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import checks  # noqa: F401
+        from .db import configure_sqlite_connection
+
+        connection_created.connect(configure_sqlite_connection)
+
+        # Uploads are spooled here; Django's checks require the directory to exist.
+        if settings.FILE_UPLOAD_TEMP_DIR:
+            try:
+                os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+            except OSError:
+                pass
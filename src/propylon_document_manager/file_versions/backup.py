@@ -0,0 +1,227 @@
+"""Incremental backup archives of file version metadata and media.
+
+An archive is a (optionally gzipped) tar stream laid out so that it can be
+written and restored in a single sequential pass with constant memory:
+
+* ``media/<storage name>`` - the stored file of every backed up version
+* ``users.jsonl`` - the owners of the backed up versions
+* ``file_versions.jsonl`` - one ``FileVersion`` row per line, in ``id`` order
+* ``manifest.json`` - format version, watermark range and counts
+
+The watermark is the highest ``FileVersion.id`` contained in the archive;
+passing it back as ``since_id`` produces the next incremental archive.
+"""
+
+import io
+import json
+import tarfile
+import tempfile
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import FileVersion, FileVersionChange, StorageUsage, User
+
+FORMAT_VERSION = 1
+MEDIA_PREFIX = "media/"
+USERS_MEMBER = "users.jsonl"
+FILE_VERSIONS_MEMBER = "file_versions.jsonl"
+MANIFEST_MEMBER = "manifest.json"
+
+USER_FIELDS = ["id", "email", "name", "password", "is_active", "is_staff", "is_superuser", "date_joined"]
+FILE_VERSION_FIELDS = [
+    "id",
+    "file_name",
+    "version_number",
+    "path",
+    "file",
+    "file_size",
+    "mime_type",
+    "content_hash",
+    "content_digest",
+    "created_at",
+    "created_by_id",
+    "download_count",
+    "last_accessed_at",
+]
+# Not archived: only live versions are backed up, so ``deleted_at`` is always
+# empty and ``deletion_recorded`` unset, and restored media is written to the hot tier whatever
+# ``storage_tier`` the version had.
+
+
+def _tar_mode(archive_path: str, direction: str) -> str:
+    if direction == "r":
+        return "r|*"
+    if archive_path.endswith((".gz", ".tgz")):
+        return "w|gz"
+    return "w|"
+
+
+def _add_bytes(archive: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(timezone.now().timestamp())
+    archive.addfile(info, io.BytesIO(data))
+
+
+def _add_spooled(archive: tarfile.TarFile, name: str, spool):
+    info = tarfile.TarInfo(name)
+    info.size = spool.tell()
+    info.mtime = int(timezone.now().timestamp())
+    spool.seek(0)
+    archive.addfile(info, spool)
+
+
+def _dump_line(spool, row: dict):
+    spool.write(json.dumps(row, default=str).encode("utf-8") + b"\n")
+
+
+def create_backup(archive_path: str, since_id: int = 0) -> dict:
+    """Write every file version with an id above ``since_id`` to ``archive_path``.
+
+    Returns the manifest, whose ``to_id`` is the watermark for the next run.
+    """
+    storage = FileVersion._meta.get_field("file").storage
+    queryset = FileVersion.objects.filter(id__gt=since_id).order_by("id").values(*FILE_VERSION_FIELDS)
+    user_ids = set()
+    count = 0
+    total_bytes = 0
+    to_id = since_id
+    last_created_at = None
+
+    with (
+        tarfile.open(archive_path, _tar_mode(archive_path, "w")) as archive,
+        tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as rows,
+    ):
+        for row in queryset.iterator(chunk_size=2000):
+            with storage.open(row["file"], "rb") as handle:
+                info = tarfile.TarInfo(MEDIA_PREFIX + row["file"])
+                info.size = storage.size(row["file"])
+                info.mtime = int(row["created_at"].timestamp())
+                archive.addfile(info, handle)
+            _dump_line(rows, row)
+            user_ids.add(row["created_by_id"])
+            count += 1
+            total_bytes += row["file_size"]
+            to_id = row["id"]
+            last_created_at = row["created_at"]
+
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as users:
+            for user in User.objects.filter(id__in=user_ids).order_by("id").values(*USER_FIELDS):
+                _dump_line(users, user)
+            _add_spooled(archive, USERS_MEMBER, users)
+        _add_spooled(archive, FILE_VERSIONS_MEMBER, rows)
+
+        manifest = {
+            "format": FORMAT_VERSION,
+            "from_id": since_id,
+            "to_id": to_id,
+            "last_created_at": last_created_at.isoformat() if last_created_at else None,
+            "file_versions": count,
+            "users": len(user_ids),
+            "bytes": total_bytes,
+        }
+        _add_bytes(archive, MANIFEST_MEMBER, json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+def _restore_users(handle) -> dict[int, int]:
+    """Create missing users and map archived user ids to local ones by email."""
+    archived = [json.loads(line) for line in handle]
+    existing = dict(User.objects.filter(email__in=[user["email"] for user in archived]).values_list("email", "id"))
+    missing = []
+    for user in archived:
+        if user["email"] in existing:
+            continue
+        fields = {key: value for key, value in user.items() if key != "id"}
+        fields["date_joined"] = parse_datetime(fields["date_joined"])
+        missing.append(User(**fields))
+    User.objects.bulk_create(missing)
+    local = dict(User.objects.filter(email__in=[user["email"] for user in archived]).values_list("email", "id"))
+    return {user["id"]: local[user["email"]] for user in archived}
+
+
+def _restore_file_versions(handle, user_ids: dict[int, int], names: dict[str, str], batch_size: int) -> int:
+    restored = 0
+    batch = []
+
+    def flush():
+        nonlocal restored
+        created_at = {file_version.id: file_version.created_at for file_version in batch}
+        with transaction.atomic():
+            present = set(FileVersion.all_objects.filter(pk__in=created_at).values_list("pk", flat=True))
+            FileVersion.objects.bulk_create(
+                [file_version for file_version in batch if file_version.id not in present], ignore_conflicts=True
+            )
+            # A row may still have been skipped for clashing with another version's number.
+            inserted = set(
+                FileVersion.all_objects.filter(pk__in=created_at.keys() - present).values_list("pk", flat=True)
+            )
+            batch[:] = [file_version for file_version in batch if file_version.id in inserted]
+            FileVersionChange.objects.record(
+                FileVersionChange.CREATED, [file_version.change_row() for file_version in batch]
+            )
+            # ``auto_now_add`` overwrote the archived timestamps during the insert.
+            for file_version in batch:
+                file_version.created_at = created_at[file_version.id]
+            FileVersion.all_objects.bulk_update(batch, ["created_at"])
+        restored += len(batch)
+        batch.clear()
+
+    for line in handle:
+        row = json.loads(line)
+        row["created_by_id"] = user_ids[row["created_by_id"]]
+        row["created_at"] = parse_datetime(row["created_at"])
+        if "last_accessed_at" in row:
+            row["last_accessed_at"] = parse_datetime(row["last_accessed_at"])
+        row["file"] = names.get(row["file"], row["file"])
+        batch.append(FileVersion(**row))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return restored
+
+
+def restore_backup(archive_path: str, batch_size: int = 1000) -> dict:
+    """Restore an archive produced by :func:`create_backup`.
+
+    Versions already present (by id) are skipped, so restoring the same
+    archive twice is harmless.
+    """
+    storage = FileVersion._meta.get_field("file").storage
+    names = {}
+    user_ids = {}
+    restored = 0
+    manifest = None
+
+    with tarfile.open(archive_path, _tar_mode(archive_path, "r")) as archive:
+        for member in archive:
+            handle = archive.extractfile(member)
+            if handle is None:
+                continue
+            if member.name.startswith(MEDIA_PREFIX):
+                name = member.name[len(MEDIA_PREFIX) :]
+                if not storage.exists(name):
+                    saved = storage.save(name, handle)
+                    if saved != name:
+                        names[name] = saved
+            elif member.name == USERS_MEMBER:
+                user_ids = _restore_users(handle)
+            elif member.name == FILE_VERSIONS_MEMBER:
+                restored = _restore_file_versions(handle, user_ids, names, batch_size)
+            elif member.name == MANIFEST_MEMBER:
+                manifest = json.load(handle)
+
+    if manifest is None or manifest.get("format") != FORMAT_VERSION:
+        raise ValueError("Archive has no supported manifest")
+
+    # Versions were inserted with explicit ids; keep the id sequence ahead of them.
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [FileVersion]):
+            cursor.execute(sql)
+    # Bulk inserts bypass FileVersion.save, which maintains the counters.
+    StorageUsage.objects.reconcile(sorted(set(user_ids.values())))
+    return {**manifest, "restored": restored}
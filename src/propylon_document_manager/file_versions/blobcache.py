@@ -0,0 +1,261 @@
+"""Cache of small, frequently downloaded file contents.
+
+Downloads of hot versions are answered from memory instead of reopening the
+stored file. Entries are keyed by the SHA-256 of the stored bytes (the
+version's content digest), so revisions with identical content share one
+entry and, as stored content never changes, the cache needs no invalidation.
+
+Two tiers are configured through ``settings.FILE_VERSION_BLOB_CACHE``:
+
+* an in-process LRU bounded by ``MAX_BYTES`` and holding files of at most
+  ``MAX_ITEM_BYTES``;
+* optionally, a host-wide tier in ``SHARED_DIR`` (ideally on tmpfs such as
+  ``/dev/shm``) bounded by ``SHARED_MAX_BYTES`` and read through ``mmap``, so
+  that every worker process on the host benefits from a blob loaded by any
+  of them.
+"""
+
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{16,128}$")
+
+
+class SharedBlobTier:
+    """Blobs stored as files in a directory shared by all workers on a host.
+
+    A process keeps the blobs it has read mapped, up to ``max_bytes``, so
+    later hits make no system calls and copy nothing. A mapping stays valid
+    after another process evicts its file, as the content stored under a
+    digest never changes. The budget is enforced from an index of the
+    directory with a running total, evicting the least recently used entries;
+    the directory is only rescanned every ``RESCAN_INTERVAL`` seconds, to
+    count entries other processes wrote.
+    """
+
+    RESCAN_INTERVAL = 60.0
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._mapped: OrderedDict[str, memoryview] = OrderedDict()
+        self._mapped_bytes = 0
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._total = 0
+        self._scanned_at = None
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def get(self, digest: str) -> memoryview | None:
+        with self._lock:
+            view = self._mapped.get(digest)
+            if view is not None:
+                self._mapped.move_to_end(digest)
+                self._index(digest, len(view))
+                return view
+        view = self._map(digest)
+        if view is not None:
+            with self._lock:
+                self._keep_mapped(digest, view)
+                self._index(digest, len(view))
+        return view
+
+    def put(self, digest: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_path, self._path(digest))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        with self._lock:
+            if self._scanned_at is None or time.monotonic() - self._scanned_at >= self.RESCAN_INTERVAL:
+                self._rescan()
+            self._index(digest, len(data))
+            evicted = []
+            while self._total > self.max_bytes and len(self._sizes) > 1:
+                victim, size = self._sizes.popitem(last=False)
+                self._total -= size
+                evicted.append(victim)
+                view = self._mapped.pop(victim, None)
+                if view is not None:
+                    self._mapped_bytes -= len(view)
+        for victim in evicted:
+            try:
+                os.unlink(self._path(victim))
+            except FileNotFoundError:
+                pass
+
+    def _map(self, digest: str) -> memoryview | None:
+        try:
+            fd = os.open(self._path(digest), os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            size = os.fstat(fd).st_size
+            if not size:
+                return memoryview(b"")
+            # The view keeps the mapping open for as long as it is referenced.
+            return memoryview(mmap.mmap(fd, size, access=mmap.ACCESS_READ))
+        finally:
+            os.close(fd)
+
+    def _keep_mapped(self, digest: str, view: memoryview):
+        previous = self._mapped.pop(digest, None)
+        if previous is not None:
+            self._mapped_bytes -= len(previous)
+        self._mapped[digest] = view
+        self._mapped_bytes += len(view)
+        while self._mapped_bytes > self.max_bytes:
+            _, dropped = self._mapped.popitem(last=False)
+            self._mapped_bytes -= len(dropped)
+
+    def _index(self, digest: str, size: int):
+        self._total += size - self._sizes.pop(digest, 0)
+        self._sizes[digest] = size
+
+    def _rescan(self):
+        """Rebuild the index from the directory, keeping the known entries' recency."""
+        found = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, entry.name, stat.st_size))
+        known = self._sizes
+        sizes = {name: size for _, name, size in found}
+        # Entries only other processes used count as least recently used.
+        self._sizes = OrderedDict((name, size) for _, name, size in sorted(found) if name not in known)
+        self._sizes.update((name, sizes[name]) for name in known if name in sizes)
+        self._total = sum(self._sizes.values())
+        self._scanned_at = time.monotonic()
+
+
+class BlobCache:
+    """Thread-safe, size-bounded LRU of blobs with an optional shared tier."""
+
+    def __init__(self, max_bytes: int, max_item_bytes: int, shared: SharedBlobTier | None = None):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.shared = shared
+        # Blobs read from the shared tier are kept as views of its mappings.
+        self._entries: OrderedDict[str, bytes | memoryview] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def cacheable(self, size: int) -> bool:
+        return 0 < size <= self.max_item_bytes and size <= self.max_bytes
+
+    def get(self, digest: str) -> bytes | memoryview | None:
+        with self._lock:
+            data = self._entries.get(digest)
+            if data is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return data
+        if self.shared is not None:
+            data = self.shared.get(digest)
+            if data is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                self._store(digest, data)
+                return data
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, digest: str, data: bytes):
+        if not self.cacheable(len(data)) or not DIGEST_RE.match(digest):
+            return
+        self._store(digest, data)
+        if self.shared is not None:
+            self.shared.put(digest, data)
+
+    def get_or_load(self, digest: str, size: int, loader: Callable[[], bytes]) -> bytes | memoryview | None:
+        """Return the cached blob, loading and caching it on a miss.
+
+        Returns ``None`` for blobs too large to cache; callers stream those.
+        """
+        if not self.cacheable(size) or not DIGEST_RE.match(digest):
+            return None
+        data = self.get(digest)
+        if data is None:
+            data = loader()
+            self.put(digest, data)
+        return data
+
+    def _store(self, digest: str, data: bytes | memoryview):
+        with self._lock:
+            previous = self._entries.pop(digest, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[digest] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "items": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_blob_cache = None
+_blob_cache_lock = threading.Lock()
+
+
+def get_blob_cache() -> BlobCache | None:
+    """The process-wide cache, or ``None`` when ``MAX_BYTES`` is 0."""
+    global _blob_cache
+    if _blob_cache is None:
+        with _blob_cache_lock:
+            if _blob_cache is None:
+                config = settings.FILE_VERSION_BLOB_CACHE
+                if not config.get("MAX_BYTES"):
+                    return None
+                shared = None
+                if config.get("SHARED_DIR"):
+                    shared = SharedBlobTier(config["SHARED_DIR"], config.get("SHARED_MAX_BYTES", config["MAX_BYTES"]))
+                _blob_cache = BlobCache(config["MAX_BYTES"], config["MAX_ITEM_BYTES"], shared)
+    return _blob_cache
+
+
+@receiver(setting_changed)
+def _reset_blob_cache(setting, **kwargs):
+    global _blob_cache
+    if setting == "FILE_VERSION_BLOB_CACHE":
+        _blob_cache = None
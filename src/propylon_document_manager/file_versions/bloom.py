@@ -0,0 +1,111 @@
+"""In-memory Bloom filter over the content digests each user has stored.
+
+Upload preflight checks consult :func:`might_have_content` before touching
+the database: a negative answer is definite, so a client sending new
+content is told to upload without a query. Positives are confirmed against
+the indexed ``content_digest`` column.
+
+The filter is built lazily per process and extended by the uploads that
+process handles. Content stored through other processes is only picked up
+on the next rebuild, which at worst makes a client upload bytes the server
+already has. Builds scan the table outside the lock; until the first one
+finishes, every check answers "maybe" and is settled by the database.
+"""
+
+import hashlib
+import math
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+_filter = None
+_building = False
+# Keys remembered while a build runs, added to the new filter once it is done.
+_pending = []
+_lock = threading.Lock()
+
+
+def _key(user_id: int, digest: str) -> str:
+    return f"{user_id}:{digest}"
+
+
+def _build() -> BloomFilter:
+    from .models import FileVersion
+
+    config = settings.FILE_VERSION_BLOOM_FILTER
+    stored = FileVersion.objects.exclude(content_digest="").values_list("created_by_id", "content_digest")
+    bloom = BloomFilter(max(config["CAPACITY"], stored.count() * 2), config["ERROR_RATE"])
+    for user_id, digest in stored.iterator(chunk_size=10000):
+        bloom.add(_key(user_id, digest))
+    return bloom
+
+
+def _get_filter() -> BloomFilter | None:
+    """The current filter, or ``None`` while the first one is being built."""
+    global _filter, _building
+    with _lock:
+        if _building or (_filter is not None and _filter.count <= _filter.capacity):
+            return _filter
+        _building = True
+        _pending.clear()
+    try:
+        bloom = _build()
+    except BaseException:
+        with _lock:
+            _building = False
+        raise
+    with _lock:
+        for key in _pending:
+            bloom.add(key)
+        _pending.clear()
+        _filter, _building = bloom, False
+    return bloom
+
+
+def might_have_content(user_id: int, digest: str) -> bool:
+    bloom = _get_filter()
+    return bloom is None or _key(user_id, digest) in bloom
+
+
+def remember_content(user_id: int, digest: str):
+    key = _key(user_id, digest)
+    with _lock:
+        if _filter is not None:
+            _filter.add(key)
+        if _building:
+            _pending.append(key)
+
+
+@receiver(setting_changed)
+def _reset_filter(setting, **kwargs):
+    global _filter
+    if setting == "FILE_VERSION_BLOOM_FILTER":
+        _filter = None
@@ -0,0 +1,57 @@
+"""Server-Sent Events stream of a user's file version changes.
+
+The stream replays the change log after a cursor and then polls for new
+changes, so a client stays in sync by reconnecting with the ``id`` of the
+last event it received (browsers send it as ``Last-Event-ID``).
+
+Each stream occupies a worker for as long as it is open; it ends after
+``MAX_DURATION`` seconds and clients reconnect transparently. Configured
+through ``settings.FILE_VERSION_CHANGE_STREAM``:
+
+* ``POLL_INTERVAL`` - seconds between polls while nothing changes
+* ``HEARTBEAT`` - seconds of silence after which a comment keeps proxies
+  from closing the connection
+* ``MAX_DURATION`` - seconds after which the stream ends
+"""
+
+import json
+import time
+from collections.abc import Iterator
+
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import FileVersionChange
+
+BATCH_SIZE = 500
+
+
+def format_event(change: dict) -> str:
+    return f"id: {change['id']}\nevent: {change['kind']}\ndata: {json.dumps(change, cls=JSONEncoder)}\n\n"
+
+
+def event_stream(user_id: int, cursor: int, serialize, hints: dict | None = None) -> Iterator[str]:
+    """Yield ``user_id``'s changes after ``cursor`` as SSE frames until the stream expires.
+
+    ``serialize`` turns a list of changes into their representations.
+    """
+    config = settings.FILE_VERSION_CHANGE_STREAM
+    started = last_sent = time.monotonic()
+    yield f"retry: {int(config['POLL_INTERVAL'] * 1000)}\n\n"
+
+    while True:
+        changes = list(FileVersionChange.objects.db_manager(hints=hints or {}).since(user_id, cursor)[:BATCH_SIZE])
+        if changes:
+            yield "".join(format_event(change) for change in serialize(changes))
+            cursor = changes[-1].pk
+            last_sent = time.monotonic()
+            if len(changes) == BATCH_SIZE:
+                continue
+
+        now = time.monotonic()
+        if now - started >= config["MAX_DURATION"]:
+            return
+        if now - last_sent >= config["HEARTBEAT"]:
+            yield ": keepalive\n\n"
+            last_sent = now
+        time.sleep(config["POLL_INTERVAL"])
@@ -0,0 +1,64 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+def _device(path: str) -> int:
+    # Directories created on first use are judged by their nearest existing parent.
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return os.stat(path).st_dev
+
+
+@register()
+def check_upload_temp_dir(app_configs, **kwargs):
+    """Warn when spooled uploads are exposed in or cannot be renamed into MEDIA_ROOT."""
+    temp_dir = settings.FILE_UPLOAD_TEMP_DIR
+    if not temp_dir:
+        return [
+            Warning(
+                "FILE_UPLOAD_TEMP_DIR is not set, so uploads are spooled to the system temporary "
+                "directory and copied into MEDIA_ROOT.",
+                hint="Point FILE_UPLOAD_TEMP_DIR at a directory on the file system of MEDIA_ROOT.",
+                id="file_versions.W001",
+            )
+        ]
+    media_root = os.path.abspath(settings.MEDIA_ROOT)
+    if os.path.commonpath([media_root, os.path.abspath(temp_dir)]) == media_root:
+        return [
+            Warning(
+                "FILE_UPLOAD_TEMP_DIR is inside MEDIA_ROOT, so spooled uploads and multipart parts "
+                "can be served with the media.",
+                hint="Point FILE_UPLOAD_TEMP_DIR at a directory next to MEDIA_ROOT.",
+                id="file_versions.W003",
+            )
+        ]
+    try:
+        if _device(temp_dir) == _device(settings.MEDIA_ROOT):
+            return []
+    except OSError:
+        return []
+    return [
+        Warning(
+            "FILE_UPLOAD_TEMP_DIR and MEDIA_ROOT are on different file systems, so every upload is copied.",
+            hint="Point FILE_UPLOAD_TEMP_DIR at a directory on the file system of MEDIA_ROOT.",
+            id="file_versions.W002",
+        )
+    ]
+
+
+@register()
+def check_signed_url_offload(app_configs, **kwargs):
+    """Reject web server offload modes signed downloads do not know."""
+    offload = settings.FILE_VERSION_SIGNED_URLS["OFFLOAD"]
+    if offload in (None, "x-accel-redirect", "x-sendfile"):
+        return []
+    return [
+        Error(
+            f"FILE_VERSION_SIGNED_URLS['OFFLOAD'] is {offload!r}.",
+            hint='Use None, "x-accel-redirect" or "x-sendfile".',
+            id="file_versions.E001",
+        )
+    ]
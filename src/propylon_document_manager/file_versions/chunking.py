@@ -0,0 +1,139 @@
+"""Content-defined chunking for :class:`~.storage.ChunkedStorage`.
+
+Files are cut where a gear rolling hash over the most recent bytes matches a
+mask, so boundaries follow the content rather than fixed offsets: an edit
+only changes the chunks around it and every other chunk of the revision is
+byte-identical to, and stored once with, the previous one. Sizes come from
+``settings.FILE_VERSION_CHUNKING``:
+
+* ``MIN_SIZE`` - no boundary is looked for before this many bytes
+* ``AVG_SIZE`` - expected chunk size, a power of two
+* ``MAX_SIZE`` - a chunk is cut here if the content offered no boundary
+
+Hashing runs byte by byte in Python, so chunked storage trades upload CPU
+for disk space and suits large documents that change little between
+revisions.
+"""
+
+import bisect
+import hashlib
+import io
+from collections.abc import Callable, Iterator
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+READ_SIZE = 1024 * 1024
+
+# Fixed so that every process cuts the same content at the same places.
+GEAR = [int.from_bytes(hashlib.sha256(bytes([value])).digest()[:4], "big") for value in range(256)]
+
+
+def _boundary_mask(avg_size: int) -> int:
+    if avg_size <= 0 or avg_size & (avg_size - 1):
+        raise ImproperlyConfigured("FILE_VERSION_CHUNKING['AVG_SIZE'] must be a power of two")
+    bits = avg_size.bit_length() - 1
+    # High bits depend on the most bytes of the window.
+    return ((1 << bits) - 1) << (32 - bits)
+
+
+def _cut_point(data: bytearray, min_size: int, max_size: int, mask: int) -> int:
+    end = min(len(data), max_size)
+    if end <= min_size:
+        return end
+    gear = GEAR
+    fingerprint = 0
+    for position in range(min_size, end):
+        fingerprint = ((fingerprint << 1) + gear[data[position]]) & 0xFFFFFFFF
+        if not fingerprint & mask:
+            return position + 1
+    return end
+
+
+def iter_chunks(stream) -> Iterator[bytes]:
+    """Split the binary ``stream`` into content-defined chunks."""
+    config = settings.FILE_VERSION_CHUNKING
+    min_size, max_size = config["MIN_SIZE"], config["MAX_SIZE"]
+    mask = _boundary_mask(config["AVG_SIZE"])
+    pending = bytearray()
+    eof = False
+    while True:
+        while not eof and len(pending) < max_size:
+            block = stream.read(READ_SIZE)
+            if block:
+                pending += block
+            else:
+                eof = True
+        if not pending:
+            return
+        cut = _cut_point(pending, min_size, max_size, mask)
+        yield bytes(pending[:cut])
+        del pending[:cut]
+
+
+class ChunkReader(io.RawIOBase):
+    """Seekable stream over the concatenation of stored chunks.
+
+    ``chunks`` lists ``(digest, size)`` pairs in file order and ``open_chunk``
+    opens the stored chunk of a digest for binary reading.
+    """
+
+    def __init__(self, chunks: list, open_chunk: Callable):
+        self.chunks = chunks
+        self.open_chunk = open_chunk
+        self.offsets = []
+        total = 0
+        for _, size in chunks:
+            self.offsets.append(total)
+            total += size
+        self.size = total
+        self.position = 0
+        self._index = None
+        self._handle = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self.position = offset
+        return offset
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size:
+            return 0
+        index = bisect.bisect_right(self.offsets, self.position) - 1
+        if index != self._index:
+            self._close_chunk()
+            self._handle = self.open_chunk(self.chunks[index][0])
+            self._index = index
+        within = self.position - self.offsets[index]
+        self._handle.seek(within)
+        wanted = min(len(buffer), self.chunks[index][1] - within)
+        data = self._handle.read(wanted)
+        if len(data) != wanted:
+            raise OSError(f"Chunk {self.chunks[index][0]} is truncated")
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def _close_chunk(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._index = None
+
+    def close(self):
+        self._close_chunk()
+        super().close()
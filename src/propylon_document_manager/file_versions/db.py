@@ -0,0 +1,105 @@
+"""Database connection tuning.
+
+SQLite's default rollback journal makes every writer block all readers, and
+a deferred ``BEGIN`` lets two uploads both start reading the version chain
+before one of them fails to upgrade its lock with "database is locked".
+Connections are therefore initialised with ``settings.SQLITE_PRAGMAS``
+(WAL, busy timeout, ...) and version allocation runs in :func:`immediate_atomic`.
+
+Read-only API traffic can additionally be spread over the aliases listed in
+``settings.DATABASE_REPLICAS`` by :class:`PrimaryReplicaRouter`.
+"""
+
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver applying ``settings.SQLITE_PRAGMAS``."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+@contextmanager
+def immediate_atomic(using: str | None = None):
+    """``transaction.atomic`` that takes the database write lock up front.
+
+    On SQLite the outermost block starts with ``BEGIN IMMEDIATE``, so
+    concurrent writers queue on ``busy_timeout`` instead of deadlocking on a
+    lock upgrade. Other backends get a plain atomic block and rely on
+    ``select_for_update`` for serialization.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    def begin_immediate():
+        connection.cursor().execute("BEGIN IMMEDIATE")
+
+    # The pinned Django release has no transaction_mode option, so the
+    # backend's BEGIN is swapped on this connection for the outermost block.
+    connection._start_transaction_under_autocommit = begin_immediate
+    try:
+        with transaction.atomic(using=using):
+            # BEGIN has been issued; nested blocks only create savepoints.
+            del connection._start_transaction_under_autocommit
+            yield
+    finally:
+        connection.__dict__.pop("_start_transaction_under_autocommit", None)
+
+
+def _pin_key(user_id) -> str:
+    return f"db-primary-pin:{user_id}"
+
+
+def pin_to_primary(user):
+    """Route ``user``'s replica-eligible reads to the primary for a while.
+
+    Called after a write so that the user reads their own changes even when
+    replicas lag behind; the window is ``settings.DATABASE_REPLICA_STICKINESS``
+    seconds.
+    """
+    if settings.DATABASE_REPLICAS and user.is_authenticated:
+        cache.set(_pin_key(user.pk), True, settings.DATABASE_REPLICA_STICKINESS)
+
+
+def is_pinned_to_primary(user) -> bool:
+    return bool(user.is_authenticated and cache.get(_pin_key(user.pk)))
+
+
+class PrimaryReplicaRouter:
+    """Sends reads hinted with ``replica_ok=True`` to a random replica.
+
+    Everything else, including all writes, uses the default database. The
+    hint is opt-in so that only queries known to tolerate replication lag
+    leave the primary; a ``user`` hint keeps reads on the primary while that
+    user is pinned by :func:`pin_to_primary`.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not hints.get("replica_ok"):
+            return None
+        user = hints.get("user")
+        if user is not None and is_pinned_to_primary(user):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,70 @@
+"""Set-based resolution of many document references at once.
+
+Each function takes a ``FileVersion`` queryset already limited to one user,
+the references to resolve and the columns to return, and answers with a
+mapping from reference to a row of those columns. References are resolved
+in chunks of ``CHUNK_SIZE``, one query per chunk, so checking thousands of
+documents costs a handful of queries instead of one request each.
+"""
+
+from collections.abc import Iterable, Iterator
+
+from django.db.models import OuterRef, Subquery
+
+CHUNK_SIZE = 500
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def latest_versions(queryset, documents: Iterable[tuple[str, str]], columns: list[str]) -> dict:
+    """Latest version of each ``(path, file_name)``."""
+    wanted = sorted(set(documents))
+    latest_number = (
+        queryset.model.objects.filter(
+            created_by=OuterRef("created_by"), path=OuterRef("path"), file_name=OuterRef("file_name")
+        )
+        .order_by("-version_number")
+        .values("version_number")[:1]
+    )
+    found = {}
+    for chunk in _chunks(wanted):
+        # path__in x file_name__in may select extra documents; only requested pairs are kept.
+        rows = queryset.filter(
+            path__in={path for path, _ in chunk},
+            file_name__in={file_name for _, file_name in chunk},
+            version_number=Subquery(latest_number),
+        ).values_list("path", "file_name", *columns)
+        requested = set(chunk)
+        for row in rows:
+            if row[:2] in requested:
+                found[row[:2]] = row[2:]
+    return found
+
+
+def exact_versions(queryset, references: Iterable[tuple[str, str, int]], columns: list[str]) -> dict:
+    """The given version number of each ``(path, file_name, version_number)``."""
+    wanted = sorted(set(references))
+    found = {}
+    for chunk in _chunks(wanted):
+        rows = queryset.filter(
+            path__in={path for path, _, _ in chunk},
+            file_name__in={file_name for _, file_name, _ in chunk},
+            version_number__in={version_number for _, _, version_number in chunk},
+        ).values_list("path", "file_name", "version_number", *columns)
+        requested = set(chunk)
+        for row in rows:
+            if row[:3] in requested:
+                found[row[:3]] = row[3:]
+    return found
+
+
+def versions_by_hash(queryset, content_hashes: Iterable[str], columns: list[str]) -> dict:
+    """The version stored under each content hash."""
+    found = {}
+    for chunk in _chunks(sorted(set(content_hashes))):
+        for row in queryset.filter(content_hash__in=chunk).values_list("content_hash", *columns):
+            found.setdefault(row[0], row[1:])
+    return found
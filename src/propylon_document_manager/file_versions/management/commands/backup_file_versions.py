@@ -0,0 +1,44 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from propylon_document_manager.file_versions.backup import create_backup
+
+
+class Command(BaseCommand):
+    help = "Write file versions added since the last backup watermark, with their media, to a tar archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive", help="Archive to write; a .tar.gz or .tgz suffix enables compression")
+        parser.add_argument(
+            "--watermark-file",
+            help="JSON file holding the watermark of the previous backup; updated after a successful run",
+        )
+        parser.add_argument("--since-id", type=int, help="Back up versions with an id above this value")
+        parser.add_argument("--full", action="store_true", help="Ignore the watermark and back up everything")
+
+    def handle(self, *args, **options):
+        since_id = 0
+        watermark_file = options["watermark_file"]
+        if options["since_id"] is not None:
+            since_id = options["since_id"]
+        elif watermark_file and not options["full"] and os.path.exists(watermark_file):
+            with open(watermark_file) as handle:
+                try:
+                    since_id = json.load(handle)["to_id"]
+                except (ValueError, KeyError) as exc:
+                    raise CommandError(f"Invalid watermark file {watermark_file}: {exc}")
+
+        manifest = create_backup(options["archive"], since_id=since_id)
+
+        if watermark_file:
+            with open(watermark_file, "w") as handle:
+                json.dump(manifest, handle, indent=2)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Backed up %s file versions (%s bytes), watermark %s -> %s"
+                % (manifest["file_versions"], manifest["bytes"], manifest["from_id"], manifest["to_id"])
+            )
+        )
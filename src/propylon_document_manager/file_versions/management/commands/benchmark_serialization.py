@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from propylon_document_manager.file_versions.api.serializers import FileVersionReadSerializer, FileVersionSerializer
+from propylon_document_manager.file_versions.models import FileVersion
+
+
+class Command(BaseCommand):
+    help = "Compare FileVersion listing serialization cost per 1,000 rows: ModelSerializer vs the fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Rows serialized per iteration")
+        parser.add_argument("--repeat", type=int, default=20, help="Iterations per implementation")
+
+    def handle(self, *args, **options):
+        queryset = FileVersion.objects.order_by("pk")[: options["rows"]]
+        rows = queryset.count()
+        if not rows:
+            raise CommandError("No file versions found; run generate_scale_dataset --metadata-only first")
+        renderer = JSONRenderer()
+
+        def model_serializer():
+            return renderer.render(FileVersionSerializer(queryset, many=True).data)
+
+        def fast_path():
+            reader = FileVersionReadSerializer()
+            return renderer.render(reader.many(reader.rows(queryset)))
+
+        if model_serializer() != fast_path():
+            raise CommandError("Fast path output differs from FileVersionSerializer")
+
+        for label, serialize in (("ModelSerializer", model_serializer), ("fast path", fast_path)):
+            started = time.perf_counter()
+            for _ in range(options["repeat"]):
+                serialize()
+            per_thousand = (time.perf_counter() - started) / options["repeat"] / rows * 1000
+            self.stdout.write(f"{label:>16}: {per_thousand * 1000:8.2f} ms per 1,000 rows (query included)")
+        self.stdout.write(self.style.SUCCESS(f"Outputs identical over {rows} rows"))
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+
+from propylon_document_manager.file_versions.db import immediate_atomic
+from propylon_document_manager.file_versions.models import FileVersion, User
+
+
+class Command(BaseCommand):
+    help = "Measure listing throughput on SQLite while uploads are written concurrently"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4, help="Threads issuing listing queries")
+        parser.add_argument("--writers", type=int, default=2, help="Threads creating file versions")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+        parser.add_argument("--file-size", type=int, default=16 * 1024, help="Bytes per uploaded file")
+        parser.add_argument(
+            "--baseline",
+            action="store_true",
+            help="Run with the rollback journal and no SQLITE_PRAGMAS for comparison",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("This benchmark targets the SQLite backend")
+
+        pragmas = {"journal_mode": "DELETE"} if options["baseline"] else None
+        with override_settings(**({"SQLITE_PRAGMAS": pragmas} if pragmas else {})):
+            connection.close()
+            user, _ = User.objects.get_or_create(email="sqlite-benchmark@example.com", defaults={"name": "Benchmark"})
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                journal_mode = cursor.fetchone()[0]
+            first_id = (FileVersion.objects.order_by("-pk").values_list("pk", flat=True).first()) or 0
+
+            stop = threading.Event()
+            counters = {"reads": 0, "writes": 0, "locked": 0}
+            lock = threading.Lock()
+
+            def count(name):
+                with lock:
+                    counters[name] += 1
+
+            def reader():
+                try:
+                    while not stop.is_set():
+                        try:
+                            list(FileVersion.objects.filter(created_by=user).order_by("-pk")[:20])
+                            count("reads")
+                        except OperationalError:
+                            count("locked")
+                finally:
+                    connections.close_all()
+
+            def writer(index):
+                payload = b"x" * options["file_size"]
+                try:
+                    while not stop.is_set():
+                        name = f"benchmark-{index}.bin"
+                        try:
+                            with immediate_atomic():
+                                last = (
+                                    FileVersion.all_objects.filter(file_name=name, created_by=user)
+                                    .order_by("-version_number")
+                                    .values_list("version_number", flat=True)
+                                    .first()
+                                )
+                                FileVersion.objects.create(
+                                    file_name=name,
+                                    version_number=(last or 0) + 1,
+                                    created_by=user,
+                                    file=ContentFile(payload, name=name),
+                                    path="benchmark",
+                                )
+                            count("writes")
+                        except OperationalError:
+                            count("locked")
+                finally:
+                    connections.close_all()
+
+            threads = [threading.Thread(target=reader) for _ in range(options["readers"])]
+            threads += [threading.Thread(target=writer, args=(index,)) for index in range(options["writers"])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            time.sleep(options["duration"])
+            stop.set()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            FileVersion.objects.filter(created_by=user, pk__gt=first_id, path="benchmark").purge()
+
+        self.stdout.write(f"journal_mode={journal_mode} readers={options['readers']} writers={options['writers']}")
+        self.stdout.write(f"reads/s:  {counters['reads'] / elapsed:10.1f}")
+        self.stdout.write(f"writes/s: {counters['writes'] / elapsed:10.1f}")
+        self.stdout.write(f"'database is locked' errors: {counters['locked']}")
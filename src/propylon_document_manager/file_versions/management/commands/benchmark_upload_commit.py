@@ -0,0 +1,71 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+
+from propylon_document_manager.file_versions.models import FileVersion
+
+CHUNK_SIZE = 8 * 1024 * 1024
+MODES = ("rename", "copy")
+
+
+class Command(BaseCommand):
+    help = "Measure how fast spooled uploads are committed to FileVersion storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=1024**3, help="Bytes per upload (default 1 GiB)")
+        parser.add_argument("--runs", type=int, default=3, help="Uploads committed per mode")
+        parser.add_argument(
+            "--mode",
+            choices=MODES,
+            action="append",
+            help="Commit by rename from FILE_UPLOAD_TEMP_DIR, or by copying as for a non-spooled file "
+            "(default: both)",
+        )
+
+    def handle(self, *args, **options):
+        if options["size"] < 1 or options["runs"] < 1:
+            raise CommandError("--size and --runs must be at least 1")
+        storage = FileVersion._meta.get_field("file").storage
+        if settings.FILE_UPLOAD_TEMP_DIR:
+            os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        chunk = os.urandom(min(CHUNK_SIZE, options["size"]))
+
+        self.stdout.write(
+            f"temp dir={settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir()} media={settings.MEDIA_ROOT} "
+            f"fsync={getattr(storage, 'fsync', 'n/a')} size={options['size']} runs={options['runs']}"
+        )
+        for mode in options["mode"] or MODES:
+            spool_seconds = commit_seconds = 0.0
+            for run in range(options["runs"]):
+                upload = TemporaryUploadedFile(f"benchmark-{run}.bin", "application/octet-stream", 0, None)
+                try:
+                    started = time.perf_counter()
+                    remaining = options["size"]
+                    while remaining:
+                        remaining -= upload.write(chunk[:remaining])
+                    upload.flush()
+                    os.fsync(upload.fileno())
+                    upload.size = options["size"]
+                    upload.seek(0)
+                    spooled = time.perf_counter()
+                    # A plain File has no temporary_file_path, so storage streams a copy.
+                    content = upload if mode == "rename" else File(upload.file, upload.name)
+                    name = storage.save(f"benchmark/{mode}-{run}.bin", content)
+                    committed = time.perf_counter()
+                finally:
+                    upload.close()
+                storage.delete(name)
+                spool_seconds += spooled - started
+                commit_seconds += committed - spooled
+
+            megabytes = options["size"] * options["runs"] / 1024**2
+            self.stdout.write(
+                f"{mode:>6}: commit {commit_seconds / options['runs']:8.3f}s/upload "
+                f"({megabytes / commit_seconds if commit_seconds else float('inf'):10.1f} MiB/s), "
+                f"end to end {megabytes / (spool_seconds + commit_seconds):8.1f} MiB/s"
+            )
@@ -0,0 +1,90 @@
+import os
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from propylon_document_manager.file_versions.models import FileVersion
+from propylon_document_manager.file_versions.storage import ChunkedStorage
+
+
+class Command(BaseCommand):
+    help = "Delete stored chunks that no chunked file refers to any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=float,
+            default=60.0,
+            help="Spare chunks written or reused within this many minutes, as uploads in progress may need them",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted")
+
+    def handle(self, *args, **options):
+        storage = FileVersion._meta.get_field("file").storage
+        if not isinstance(storage, ChunkedStorage):
+            raise CommandError("FILE_VERSION_STORAGE_BACKEND is not a ChunkedStorage")
+
+        cutoff = time.time() - options["grace"] * 60
+        # Manifests staged by uploads that never committed, e.g. after a crash,
+        # would otherwise keep their chunks referenced forever.
+        abandoned = 0
+        staging = os.path.join(storage.location, storage.STAGING_DIRECTORY)
+        if os.path.isdir(staging):
+            for entry in os.scandir(staging):
+                if entry.stat().st_mtime > cutoff:
+                    continue
+                abandoned += 1
+                if not options["dry_run"]:
+                    storage.delete(f"{storage.STAGING_DIRECTORY}/{entry.name}")
+        referenced = storage.referenced_chunks()
+        removed = freed = 0
+        for directory, _, files in os.walk(os.path.join(storage.location, storage.CHUNK_DIRECTORY)):
+            for file_name in files:
+                # Partial writes are named after their chunk and go once they are stale.
+                if file_name.split(".", 1)[0] in referenced and not file_name.endswith(".partial"):
+                    continue
+                full_path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(full_path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime > cutoff:
+                    continue
+                if not options["dry_run"] and not self.remove_unless_touched(full_path, cutoff):
+                    continue
+                removed += 1
+                freed += stat.st_size
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {removed} unreferenced chunks ({freed} bytes) and {abandoned} abandoned staged files"
+            )
+        )
+
+    @staticmethod
+    def remove_unless_touched(full_path: str, cutoff: float) -> bool:
+        """Remove a stale chunk, unless an upload reused it after it was examined.
+
+        The chunk is first renamed out of reach, so an upload reusing it from
+        then on finds it missing and writes it again. Its modification time
+        is checked once more under the new name: an upload that refreshed it
+        before the rename gets it back.
+        """
+        tombstone = f"{full_path}.{uuid.uuid4().hex}.collecting"
+        try:
+            os.rename(full_path, tombstone)
+        except FileNotFoundError:
+            return False
+        try:
+            if os.stat(tombstone).st_mtime <= cutoff:
+                return True
+            try:
+                os.link(tombstone, full_path)
+            except FileExistsError:
+                # Already written again by an upload.
+                pass
+            return False
+        finally:
+            os.remove(tombstone)
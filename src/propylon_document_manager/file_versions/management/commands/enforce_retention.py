@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from propylon_document_manager.file_versions.models import FileVersion, User
+from propylon_document_manager.file_versions.retention import get_policies, policy_for
+
+
+class Command(BaseCommand):
+    help = "Delete file versions not retained by FILE_VERSION_RETENTION_POLICIES"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Versions deleted per transaction")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted")
+
+    def handle(self, *args, **options):
+        policies = get_policies()
+        if not policies:
+            self.stdout.write("No retention policies configured")
+            return
+
+        self.now = timezone.now()
+        self.options = options
+        self.pending = []
+        self.deleted = 0
+
+        users = User.objects.filter(file_versions__isnull=False).distinct().order_by("pk")
+        for user_id, email in users.values_list("pk", "email").iterator():
+            # One user's documents at a time keeps each pass on the document index.
+            documents = list(
+                FileVersion.objects.filter(created_by_id=user_id)
+                .values("path", "file_name")
+                .annotate(versions=Count("id"))
+                .filter(versions__gt=1)
+                .order_by("path", "file_name")
+            )
+            for document in documents:
+                policy = policy_for(policies, email, document["path"])
+                if policy is None:
+                    continue
+                versions = FileVersion.objects.filter(
+                    created_by_id=user_id, path=document["path"], file_name=document["file_name"]
+                ).values_list("pk", "version_number", "created_at")
+                self.pending.extend(policy.prune(list(versions), self.now))
+                if len(self.pending) >= options["batch_size"]:
+                    self._flush()
+        self._flush()
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {self.deleted} file versions"))
+
+    def _flush(self):
+        while self.pending:
+            batch = self.pending[: self.options["batch_size"]]
+            del self.pending[: self.options["batch_size"]]
+            if self.options["dry_run"]:
+                self.deleted += len(batch)
+                continue
+            self.deleted += FileVersion.objects.filter(pk__in=batch).purge()
+            if self.options["sleep"]:
+                time.sleep(self.options["sleep"])
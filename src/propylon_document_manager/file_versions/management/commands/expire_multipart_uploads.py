@@ -0,0 +1,56 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from propylon_document_manager.file_versions.models import MultipartUpload
+from propylon_document_manager.file_versions.multipart import discard, upload_directory
+
+
+class Command(BaseCommand):
+    help = "Abort multipart uploads that were never completed and remove their parts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=float,
+            default=None,
+            help="Hours after which an upload expires (default: FILE_VERSION_MULTIPART['EXPIRE_AFTER_HOURS'])",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be removed")
+
+    def handle(self, *args, **options):
+        hours = options["older_than"]
+        if hours is None:
+            hours = settings.FILE_VERSION_MULTIPART["EXPIRE_AFTER_HOURS"]
+        cutoff = timezone.now() - timedelta(hours=hours)
+
+        # Uploads being completed are left alone, as their parts are being joined.
+        expired = MultipartUpload.objects.filter(state=MultipartUpload.OPEN, created_at__lt=cutoff)
+        removed = 0
+        for upload_id in expired.values_list("pk", flat=True):
+            if options["dry_run"]:
+                removed += 1
+            # Checked again on delete, in case a complete claimed the upload meanwhile.
+            elif expired.filter(pk=upload_id).delete()[0]:
+                discard(upload_id)
+                removed += 1
+
+        # Parts whose upload row is already gone, e.g. after a crash while completing.
+        root = os.path.dirname(upload_directory("-"))
+        known = {str(pk) for pk in MultipartUpload.objects.values_list("pk", flat=True)}
+        orphaned = 0
+        if os.path.isdir(root):
+            for entry in os.scandir(root):
+                if entry.name in known or entry.stat().st_mtime > cutoff.timestamp():
+                    continue
+                orphaned += 1
+                if not options["dry_run"]:
+                    discard(entry.name)
+
+        verb = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {removed} expired uploads and {orphaned} orphaned part directories")
+        )
@@ -0,0 +1,148 @@
+import hashlib
+import mimetypes
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from propylon_document_manager.file_versions.models import (
+    FileVersion,
+    FileVersionChange,
+    StorageUsage,
+    User,
+    compute_content_hash,
+    user_directory_path,
+)
+
+DIRECTORY_WORDS = [
+    "bills",
+    "acts",
+    "amendments",
+    "statutes",
+    "drafts",
+    "archive",
+    "committee",
+    "reports",
+    "consolidated",
+    "2023",
+    "2024",
+    "2025",
+]
+DOCUMENT_WORDS = ["bill", "act", "amendment", "statute", "report", "schedule", "order", "notice"]
+EXTENSIONS = [".pdf", ".docx", ".txt", ".xml", ".html"]
+SIZE_DISTRIBUTIONS = ["fixed", "uniform", "lognormal"]
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic dataset of users and file versions for scale testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10, help="Number of users to generate")
+        parser.add_argument("--documents", type=int, default=100, help="Documents per user")
+        parser.add_argument("--versions", type=int, default=5, help="Maximum versions per document")
+        parser.add_argument("--depth", type=int, default=3, help="Maximum directory depth of document paths")
+        parser.add_argument(
+            "--size-distribution",
+            choices=SIZE_DISTRIBUTIONS,
+            default="lognormal",
+            help="Distribution the file sizes are drawn from",
+        )
+        parser.add_argument("--mean-size", type=int, default=64 * 1024, help="Mean file size in bytes")
+        parser.add_argument("--max-size", type=int, default=16 * 1024 * 1024, help="Maximum file size in bytes")
+        parser.add_argument("--seed", type=int, default=0, help="Seed making the dataset reproducible")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk insert")
+        parser.add_argument(
+            "--metadata-only",
+            action="store_true",
+            help="Only insert database rows, without writing file contents to storage",
+        )
+
+    def handle(self, *args, **options):
+        for name in ("users", "documents", "versions", "depth", "mean_size", "max_size", "batch_size"):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1")
+
+        rng = random.Random(options["seed"])
+        users = self._create_users(options["users"], options["seed"])
+        storage = FileVersion._meta.get_field("file").storage
+
+        batch = []
+        total = skipped = 0
+        for user in users:
+            # Versions left by an earlier run with the same seed are kept as they are.
+            existing = set(FileVersion.all_objects.filter(created_by=user).values_list("file_name", "version_number"))
+            for document in range(options["documents"]):
+                path = "/".join(rng.choice(DIRECTORY_WORDS) for _ in range(rng.randint(1, options["depth"])))
+                file_name = f"{rng.choice(DOCUMENT_WORDS)}_{document:06d}{rng.choice(EXTENSIONS)}"
+                for version_number in range(1, rng.randint(1, options["versions"]) + 1):
+                    size = self._draw_size(rng, options)
+                    data = rng.randbytes(size)
+                    if (file_name, version_number) in existing:
+                        skipped += 1
+                        continue
+                    file_version = FileVersion(
+                        file_name=file_name,
+                        version_number=version_number,
+                        path=path,
+                        created_by=user,
+                        file_size=size,
+                        mime_type=mimetypes.guess_type(file_name)[0] or "",
+                        content_hash=compute_content_hash(data, version_number, user.pk),
+                        content_digest=hashlib.sha256(data).hexdigest(),
+                    )
+                    name = user_directory_path(file_version, file_name)
+                    if not options["metadata_only"]:
+                        name = storage.save(name, ContentFile(data))
+                    file_version.file.name = name
+                    batch.append(file_version)
+
+                    if len(batch) >= options["batch_size"]:
+                        total += self._flush(batch)
+            self.stdout.write(f"Generated documents for {user.email}")
+        total += self._flush(batch)
+        # Bulk inserts bypass FileVersion.save, which maintains the counters.
+        StorageUsage.objects.reconcile([user.pk for user in users])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully generated {len(users)} users and {total} file versions ({skipped} already present)"
+            )
+        )
+
+    def _create_users(self, count: int, seed: int) -> list[User]:
+        emails = [f"scale-user-{seed}-{index}@example.com" for index in range(count)]
+        existing = set(User.objects.filter(email__in=emails).values_list("email", flat=True))
+        password = make_password(None)
+        User.objects.bulk_create(
+            [
+                User(email=email, name=f"Scale User {index}", password=password)
+                for index, email in enumerate(emails)
+                if email not in existing
+            ]
+        )
+        users = {user.email: user for user in User.objects.filter(email__in=emails)}
+        return [users[email] for email in emails]
+
+    def _draw_size(self, rng: random.Random, options: dict) -> int:
+        mean = options["mean_size"]
+        if options["size_distribution"] == "fixed":
+            size = mean
+        elif options["size_distribution"] == "uniform":
+            size = rng.randint(1, 2 * mean)
+        else:
+            # Log-normal with the requested mean: many small files and a long tail of large ones.
+            sigma = 1.0
+            size = int(rng.lognormvariate(-(sigma**2) / 2, sigma) * mean)
+        return max(1, min(size, options["max_size"]))
+
+    def _flush(self, batch: list[FileVersion]) -> int:
+        count = len(batch)
+        with transaction.atomic():
+            FileVersion.objects.bulk_create(batch)
+            FileVersionChange.objects.record(
+                FileVersionChange.CREATED, [file_version.change_row() for file_version in batch]
+            )
+        batch.clear()
+        return count
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from propylon_document_manager.file_versions.models import FileVersion
+
+
+class Command(BaseCommand):
+    help = "Record soft deletions, then remove deleted file versions and their stored files in throttled batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Versions purged per transaction")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches")
+        parser.add_argument(
+            "--older-than", type=float, default=0.0, help="Only purge versions deleted at least this many minutes ago"
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be purged")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options["older_than"])
+        trashed = FileVersion.all_objects.filter(deleted_at__lte=cutoff)
+
+        if options["dry_run"]:
+            unrecorded = FileVersion.all_objects.filter(deleted_at__isnull=False, deletion_recorded=False).count()
+            self.stdout.write(
+                self.style.SUCCESS(f"Would record {unrecorded} deletions and purge {trashed.count()} file versions")
+            )
+            return
+
+        # Every deletion is recorded, grace period or not, so usage and the
+        # change feed catch up with the markers soft deletion set.
+        recorded = FileVersion.all_objects.record_deletions(batch_size=options["batch_size"])
+
+        purged = 0
+        while True:
+            # Short transactions keep the write lock free for uploads in between.
+            batch = list(trashed.order_by("deleted_at", "pk").values_list("pk", flat=True)[: options["batch_size"]])
+            if not batch:
+                break
+            purged += FileVersion.all_objects.filter(pk__in=batch).purge()
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Recorded {recorded} deletions and purged {purged} file versions"))
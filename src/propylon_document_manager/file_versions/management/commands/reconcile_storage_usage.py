@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from propylon_document_manager.file_versions.models import StorageUsage, User
+
+
+class Command(BaseCommand):
+    help = "Recompute per-user storage usage counters from the stored file versions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", default=[], help="Email of a user to reconcile (repeatable)")
+        parser.add_argument("--dry-run", action="store_true", help="Report drifted counters without fixing them")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["user"]:
+            users = dict(User.objects.filter(email__in=options["user"]).values_list("email", "pk"))
+            missing = sorted(set(options["user"]) - set(users))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(missing)}")
+            user_ids = sorted(users.values())
+
+        drifted = StorageUsage.objects.reconcile(user_ids, dry_run=options["dry_run"])
+
+        verb = "Would repair" if options["dry_run"] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {drifted} storage usage counters"))
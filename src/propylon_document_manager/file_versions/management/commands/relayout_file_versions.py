@@ -0,0 +1,79 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from propylon_document_manager.file_versions.models import FileVersion
+
+
+class Command(BaseCommand):
+    help = "Move stored files to the current FILE_VERSION_STORAGE_LAYOUT while downloads keep working"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Versions examined per batch")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches")
+        parser.add_argument("--dry-run", action="store_true", help="Report how many files would move")
+
+    def handle(self, *args, **options):
+        field = FileVersion._meta.get_field("file")
+        self.storage = field.storage
+        moved_names = {}
+        moved = 0
+        last_pk = 0
+
+        while True:
+            batch = list(FileVersion.all_objects.filter(pk__gt=last_pk).order_by("pk")[: options["batch_size"]])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            for file_version in batch:
+                old_name = file_version.file.name
+                new_name = field.generate_filename(file_version, file_version.file_name)
+                if old_name == new_name:
+                    continue
+                moved += 1
+                if options["dry_run"]:
+                    continue
+
+                # Versions sharing a stored file follow the first one moved.
+                if old_name not in moved_names:
+                    moved_names[old_name] = self._copy(old_name, new_name)
+                self._repoint(file_version.pk, old_name, moved_names[old_name])
+
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        verb = "Would move" if options["dry_run"] else "Moved"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {moved} file versions"))
+
+    def _copy(self, old_name: str, new_name: str) -> str:
+        """Make the contents of ``old_name`` available under a name derived from ``new_name``.
+
+        The old file is left in place until no row points at it, so requests
+        that looked a version up just before it moved can still open it.
+        """
+        new_name = self.storage.get_available_name(new_name)
+        try:
+            old_path = self.storage.path(old_name)
+            new_path = self.storage.path(new_name)
+        except NotImplementedError:
+            with self.storage.open(old_name, "rb") as handle:
+                return self.storage.save(new_name, handle)
+
+        # Local storage: a hard link moves the file without copying its bytes.
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        try:
+            os.link(old_path, new_path)
+        except OSError:
+            with self.storage.open(old_name, "rb") as handle:
+                return self.storage.save(new_name, handle)
+        return new_name
+
+    def _repoint(self, pk: int, old_name: str, new_name: str):
+        with transaction.atomic():
+            FileVersion.all_objects.filter(pk=pk, file=old_name).update(file=new_name)
+            still_referenced = FileVersion.all_objects.filter(file=old_name).exists()
+        if not still_referenced:
+            self.storage.delete(old_name)
@@ -0,0 +1,26 @@
+import tarfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from propylon_document_manager.file_versions.backup import restore_backup
+
+
+class Command(BaseCommand):
+    help = "Restore file versions and media from archives written by backup_file_versions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("archives", nargs="+", help="Archives to restore, oldest first")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk insert")
+
+    def handle(self, *args, **options):
+        for archive in options["archives"]:
+            try:
+                result = restore_backup(archive, batch_size=options["batch_size"])
+            except (OSError, ValueError, tarfile.TarError) as exc:
+                raise CommandError(f"Could not restore {archive}: {exc}")
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Restored %s file versions from %s (ids %s -> %s)"
+                    % (result["restored"], archive, result["from_id"], result["to_id"])
+                )
+            )
@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from propylon_document_manager.file_versions.models import FileVersion
+from propylon_document_manager.file_versions.storage import TieredStorage
+
+
+class Command(BaseCommand):
+    help = (
+        "Move file versions that have not been read for a while to the cold storage tier, "
+        "and cold versions read since back to the hot tier"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Days without a read before a version goes cold (default: FILE_VERSION_TIERING['COLD_AFTER_DAYS'])",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Versions examined per batch")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be moved")
+
+    def handle(self, *args, **options):
+        if not isinstance(FileVersion._meta.get_field("file").storage, TieredStorage):
+            raise CommandError("FILE_VERSION_STORAGE_BACKEND is not a TieredStorage")
+
+        days = options["days"] if options["days"] is not None else settings.FILE_VERSION_TIERING["COLD_AFTER_DAYS"]
+        cutoff = timezone.now() - timedelta(days=days)
+
+        if settings.FILE_VERSION_TIERING["PROMOTE_ON_ACCESS"]:
+            # Downloads serve cold versions as they are; a read since the
+            # version went cold queues it for promotion here.
+            read = FileVersion.objects.filter(storage_tier=FileVersion.COLD, last_accessed_at__gte=cutoff)
+            promoted = self.move(read, FileVersion.HOT, options)
+            verb = "Would promote" if options["dry_run"] else "Promoted"
+            self.stdout.write(self.style.SUCCESS(f"{verb} {promoted} files to the hot tier"))
+
+        stale = FileVersion.objects.filter(storage_tier=FileVersion.HOT, last_accessed_at__lt=cutoff)
+        # A file shared with a recently read version stays hot.
+        moved = self.move(stale, FileVersion.COLD, options, keep=Q(last_accessed_at__gte=cutoff))
+        verb = "Would move" if options["dry_run"] else "Moved"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {moved} files to the cold tier"))
+
+    def move(self, versions, tier: str, options, keep: Q | None = None) -> int:
+        """Move the files of ``versions`` to ``tier`` in batches, sparing files shared with ``keep`` versions."""
+        moved = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                versions.filter(pk__gt=last_pk).order_by("pk").values_list("pk", "file")[: options["batch_size"]]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            names = {name for _, name in batch}
+            if keep is not None:
+                names -= set(FileVersion.all_objects.filter(keep, file__in=names).values_list("file", flat=True))
+            if options["dry_run"]:
+                moved += len(names)
+                continue
+            moved += FileVersion.all_objects.filter(file__in=names).move_to_tier(tier)
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+        return moved
@@ -0,0 +1,103 @@
+"""Negotiated compression of API responses.
+
+Listings repeat the same keys and paths on every row and compress well.
+Rendered (non-streaming) responses of the content types listed in
+``settings.FILE_VERSION_COMPRESSION`` are sent Brotli-compressed when the
+``brotli`` package is installed and the client accepts it, otherwise gzip:
+
+* ``MIN_SIZE`` - bodies smaller than this many bytes are sent as they are
+* ``GZIP_LEVEL`` - zlib compression level, 1 to 9
+* ``BROTLI_QUALITY`` - Brotli quality, 0 to 11
+* ``CONTENT_TYPES`` - media types that are compressed
+
+Downloads are streamed and keep serving byte ranges of the stored file, so
+they are never compressed here.
+"""
+
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _compress_gzip(content: bytes, config: dict) -> bytes:
+    # A fixed mtime keeps the output, and so any ETag derived from it, stable.
+    return gzip.compress(content, compresslevel=config["GZIP_LEVEL"], mtime=0)
+
+
+def _compress_brotli(content: bytes, config: dict) -> bytes:
+    return brotli.compress(content, quality=config["BROTLI_QUALITY"])
+
+
+def available_encodings() -> dict:
+    """Content codings this process can produce, most preferred first."""
+    encodings = {}
+    if brotli is not None:
+        encodings["br"] = _compress_brotli
+    encodings["gzip"] = _compress_gzip
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str, encodings) -> str | None:
+    """Pick the coding of ``encodings`` the ``Accept-Encoding`` header weighs highest.
+
+    Ties go to the earlier entry of ``encodings``; a ``q=0`` weight refuses a
+    coding, including one only matched by ``*``.
+    """
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.lower()] = weight
+    best, best_weight = None, 0.0
+    for coding in encodings:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class ResponseCompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        config = settings.FILE_VERSION_COMPRESSION
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in config["CONTENT_TYPES"] or len(response.content) < config["MIN_SIZE"]:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encodings = available_encodings()
+        coding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), encodings)
+        if coding is None:
+            return response
+        compressed = encodings[coding](response.content, config)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = coding
+        # The encoded body is no longer byte-identical to what a strong ETag named.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
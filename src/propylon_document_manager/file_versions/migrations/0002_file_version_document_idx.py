@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("file_versions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fileversion",
+            index=models.Index(
+                fields=["created_by", "path", "file_name", "version_number"], name="file_version_document_idx"
+            ),
+        ),
+    ]
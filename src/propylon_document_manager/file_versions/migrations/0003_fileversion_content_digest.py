@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:02
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_content_digest(apps, schema_editor):
+    FileVersion = apps.get_model("file_versions", "FileVersion")
+    pending = FileVersion.objects.filter(content_digest="").only("pk", "file")
+    for file_version in pending.iterator(chunk_size=1000):
+        digest = hashlib.sha256()
+        try:
+            with file_version.file.open("rb") as handle:
+                for chunk in handle.chunks():
+                    digest.update(chunk)
+        except FileNotFoundError:
+            continue
+        FileVersion.objects.filter(pk=file_version.pk).update(content_digest=digest.hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("file_versions", "0002_file_version_document_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fileversion",
+            name="content_digest",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name="fileversion",
+            index=models.Index(fields=["created_by", "content_digest"], name="file_version_digest_idx"),
+        ),
+        migrations.RunPython(backfill_content_digest, migrations.RunPython.noop),
+    ]
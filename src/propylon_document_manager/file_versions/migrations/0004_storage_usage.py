@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_storage_usage(apps, schema_editor):
+    FileVersion = apps.get_model("file_versions", "FileVersion")
+    StorageUsage = apps.get_model("file_versions", "StorageUsage")
+    usage = {}
+    per_path = FileVersion.objects.values_list("created_by_id", "path").annotate(size=Sum("file_size"), count=Count("id"))
+    for user_id, path, size, count in per_path.order_by():
+        counter = usage.setdefault((user_id, path.split("/", 1)[0]), [0, 0])
+        counter[0] += size
+        counter[1] += count
+    StorageUsage.objects.bulk_create(
+        StorageUsage(user_id=user_id, prefix=prefix, bytes_used=size, version_count=count)
+        for (user_id, prefix), (size, count) in usage.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("file_versions", "0003_fileversion_content_digest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="storage_quota",
+            field=models.BigIntegerField(
+                blank=True,
+                help_text="Leave empty to apply FILE_VERSION_DEFAULT_STORAGE_QUOTA.",
+                null=True,
+                verbose_name="Storage quota in bytes",
+            ),
+        ),
+        migrations.CreateModel(
+            name="StorageUsage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("prefix", models.TextField()),
+                ("bytes_used", models.BigIntegerField(default=0)),
+                ("version_count", models.BigIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="storage_usage",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("user", "prefix"), name="unique_storage_usage_per_prefix")
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_storage_usage, migrations.RunPython.noop),
+    ]
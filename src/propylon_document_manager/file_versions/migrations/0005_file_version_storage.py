@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:09
+
+import propylon_document_manager.file_versions.models
+import propylon_document_manager.file_versions.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("file_versions", "0004_storage_usage"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="fileversion",
+            name="file",
+            field=models.FileField(
+                storage=propylon_document_manager.file_versions.storage.get_file_version_storage,
+                upload_to=propylon_document_manager.file_versions.models.user_directory_path,
+            ),
+        ),
+    ]
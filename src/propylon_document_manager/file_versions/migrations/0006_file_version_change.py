@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_created_events(apps, schema_editor):
+    FileVersion = apps.get_model("file_versions", "FileVersion")
+    FileVersionChange = apps.get_model("file_versions", "FileVersionChange")
+    batch = []
+    versions = FileVersion.objects.order_by("pk").values_list(
+        "pk", "created_by_id", "path", "file_name", "version_number"
+    )
+    for pk, user_id, path, file_name, version_number in versions.iterator(chunk_size=1000):
+        batch.append(
+            FileVersionChange(
+                kind="created",
+                file_version_id=pk,
+                user_id=user_id,
+                path=path,
+                file_name=file_name,
+                version_number=version_number,
+            )
+        )
+        if len(batch) >= 1000:
+            FileVersionChange.objects.bulk_create(batch)
+            batch.clear()
+    FileVersionChange.objects.bulk_create(batch)
+    # ``auto_now_add`` stamped the events with the migration time.
+    FileVersionChange.objects.update(
+        occurred_at=Subquery(FileVersion.objects.filter(pk=OuterRef("file_version_id")).values("created_at")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("file_versions", "0005_file_version_storage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileVersionChange",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("created", "Created"), ("deleted", "Deleted")], max_length=16)),
+                ("file_version_id", models.BigIntegerField()),
+                ("path", models.TextField()),
+                ("file_name", models.TextField()),
+                ("version_number", models.IntegerField()),
+                ("occurred_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="file_version_changes",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["user", "id"], name="file_version_change_feed_idx")],
+            },
+        ),
+        migrations.RunPython(backfill_created_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("file_versions", "0007_file_version_hash_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fileversion",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="fileversion",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="file_version_deleted_idx",
+            ),
+        ),
+    ]
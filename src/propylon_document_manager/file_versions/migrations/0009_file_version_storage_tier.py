@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:20
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_last_accessed_at(apps, schema_editor):
+    FileVersion = apps.get_model("file_versions", "FileVersion")
+    # Existing versions have not been tracked, so they count from their creation.
+    FileVersion.objects.update(last_accessed_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("file_versions", "0008_file_version_soft_delete"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fileversion",
+            name="last_accessed_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_last_accessed_at, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="fileversion",
+            name="storage_tier",
+            field=models.CharField(choices=[("hot", "Hot"), ("cold", "Cold")], default="hot", max_length=8),
+        ),
+        migrations.AddIndex(
+            model_name="fileversion",
+            index=models.Index(fields=["storage_tier", "last_accessed_at"], name="file_version_tier_idx"),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("file_versions", "0009_file_version_storage_tier"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fileversion",
+            name="download_count",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="fileversion",
+            index=models.Index(fields=["created_by", "-download_count"], name="file_version_popular_idx"),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+
+def mark_existing_deletions_recorded(apps, schema_editor):
+    # Versions soft-deleted so far released their usage when they were marked.
+    FileVersion = apps.get_model("file_versions", "FileVersion")
+    FileVersion.objects.filter(deleted_at__isnull=False).update(deletion_recorded=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("file_versions", "0011_multipart_upload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fileversion",
+            name="deletion_recorded",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_existing_deletions_recorded, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="fileversion",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False), ("deletion_recorded", False)),
+                fields=["id"],
+                name="file_version_unrecorded_idx",
+            ),
+        ),
+    ]
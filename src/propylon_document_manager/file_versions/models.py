@@ -1,12 +1,24 @@
 import hashlib
-import os
+import mimetypes
+import uuid
+from collections import defaultdict
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
-from django.db.models import CharField, EmailField
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from django.db.models import CharField, Count, EmailField, F, Q, Sum
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .access import record_download
+from .api.exceptions import StorageQuotaExceeded
+from .bloom import remember_content
+from .db import immediate_atomic
+from .storage import ChunkedStorage, TieredStorage, get_file_version_storage, get_layout
+from .uploadhandlers import HashedUploadedFile
+
 
 class UserProfileManager(BaseUserManager):
     """Class required by Django for managing our users from the management
@@ -58,6 +70,12 @@ class User(AbstractUser):
     last_name = None  # type: ignore
     email = EmailField(_("email address"), unique=True)
     username = None  # type: ignore
+    storage_quota = models.BigIntegerField(
+        _("Storage quota in bytes"),
+        null=True,
+        blank=True,
+        help_text=_("Leave empty to apply FILE_VERSION_DEFAULT_STORAGE_QUOTA."),
+    )
 
     objects = UserProfileManager()
 
@@ -73,25 +91,254 @@ class User(AbstractUser):
         """
         return reverse("users:detail", kwargs={"pk": self.id})
 
+    def get_storage_quota(self) -> int | None:
+        """Bytes the user may store, or ``None`` for no limit."""
+        if self.storage_quota is not None:
+            return self.storage_quota
+        return settings.FILE_VERSION_DEFAULT_STORAGE_QUOTA
+
+    def remaining_storage(self) -> int | None:
+        """Bytes the user may still store, or ``None`` for no limit."""
+        quota = self.get_storage_quota()
+        if quota is None:
+            return None
+        return quota - StorageUsage.objects.total_bytes(self.pk)
+
+    def storage_quota_allows(self, incoming_bytes: int) -> bool:
+        remaining = self.remaining_storage()
+        return remaining is None or incoming_bytes <= remaining
+
+
+def compute_content_hash(data: bytes, version_number: int, created_by_id: int) -> str:
+    """Hash identifying a single stored revision of a user's file."""
+    return finish_content_hash(hashlib.sha256(data), version_number, created_by_id)
+
+
+def finish_content_hash(hasher, version_number: int, created_by_id: int) -> str:
+    """:func:`compute_content_hash` from a SHA-256 state already fed the file's bytes."""
+    hasher = hasher.copy()
+    hasher.update(str(version_number).encode("utf-8") + str(created_by_id).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _hash_chunks(file):
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    return hasher
+
+
+def _describe_content(storage, file, fields: dict):
+    """Set the size, type and digest of ``file`` in ``fields``.
+
+    A stored blob keeps the size and type the caller gave. Returns the SHA-256
+    state of the content, from which the revision hash is finished.
+    """
+    if isinstance(file, HashedUploadedFile):
+        # Everything was computed while the upload streamed in.
+        hasher = file.hasher
+        fields["file_size"] = file.size
+        fields["mime_type"] = file.sniffed_content_type
+    elif isinstance(file, str):
+        # A stored blob, whose size and type are usually copied from a
+        # version sharing it. The revision hash still covers the bytes.
+        with storage.open(file, "rb") as stored:
+            hasher = _hash_chunks(stored)
+        if "file_size" not in fields:
+            fields["file_size"] = storage.size(file)
+        fields.setdefault("mime_type", mimetypes.guess_type(file)[0] or "")
+    else:
+        hasher = _hash_chunks(file)
+        file.seek(0)
+        fields["file_size"] = file.size
+        fields["mime_type"] = mimetypes.guess_type(file.name)[0] or ""
+    fields["content_digest"] = hasher.hexdigest()
+    return hasher
+
+
+def path_prefix(path: str) -> str:
+    """Top-level directory of ``path``, the granularity of storage usage counters."""
+    return path.split("/", 1)[0]
+
 
 def user_directory_path(instance: "FileVersion", filename: str) -> str:
-    return os.path.join(
-        f"user_{instance.created_by_id}",
-        instance.path,
-        f"rev_{instance.version_number}-{filename}",
-    )
+    return get_layout()(instance, filename)
+
+
+class FileVersionQuerySet(models.QuerySet):
+    def create_next_version(self, user: User, path: str, file_name: str, file, **fields) -> "FileVersion":
+        """Store ``file`` as the next version of the user's ``file_name``.
+
+        ``file`` is either an uploaded file or the name of a blob already in
+        storage, which the new version then references. The content is read
+        before the write transaction opens; within it only the revision hash
+        is finished. The user's quota is checked in the same transaction that
+        records the new usage, so concurrent uploads cannot overrun it together.
+        """
+        field = self.model._meta.get_field("file")
+        hasher = _describe_content(field.storage, file, fields)
+        # Chunked content is written out now as well; under the lock its
+        # manifest is only renamed.
+        stored = None
+        if isinstance(field.storage, ChunkedStorage) and not isinstance(file, str):
+            stored = field.storage.stage(file)
+        try:
+            with immediate_atomic():
+                # Serializes the user's writers on backends without BEGIN IMMEDIATE.
+                list(User.objects.select_for_update().filter(pk=user.pk).values_list("pk"))
+                if not user.storage_quota_allows(fields["file_size"]):
+                    raise StorageQuotaExceeded()
+                # Soft-deleted versions keep their numbers until they are purged.
+                last = (
+                    self.model.all_objects.select_for_update()
+                    .filter(file_name=file_name, created_by=user)
+                    .order_by("-version_number")
+                    .first()
+                )
+                version_number = last.version_number + 1 if last else 1
+                instance = self.model(
+                    file_name=file_name,
+                    version_number=version_number,
+                    created_by=user,
+                    file=file,
+                    path=path,
+                    content_hash=finish_content_hash(hasher, version_number, user.pk),
+                    **fields,
+                )
+                if stored is not None:
+                    stored = field.storage.adopt(stored, field.generate_filename(instance, file.name))
+                    instance.file = stored
+                instance.save(force_insert=True, using=self.db)
+        except BaseException:
+            if stored is not None:
+                field.storage.delete(stored)
+            raise
+
+        remember_content(user.pk, instance.content_digest)
+        return instance
+
+    def under_path(self, path: str):
+        """Versions stored at ``path`` or anywhere below it.
+
+        Expressed as an equality and a range so it stays on the document index.
+        """
+        return self.filter(Q(path=path) | Q(path__gt=f"{path}/", path__lt=f"{path}0"))
+
+    def soft_delete(self) -> int:
+        """Mark the selected versions deleted without touching their files.
+
+        A single ``UPDATE`` of the markers, so the versions disappear from
+        every default queryset at once however many there are. Their storage
+        usage and deletion events follow with :meth:`record_deletions`, and
+        :meth:`purge` removes them later.
+        """
+        return self.filter(deleted_at__isnull=True).update(deleted_at=timezone.now())
+
+    def record_deletions(self, batch_size: int = 500) -> int:
+        """Release the storage usage of soft-deleted versions and log their deletion.
+
+        Versions are recorded ``batch_size`` at a time, each batch in its own
+        short write transaction. Returns the number of versions recorded.
+        """
+        pending = self.filter(deleted_at__isnull=False, deletion_recorded=False).order_by("pk")
+        recorded = 0
+        while True:
+            with immediate_atomic():
+                rows = list(
+                    pending.select_for_update().values_list(
+                        "pk", "created_by_id", "path", "file_name", "version_number", "file_size"
+                    )[:batch_size]
+                )
+                if not rows:
+                    return recorded
+                self.model.all_objects.filter(pk__in=[row[0] for row in rows]).update(deletion_recorded=True)
+                _release_storage(rows)
+            recorded += len(rows)
+
+    def purge(self) -> int:
+        """Delete the selected versions together with their stored files.
+
+        Files still referenced by a remaining version are left in place.
+        Storage is only touched once the row deletion has committed.
+        """
+        rows = list(
+            self.values_list(
+                "pk", "created_by_id", "path", "file_name", "version_number", "file_size", "file", "deletion_recorded"
+            )
+        )
+        if not rows:
+            return 0
+        names = {row[6] for row in rows}
+        with transaction.atomic():
+            deleted, _ = self.model.all_objects.filter(pk__in=[row[0] for row in rows]).delete()
+            shared = set(self.model.all_objects.filter(file__in=names).values_list("file", flat=True))
+            # Recorded deletions already released their usage and were logged.
+            _release_storage([row[:6] for row in rows if not row[7]])
+
+        storage = self.model._meta.get_field("file").storage
+        orphaned = names - shared
+
+        def delete_files():
+            for name in orphaned:
+                storage.delete(name)
+
+        transaction.on_commit(delete_files)
+        return deleted
+
+    def move_to_tier(self, tier: str) -> int:
+        """Move the selected versions' files to ``tier`` of a :class:`TieredStorage`.
+
+        Every version sharing a moved file is updated with it. Returns the
+        number of files moved.
+        """
+        storage = self.model._meta.get_field("file").storage
+        if not isinstance(storage, TieredStorage):
+            raise ImproperlyConfigured("FILE_VERSION_STORAGE_BACKEND is not a TieredStorage")
+        move = storage.demote if tier == self.model.COLD else storage.promote
+        names = set(self.exclude(storage_tier=tier).values_list("file", flat=True))
+        moved = sum(move(name) for name in sorted(names))
+        self.model.all_objects.filter(file__in=names).update(storage_tier=tier)
+        return moved
+
+
+def _release_storage(rows):
+    """Give back the usage of deleted ``rows`` and log their deletion.
+
+    ``rows`` are ``FileVersion.change_row()`` tuples followed by the file size.
+    """
+    freed = defaultdict(lambda: [0, 0])
+    for row in rows:
+        counter = freed[row[1], path_prefix(row[2])]
+        counter[0] += row[5]
+        counter[1] += 1
+    for (user_id, prefix), (size, count) in freed.items():
+        StorageUsage.objects.record(user_id, prefix, -size, -count)
+    FileVersionChange.objects.record(FileVersionChange.DELETED, [row[:5] for row in rows])
+
+
+class LiveFileVersionManager(models.Manager.from_queryset(FileVersionQuerySet)):
+    """Hides soft-deleted versions."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 
 class FileVersion(models.Model):
+    HOT = "hot"
+    COLD = "cold"
+    STORAGE_TIERS = [(HOT, "Hot"), (COLD, "Cold")]
+
     file_name = models.fields.TextField()
     version_number = models.fields.IntegerField()
     path = models.fields.TextField()
 
-    file = models.FileField(upload_to=user_directory_path)
+    file = models.FileField(upload_to=user_directory_path, storage=get_file_version_storage)
 
     file_size = models.BigIntegerField()
     mime_type = models.TextField()
     content_hash = models.TextField()
+    # SHA-256 of the stored bytes alone, shared by versions with identical content.
+    content_digest = models.CharField(max_length=64, blank=True, default="")
 
     created_by = models.ForeignKey(
         User,
@@ -102,6 +349,17 @@ class FileVersion(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set by soft deletion; the row and its file go once the version is purged.
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    # Set once a soft deletion has released its storage usage and been logged.
+    deletion_recorded = models.BooleanField(default=False)
+    storage_tier = models.CharField(max_length=8, choices=STORAGE_TIERS, default=HOT)
+    # Both maintained by downloads through the buffer in file_versions.access.
+    last_accessed_at = models.DateTimeField(default=timezone.now)
+    download_count = models.BigIntegerField(default=0)
+
+    objects = LiveFileVersionManager()
+    all_objects = FileVersionQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -110,20 +368,247 @@ class FileVersion(models.Model):
                 name="unique_file_version_per_user",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["created_by", "path", "file_name", "version_number"],
+                name="file_version_document_idx",
+            ),
+            models.Index(
+                fields=["created_by", "content_digest"],
+                name="file_version_digest_idx",
+            ),
+            models.Index(
+                fields=["created_by", "content_hash"],
+                name="file_version_hash_idx",
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                condition=Q(deleted_at__isnull=False),
+                name="file_version_deleted_idx",
+            ),
+            models.Index(
+                fields=["id"],
+                condition=Q(deleted_at__isnull=False, deletion_recorded=False),
+                name="file_version_unrecorded_idx",
+            ),
+            models.Index(
+                fields=["storage_tier", "last_accessed_at"],
+                name="file_version_tier_idx",
+            ),
+            models.Index(
+                fields=["created_by", "-download_count"],
+                name="file_version_popular_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.pk or "file" in self.get_deferred_fields():
-            data = self.file.read()
-            hash_data = (
-                data
-                + str(self.version_number).encode("utf-8")
-                + str(self.created_by_id).encode("utf-8")
+        # create_next_version describes the content before its transaction.
+        if not self.content_hash and (not self.pk or "file" in self.get_deferred_fields()):
+            fields = {}
+            file = self.file.file if not self.file._committed else self.file.name
+            hasher = _describe_content(self.file.storage, file, fields)
+            for field, value in fields.items():
+                setattr(self, field, value)
+            self.content_hash = finish_content_hash(hasher, self.version_number, self.created_by_id)
+
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                StorageUsage.objects.record(self.created_by_id, self.path, self.file_size)
+                FileVersionChange.objects.record(FileVersionChange.CREATED, [self.change_row()])
+
+    def delete(self, *args, **kwargs):
+        row = (*self.change_row(), self.file_size)
+        with transaction.atomic():
+            deleted = super().delete(*args, **kwargs)
+            if not self.deletion_recorded:
+                _release_storage([row])
+        return deleted
+
+    def record_access(self):
+        """Count a download of the version.
+
+        A cold version is served from the cold tier; the access it records
+        queues it for promotion by ``tier_file_versions``.
+        """
+        record_download(self.pk)
+
+    def change_row(self) -> tuple:
+        return (self.pk, self.created_by_id, self.path, self.file_name, self.version_number)
+
+
+class StorageUsageQuerySet(models.QuerySet):
+    def record(self, user_id: int, path: str, size: int, count: int = 1):
+        """Add ``size`` bytes and ``count`` versions to the counter of ``path``'s prefix.
+
+        Callers run this in the transaction that writes the versions, so the
+        counters commit or roll back together with them.
+        """
+        prefix = path_prefix(path)
+        changes = {"bytes_used": F("bytes_used") + size, "version_count": F("version_count") + count}
+        if self.filter(user_id=user_id, prefix=prefix).update(**changes):
+            return
+        usage, created = self.get_or_create(
+            user_id=user_id, prefix=prefix, defaults={"bytes_used": size, "version_count": count}
+        )
+        if not created:
+            self.filter(pk=usage.pk).update(**changes)
+
+    def total_bytes(self, user_id: int) -> int:
+        return self.filter(user_id=user_id).aggregate(total=Sum("bytes_used"))["total"] or 0
+
+    def reconcile(self, user_ids=None, dry_run: bool = False) -> int:
+        """Recompute the counters from the stored versions.
+
+        Returns the number of counters that had drifted.
+        """
+        if user_ids is None:
+            user_ids = User.objects.filter(
+                models.Q(file_versions__isnull=False) | models.Q(storage_usage__isnull=False)
+            ).distinct()
+            user_ids = user_ids.order_by("pk").values_list("pk", flat=True)
+
+        drifted = 0
+        for user_id in user_ids:
+            with immediate_atomic():
+                actual = defaultdict(lambda: [0, 0])
+                # Soft-deleted versions count until their deletion is recorded.
+                per_path = (
+                    FileVersion.all_objects.filter(created_by_id=user_id, deletion_recorded=False)
+                    .values_list("path")
+                    .annotate(size=Sum("file_size"), count=Count("id"))
+                    .order_by()
+                )
+                for path, size, count in per_path:
+                    counter = actual[path_prefix(path)]
+                    counter[0] += size
+                    counter[1] += count
+                recorded = {usage.prefix: usage for usage in self.select_for_update().filter(user_id=user_id)}
+
+                for prefix, (size, count) in actual.items():
+                    usage = recorded.pop(prefix, None)
+                    if usage is not None and (usage.bytes_used, usage.version_count) == (size, count):
+                        continue
+                    drifted += 1
+                    if dry_run:
+                        continue
+                    self.update_or_create(
+                        user_id=user_id, prefix=prefix, defaults={"bytes_used": size, "version_count": count}
+                    )
+                stale = [usage.pk for usage in recorded.values() if usage.bytes_used or usage.version_count]
+                drifted += len(stale)
+                if not dry_run:
+                    self.filter(pk__in=[usage.pk for usage in recorded.values()]).delete()
+        return drifted
+
+
+class StorageUsage(models.Model):
+    """Bytes and versions a user stores under one top-level path prefix.
+
+    Maintained incrementally by version creation and deletion so that usage
+    and quota checks never aggregate over ``FileVersion``.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="storage_usage")
+    prefix = models.TextField()
+    bytes_used = models.BigIntegerField(default=0)
+    version_count = models.BigIntegerField(default=0)
+
+    objects = StorageUsageQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "prefix"], name="unique_storage_usage_per_prefix"),
+        ]
+
+
+class FileVersionChangeQuerySet(models.QuerySet):
+    def record(self, kind: str, rows):
+        """Append ``kind`` events for ``rows`` of ``FileVersion.change_row()`` tuples.
+
+        The owners' rows are locked first, so each user's events are numbered
+        in commit order and a client that has read up to a cursor can never
+        see an earlier-numbered event appear later.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        user_ids = sorted({row[1] for row in rows})
+        list(User.objects.select_for_update().filter(pk__in=user_ids).order_by("pk").values_list("pk"))
+        self.bulk_create(
+            self.model(
+                kind=kind,
+                file_version_id=file_version_id,
+                user_id=user_id,
+                path=path,
+                file_name=file_name,
+                version_number=version_number,
             )
-            self.content_hash = hashlib.sha256(hash_data).hexdigest()
-            self.file_size = len(data)
-            import mimetypes
+            for file_version_id, user_id, path, file_name, version_number in rows
+        )
+
+    def since(self, user_id: int, cursor: int):
+        return self.filter(user_id=user_id, pk__gt=cursor).order_by("pk")
 
-            self.mime_type = mimetypes.guess_type(self.file.name)[0] or ""
-            self.file.seek(0)
 
-        super().save(*args, **kwargs)
+class FileVersionChange(models.Model):
+    """Append-only log of version creations and deletions.
+
+    The primary key is the sync cursor: a client that has applied every
+    change up to ``id`` asks for the changes after it.
+    """
+
+    CREATED = "created"
+    DELETED = "deleted"
+    KINDS = [(CREATED, "Created"), (DELETED, "Deleted")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="file_version_changes")
+    kind = models.CharField(max_length=16, choices=KINDS)
+    # Not a foreign key: the version is gone by the time its deletion is read.
+    file_version_id = models.BigIntegerField()
+    path = models.TextField()
+    file_name = models.TextField()
+    version_number = models.IntegerField()
+    occurred_at = models.DateTimeField(auto_now_add=True)
+
+    objects = FileVersionChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="file_version_change_feed_idx"),
+        ]
+
+
+class MultipartUpload(models.Model):
+    """A file version being uploaded as independently sent parts.
+
+    Parts are spooled under ``FILE_UPLOAD_TEMP_DIR`` (see
+    :mod:`.multipart`) until the upload is completed into a version or
+    aborted.
+    """
+
+    OPEN = "open"
+    COMPLETING = "completing"
+    STATES = [(OPEN, "Open"), (COMPLETING, "Completing")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="multipart_uploads")
+    path = models.TextField()
+    file_name = models.TextField()
+    state = models.CharField(max_length=16, choices=STATES, default=OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class MultipartUploadPart(models.Model):
+    upload = models.ForeignKey(MultipartUpload, on_delete=models.CASCADE, related_name="parts")
+    part_number = models.PositiveIntegerField()
+    size = models.BigIntegerField()
+    # SHA-256 of the part, computed while it was received.
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ["part_number"]
+        constraints = [
+            models.UniqueConstraint(fields=["upload", "part_number"], name="unique_multipart_upload_part"),
+        ]
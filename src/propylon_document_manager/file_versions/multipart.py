@@ -0,0 +1,61 @@
+"""Spooled parts of multipart uploads.
+
+Every part of a :class:`~.models.MultipartUpload` arrives on a request of its
+own, so clients send parts concurrently over several connections and each
+part is hashed by the worker receiving it. Parts are kept as
+``<FILE_UPLOAD_TEMP_DIR>/multipart/<upload id>/<part number>``.
+
+Completing an upload concatenates the parts into a single spooled file. The
+SHA-256 of the whole file cannot be derived from the part digests, so it is
+computed in that same pass; the result is then committed into storage like
+any other spooled upload, by rename rather than another copy.
+"""
+
+import os
+import shutil
+
+from django.conf import settings
+
+from .uploadhandlers import SNIFF_BYTES, HashedUploadedFile, sniff_mime_type
+
+COPY_SIZE = 4 * 1024 * 1024
+
+
+def upload_directory(upload_id) -> str:
+    return os.path.join(settings.FILE_UPLOAD_TEMP_DIR, "multipart", str(upload_id))
+
+
+def part_path(upload_id, part_number: int) -> str:
+    return os.path.join(upload_directory(upload_id), str(part_number))
+
+
+def store_part(upload_id, part_number: int, spooled: HashedUploadedFile):
+    """Move a received part into place, replacing an earlier attempt at it."""
+    path = part_path(upload_id, part_number)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(spooled.temporary_file_path(), path)
+
+
+def assemble(upload, part_numbers: list[int]) -> HashedUploadedFile:
+    """Concatenate the given parts of ``upload`` into one spooled file."""
+    assembled = HashedUploadedFile(upload.file_name, "application/octet-stream", 0, None)
+    try:
+        for part_number in part_numbers:
+            with open(part_path(upload.pk, part_number), "rb") as part:
+                while block := part.read(COPY_SIZE):
+                    assembled.hasher.update(block)
+                    if len(assembled.head) < SNIFF_BYTES:
+                        assembled.head += block[: SNIFF_BYTES - len(assembled.head)]
+                    assembled.write(block)
+                    assembled.size += len(block)
+        assembled.flush()
+        assembled.seek(0)
+    except Exception:
+        assembled.close()
+        raise
+    assembled.sniffed_content_type = sniff_mime_type(assembled.head, upload.file_name)
+    return assembled
+
+
+def discard(upload_id):
+    shutil.rmtree(upload_directory(upload_id), ignore_errors=True)
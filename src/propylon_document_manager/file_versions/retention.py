@@ -0,0 +1,107 @@
+"""Version retention policies.
+
+Policies are configured through ``settings.FILE_VERSION_RETENTION_POLICIES``,
+a list of dictionaries evaluated in order; the first policy matching a
+document's owner and path applies::
+
+    FILE_VERSION_RETENTION_POLICIES = [
+        {"user": "archivist@propylon.com", "keep_last": 50},
+        {"path_prefix": "drafts", "keep_last": 5, "keep_daily_days": 30},
+        {"keep_last": 10, "keep_daily_days": 30, "keep_monthly": True},
+    ]
+
+A version is retained when any rule of its policy selects it:
+
+* ``keep_last`` - the N highest version numbers
+* ``keep_daily_days`` - the newest version of each of the last N days
+* ``keep_monthly`` - the newest version of each calendar month, limited to
+  the last ``keep_monthly_months`` months when that is set
+
+The latest version of a document is always retained, and documents not
+matched by any policy are never pruned.
+"""
+
+import datetime
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    user: str | None = None
+    path_prefix: str | None = None
+    keep_last: int | None = None
+    keep_daily_days: int | None = None
+    keep_monthly: bool = False
+    keep_monthly_months: int | None = None
+
+    def matches(self, user_email: str, path: str) -> bool:
+        if self.user is not None and self.user != user_email:
+            return False
+        if self.path_prefix is not None:
+            prefix = self.path_prefix.rstrip("/")
+            if path != prefix and not path.startswith(prefix + "/"):
+                return False
+        return True
+
+    def prune(self, versions: list[tuple[int, int, datetime.datetime]], now: datetime.datetime) -> list[int]:
+        """Return the pks of ``versions`` this policy does not retain.
+
+        ``versions`` holds ``(pk, version_number, created_at)`` tuples of a
+        single document.
+        """
+        if not versions:
+            return []
+        newest_first = sorted(versions, key=lambda version: version[1], reverse=True)
+        keep = {newest_first[0][0]}
+
+        if self.keep_last:
+            keep.update(pk for pk, _, _ in newest_first[: self.keep_last])
+
+        if self.keep_daily_days:
+            first_day = timezone.localdate(now) - datetime.timedelta(days=self.keep_daily_days - 1)
+            keep.update(self._newest_per_bucket(newest_first, lambda day: day if day >= first_day else None))
+
+        if self.keep_monthly:
+            today = timezone.localdate(now)
+            current_month = today.year * 12 + today.month - 1
+            months = self.keep_monthly_months
+
+            def month_bucket(day):
+                month = day.year * 12 + day.month - 1
+                if months is not None and current_month - month >= months:
+                    return None
+                return month
+
+            keep.update(self._newest_per_bucket(newest_first, month_bucket))
+
+        return [pk for pk, _, _ in newest_first if pk not in keep]
+
+    @staticmethod
+    def _newest_per_bucket(newest_first, bucket_for):
+        seen = set()
+        for pk, _, created_at in newest_first:
+            bucket = bucket_for(timezone.localdate(created_at))
+            if bucket is not None and bucket not in seen:
+                seen.add(bucket)
+                yield pk
+
+
+def get_policies() -> list[RetentionPolicy]:
+    policies = []
+    for config in getattr(settings, "FILE_VERSION_RETENTION_POLICIES", []):
+        try:
+            policies.append(RetentionPolicy(**config))
+        except TypeError as exc:
+            raise ImproperlyConfigured(f"Invalid FILE_VERSION_RETENTION_POLICIES entry {config!r}: {exc}")
+    return policies
+
+
+def policy_for(policies: list[RetentionPolicy], user_email: str, path: str) -> RetentionPolicy | None:
+    for policy in policies:
+        if policy.matches(user_email, path):
+            return policy
+    return None
@@ -0,0 +1,457 @@
+"""Storage of uploaded file versions.
+
+A layout is a callable ``(instance, filename) -> str`` returning the storage
+name of a version; ``settings.FILE_VERSION_STORAGE_LAYOUT`` selects the one
+used by ``FileVersion.file``. The layout only relies on the version's owner,
+path, number and file name, so the name of any existing row can be
+recomputed without reading its contents (see the ``relayout_file_versions``
+command).
+
+``settings.FILE_VERSION_STORAGE_BACKEND`` names the storage class itself;
+:class:`CommittingFileSystemStorage` is the default,
+:class:`TieredStorage` adds a cold tier for rarely read versions and
+:class:`ChunkedStorage` deduplicates content below the file level.
+"""
+
+import errno
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.utils.module_loading import import_string
+
+from .chunking import ChunkReader, iter_chunks
+
+FSYNC_POLICIES = ("none", "file", "directory")
+
+
+def flat_layout(instance, filename: str) -> str:
+    """``user_<id>/<path>/rev_<n>-<filename>``, one directory per document path."""
+    return os.path.join(
+        f"user_{instance.created_by_id}",
+        instance.path,
+        f"rev_{instance.version_number}-{filename}",
+    )
+
+
+def sharded_layout(instance, filename: str) -> str:
+    """:func:`flat_layout` fanned out over hash-prefix subdirectories.
+
+    ``FILE_VERSION_STORAGE_FANOUT_DEPTH`` levels of two hex digits are
+    inserted below the user directory, so even a single flat path holding
+    millions of revisions spreads over ``256 ** depth`` leaf directories.
+    """
+    depth = settings.FILE_VERSION_STORAGE_FANOUT_DEPTH
+    flat_name = flat_layout(instance, filename)
+    digest = hashlib.sha256(flat_name.encode("utf-8")).hexdigest()
+    shards = [digest[level * 2 : level * 2 + 2] for level in range(depth)]
+    return os.path.join(
+        f"user_{instance.created_by_id}",
+        *shards,
+        instance.path,
+        f"rev_{instance.version_number}-{filename}",
+    )
+
+
+def get_layout():
+    return import_string(settings.FILE_VERSION_STORAGE_LAYOUT)
+
+
+class CommittingFileSystemStorage(FileSystemStorage):
+    """File system storage that commits spooled uploads without copying them.
+
+    Uploads spooled to ``FILE_UPLOAD_TEMP_DIR`` on the same file system as
+    ``MEDIA_ROOT`` are hard-linked into place and the temporary name is then
+    removed: a rename that, unlike ``os.rename``, never replaces a file that
+    appeared under the target name in the meantime. Across devices, or where
+    hard links are unsupported, the upload is copied as ``FileSystemStorage``
+    does.
+
+    ``FILE_VERSION_STORAGE_FSYNC`` decides what is flushed to disk before a
+    save returns: ``"none"``, the ``"file"`` contents, or additionally the
+    ``"directory"`` entry pointing at it.
+    """
+
+    def __init__(self, *args, fsync: str | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fsync = fsync
+
+    @property
+    def fsync(self) -> str:
+        policy = self._fsync or settings.FILE_VERSION_STORAGE_FSYNC
+        if policy not in FSYNC_POLICIES:
+            raise ImproperlyConfigured(f"FILE_VERSION_STORAGE_FSYNC must be one of {', '.join(FSYNC_POLICIES)}")
+        return policy
+
+    def _save(self, name, content):
+        if not hasattr(content, "temporary_file_path"):
+            name = super()._save(name, content)
+            self._sync(self.path(name))
+            return name
+
+        content.flush()
+        if self.fsync != "none":
+            os.fsync(content.fileno())
+        source = content.temporary_file_path()
+        directory = os.path.dirname(self.path(name))
+        if self.directory_permissions_mode is not None:
+            os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        while True:
+            full_path = self.path(name)
+            try:
+                os.link(source, full_path)
+            except FileExistsError:
+                name = self.get_available_name(name)
+            except OSError as exc:
+                if exc.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                    raise
+                name = super()._save(name, content)
+                self._sync(self.path(name))
+                return name
+            else:
+                break
+
+        # TemporaryUploadedFile.close(), which Django calls on request files,
+        # tolerates the temporary name being gone. Cleanup by the garbage
+        # collector does not, so callers must close the upload themselves.
+        os.unlink(source)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        if self.fsync == "directory":
+            self._sync_directory(directory)
+        return str(os.path.relpath(full_path, self.location)).replace("\\", "/")
+
+    def _sync(self, full_path: str):
+        if self.fsync == "none":
+            return
+        fd = os.open(full_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        if self.fsync == "directory":
+            self._sync_directory(os.path.dirname(full_path))
+
+    @staticmethod
+    def _sync_directory(directory: str):
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class TieredStorage(CommittingFileSystemStorage):
+    """:class:`CommittingFileSystemStorage` backed by a cheaper cold tier.
+
+    New files are written to the hot tier (``MEDIA_ROOT``). :meth:`demote`
+    moves a file to the storage configured by ``settings.FILE_VERSION_TIERING``
+    (``COLD_BACKEND`` built with ``COLD_OPTIONS``, gzip-compressed when
+    ``COMPRESS`` is set) and :meth:`promote` brings it back. A file keeps its
+    name in either tier, so reads find it wherever it currently is and rows
+    never need repointing. :meth:`path` is always the hot tier's.
+    """
+
+    COMPRESSED_SUFFIX = ".gz"
+
+    @property
+    def cold(self) -> Storage:
+        config = settings.FILE_VERSION_TIERING
+        return import_string(config["COLD_BACKEND"])(**config["COLD_OPTIONS"])
+
+    @property
+    def compress(self) -> bool:
+        return settings.FILE_VERSION_TIERING["COMPRESS"]
+
+    def _cold_name(self, name: str) -> str:
+        return name + self.COMPRESSED_SUFFIX if self.compress else name
+
+    def _open(self, name, mode="rb"):
+        # A file may change tiers between looking for it and opening it, so
+        # the hot tier is tried again after the cold one.
+        try:
+            return super()._open(name, mode)
+        except FileNotFoundError:
+            pass
+        cold, cold_name = self.cold, self._cold_name(name)
+        if cold.exists(cold_name):
+            handle = cold.open(cold_name, mode)
+            return _DecompressedFile(handle, name) if self.compress else handle
+        return super()._open(name, mode)
+
+    def is_hot(self, name: str) -> bool:
+        return super().exists(name)
+
+    def exists(self, name):
+        return super().exists(name) or self.cold.exists(self._cold_name(name))
+
+    def delete(self, name):
+        super().delete(name)
+        self.cold.delete(self._cold_name(name))
+
+    def size(self, name):
+        if self.is_hot(name):
+            return super().size(name)
+        if not self.compress:
+            return self.cold.size(name)
+        with self.open(name, "rb") as handle:
+            return handle.seek(0, os.SEEK_END)
+
+    def demote(self, name: str) -> bool:
+        """Move ``name`` to the cold tier; ``False`` if it is not in the hot tier."""
+        if not self.is_hot(name):
+            return False
+        cold, cold_name = self.cold, self._cold_name(name)
+        cold.delete(cold_name)
+        with super()._open(name, "rb") as source:
+            if self.compress:
+                with _gzipped(source) as compressed:
+                    cold.save(cold_name, File(compressed, name=cold_name))
+            else:
+                cold.save(cold_name, source)
+        # The cold copy is complete before the hot one goes, so the file is
+        # always readable from at least one tier.
+        super().delete(name)
+        return True
+
+    def promote(self, name: str) -> bool:
+        """Move ``name`` back to the hot tier; ``False`` if it is not in the cold tier.
+
+        Concurrent promotions of one file each copy to their own temporary
+        name and the last rename wins, which is harmless as they carry the
+        same contents.
+        """
+        cold, cold_name = self.cold, self._cold_name(name)
+        if self.is_hot(name) or not cold.exists(cold_name):
+            return False
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        partial = f"{full_path}.{uuid.uuid4().hex}.promoting"
+        try:
+            # Reads whichever tier has the file by now, so losing a race to
+            # another promotion is not an error.
+            with self._open(name, "rb") as source:
+                fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+                with os.fdopen(fd, "wb") as target:
+                    shutil.copyfileobj(source, target)
+                    if self.fsync != "none":
+                        target.flush()
+                        os.fsync(target.fileno())
+            if self.file_permissions_mode is not None:
+                os.chmod(partial, self.file_permissions_mode)
+            os.replace(partial, full_path)
+        finally:
+            if os.path.exists(partial):
+                os.unlink(partial)
+        if self.fsync == "directory":
+            self._sync_directory(os.path.dirname(full_path))
+        cold.delete(cold_name)
+        return True
+
+
+class _DecompressedFile(File):
+    """Reads a gzip-compressed cold file as its original contents."""
+
+    def __init__(self, compressed, name: str):
+        self.compressed = compressed
+        super().__init__(gzip.GzipFile(fileobj=compressed, mode="rb"), name=name)
+
+    @property
+    def size(self) -> int:
+        position = self.file.tell()
+        size = self.file.seek(0, os.SEEK_END)
+        self.file.seek(position)
+        return size
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.compressed.close()
+
+
+def _gzipped(source):
+    """Temporary file holding the gzip-compressed contents of ``source``."""
+    spooled = tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR)
+    with gzip.GzipFile(fileobj=spooled, mode="wb") as compressed:
+        shutil.copyfileobj(source, compressed)
+    spooled.seek(0)
+    return spooled
+
+
+class ChunkedStorage(CommittingFileSystemStorage):
+    """File system storage keeping each distinct content-defined chunk once.
+
+    A saved file is split by :func:`~.chunking.iter_chunks`; chunks go to
+    ``chunks/<aa>/<bb>/<sha256>`` unless already stored, and the file's own
+    name holds a JSON manifest listing them. Revisions of a large document
+    that differ in a few places therefore only add their changed chunks.
+    Reads stream the chunks back in order.
+
+    Chunking is slow, so :meth:`stage` does it under a temporary name
+    before a version's row is written, and :meth:`adopt` then only renames
+    the manifest. Deleting a file removes its manifest only; the
+    ``collect_chunks`` command deletes chunks no manifest refers to any more.
+    Chunked files have no single local :meth:`path`.
+    """
+
+    CHUNK_DIRECTORY = "chunks"
+    STAGING_DIRECTORY = "staging"
+    MANIFEST_FORMAT = "chunked-v1"
+
+    def path(self, name):
+        raise NotImplementedError("Chunked files have no local path")
+
+    def _full_path(self, name: str) -> str:
+        return super().path(name)
+
+    def chunk_name(self, digest: str) -> str:
+        return f"{self.CHUNK_DIRECTORY}/{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def _save(self, name, content):
+        while True:
+            content.seek(0)
+            chunks = [(self._store_chunk(data), len(data)) for data in iter_chunks(content)]
+            # collect_chunks may have removed a reused chunk since it was stored.
+            # Touching every chunk just before the manifest is written detects
+            # that, and keeps them all within the collector's grace period.
+            if self._touch_chunks(digest for digest, _ in chunks):
+                break
+        manifest = {
+            "format": self.MANIFEST_FORMAT,
+            "size": sum(size for _, size in chunks),
+            "chunks": chunks,
+        }
+        data = json.dumps(manifest, separators=(",", ":")).encode()
+        while True:
+            full_path = self._full_path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                fd = os.open(full_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+            except FileExistsError:
+                name = self.get_available_name(name)
+                continue
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            break
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        self._sync(full_path)
+        return name
+
+    def stage(self, content) -> str:
+        """Store ``content`` under a temporary name, to be given its own by :meth:`adopt`."""
+        return self.save(f"{self.STAGING_DIRECTORY}/{uuid.uuid4().hex}", content)
+
+    def adopt(self, staged: str, name: str) -> str:
+        """Rename the staged manifest to ``name`` or, if taken, an available variant of it."""
+        while True:
+            full_path = self._full_path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(self._full_path(staged), full_path)
+            except FileExistsError:
+                name = self.get_available_name(name)
+            else:
+                break
+        os.remove(self._full_path(staged))
+        if self.fsync == "directory":
+            self._sync_directory(os.path.dirname(full_path))
+        return name
+
+    def _store_chunk(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        full_path = self._full_path(self.chunk_name(digest))
+        if self._touch_chunks([digest]):
+            return digest
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        partial = f"{full_path}.{uuid.uuid4().hex}.partial"
+        with open(partial, "wb") as handle:
+            handle.write(data)
+            if self.fsync != "none":
+                handle.flush()
+                os.fsync(handle.fileno())
+        # Identical content, so a concurrent writer of the same chunk is harmless.
+        os.replace(partial, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        if self.fsync == "directory":
+            self._sync_directory(os.path.dirname(full_path))
+        return digest
+
+    def _touch_chunks(self, digests) -> bool:
+        """Refresh the chunks' modification times; ``False`` if one is missing.
+
+        collect_chunks spares chunks modified within its grace period.
+        """
+        for digest in digests:
+            try:
+                os.utime(self._full_path(self.chunk_name(digest)))
+            except FileNotFoundError:
+                return False
+        return True
+
+    def manifest(self, name: str) -> dict:
+        with open(self._full_path(name), "rb") as handle:
+            return json.load(handle)
+
+    def referenced_chunks(self) -> set[str]:
+        """Digests of the chunks listed by any manifest in the storage."""
+        header = f'{{"format":"{self.MANIFEST_FORMAT}"'.encode()
+        chunk_root = self._full_path(self.CHUNK_DIRECTORY)
+        referenced = set()
+        for directory, subdirectories, files in os.walk(self.location):
+            if directory == self.location:
+                # Spooled uploads and the like live in hidden directories.
+                subdirectories[:] = [entry for entry in subdirectories if not entry.startswith(".")]
+            if directory == chunk_root or directory.startswith(chunk_root + os.sep):
+                subdirectories.clear()
+                continue
+            for file_name in files:
+                try:
+                    handle = open(os.path.join(directory, file_name), "rb")
+                except FileNotFoundError:
+                    continue
+                with handle:
+                    if handle.read(len(header)) != header:
+                        continue
+                    handle.seek(0)
+                    referenced.update(digest for digest, _ in json.load(handle)["chunks"])
+        return referenced
+
+    def _open(self, name, mode="rb"):
+        chunks = self.manifest(name)["chunks"]
+        reader = ChunkReader(chunks, lambda digest: open(self._full_path(self.chunk_name(digest)), "rb"))
+        chunked = File(io.BufferedReader(reader), name=name)
+        chunked.size = reader.size
+        return chunked
+
+    def exists(self, name):
+        return os.path.lexists(self._full_path(name))
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        try:
+            os.remove(self._full_path(name))
+        except FileNotFoundError:
+            pass
+
+    def size(self, name):
+        return self.manifest(name)["size"]
+
+
+def get_file_version_storage():
+    return import_string(settings.FILE_VERSION_STORAGE_BACKEND)()
@@ -0,0 +1,154 @@
+"""Size-bounded previews of stored file versions.
+
+Thumbnails are rendered on first request and stored next to the versions
+under ``thumbnails/``, keyed by content digest and size, so every version
+with the same bytes shares them and a rendition never needs invalidation.
+Images are rendered with Pillow; the first page of a PDF is rasterised with
+``pdftoppm`` (poppler-utils) when it is installed.
+
+Concurrent requests for the same missing thumbnail render it once: they
+queue on a lock file, which serialises threads as well as processes, and
+all but the first then find the stored rendition.
+
+Configured through ``settings.FILE_VERSION_THUMBNAILS``:
+
+* ``SIZES`` - the bounding box edges, in pixels, clients may ask for
+* ``FORMAT`` / ``QUALITY`` - Pillow output format and encoder quality
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import locks
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+THUMBNAIL_PREFIX = "thumbnails"
+PDF_RENDER_TIMEOUT = 30
+
+
+def thumbnail_format() -> tuple[str, str]:
+    """Pillow format name and file extension of the configured output format."""
+    image_format = settings.FILE_VERSION_THUMBNAILS["FORMAT"].upper()
+    extensions = [extension for extension, name in Image.registered_extensions().items() if name == image_format]
+    return image_format, extensions[0] if extensions else f".{image_format.lower()}"
+
+
+def thumbnail_content_type() -> str:
+    image_format, _ = thumbnail_format()
+    return Image.MIME.get(image_format, "application/octet-stream")
+
+
+def can_render(mime_type: str) -> bool:
+    if mime_type == "application/pdf":
+        return shutil.which("pdftoppm") is not None
+    return mime_type.startswith("image/") and mime_type != "image/svg+xml"
+
+
+def thumbnail_name(digest: str, size: int) -> str:
+    _, extension = thumbnail_format()
+    return f"{THUMBNAIL_PREFIX}/{digest[:2]}/{digest}-{size}{extension}"
+
+
+def render_image(handle, size: int) -> bytes:
+    image_format, _ = thumbnail_format()
+    with Image.open(handle) as image:
+        # JPEG decoders can scale while decoding, which is far cheaper than resizing afterwards.
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        if image_format == "JPEG" and image.mode == "RGBA":
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, image_format, quality=settings.FILE_VERSION_THUMBNAILS["QUALITY"])
+    return output.getvalue()
+
+
+def render_pdf(source_path: str, size: int) -> bytes:
+    with tempfile.TemporaryDirectory() as directory:
+        prefix = os.path.join(directory, "page")
+        subprocess.run(
+            ["pdftoppm", "-f", "1", "-l", "1", "-singlefile", "-png", "-scale-to", str(size), source_path, prefix],
+            check=True,
+            capture_output=True,
+            timeout=PDF_RENDER_TIMEOUT,
+        )
+        with open(prefix + ".png", "rb") as page:
+            return render_image(page, size)
+
+
+@contextmanager
+def _source_path(file_version):
+    """A local path of the version's contents, spooled when storage has none."""
+    try:
+        path = file_version.file.path
+    except NotImplementedError:
+        path = None
+    # A TieredStorage path only exists while the file is in the hot tier.
+    if path is not None and os.path.exists(path):
+        yield path
+        return
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as spooled:
+        with file_version.file.open("rb") as handle:
+            shutil.copyfileobj(handle, spooled)
+        spooled.flush()
+        yield spooled.name
+
+
+def render_thumbnail(file_version, size: int) -> bytes | None:
+    """Render a thumbnail of ``file_version``, or ``None`` if it cannot be previewed."""
+    try:
+        if file_version.mime_type == "application/pdf":
+            with _source_path(file_version) as source_path:
+                return render_pdf(source_path, size)
+        with file_version.file.open("rb") as handle:
+            return render_image(handle, size)
+    except (OSError, ValueError, Image.DecompressionBombError, subprocess.SubprocessError):
+        return None
+
+
+@contextmanager
+def _rendering_lock(key: str):
+    """Serialise rendering of ``key`` across threads and processes.
+
+    Keys are striped over a fixed set of lock files, so the lock directory
+    never grows with the number of thumbnails.
+    """
+    stripe = hashlib.sha256(key.encode("utf-8")).hexdigest()[:2]
+    lock_directory = os.path.join(settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir(), "thumbnail-locks")
+    os.makedirs(lock_directory, exist_ok=True)
+    with open(os.path.join(lock_directory, stripe), "wb") as lock_file:
+        locks.lock(lock_file, locks.LOCK_EX)
+        try:
+            yield
+        finally:
+            locks.unlock(lock_file)
+
+
+def get_thumbnail(file_version, size: int) -> str | None:
+    """Storage name of the ``size`` thumbnail of ``file_version``, rendering it if needed.
+
+    Returns ``None`` when the version cannot be previewed.
+    """
+    if not can_render(file_version.mime_type):
+        return None
+    storage = file_version.file.storage
+    digest = file_version.content_digest or file_version.content_hash
+    name = thumbnail_name(digest, size)
+    if storage.exists(name):
+        return name
+    with _rendering_lock(f"{digest}-{size}"):
+        if storage.exists(name):
+            return name
+        data = render_thumbnail(file_version, size)
+        if data is None:
+            return None
+        return storage.save(name, ContentFile(data))
@@ -0,0 +1,97 @@
+"""Upload handling that inspects file versions while the request streams in.
+
+:class:`HashingUploadHandler` spools uploads to a temporary file like
+Django's own handler, and on the way computes everything ``FileVersion.save``
+needs: the SHA-256 state of the bytes, their size and a MIME type sniffed
+from the leading bytes. The stored file is therefore never read back, and
+an upload exceeding the user's storage quota is refused as soon as it
+crosses the limit instead of after it has been written out in full.
+"""
+
+import hashlib
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from .api.exceptions import StorageQuotaExceeded
+
+SNIFF_BYTES = 512
+
+# Leading bytes of common formats, checked in order.
+MAGIC_NUMBERS = [
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (b"{\\rtf", "application/rtf"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (b"PK\x03\x04", "application/zip"),
+]
+
+# Containers whose contents are better described by the file extension,
+# e.g. OOXML documents are zip files and legacy Office files OLE storages.
+CONTAINER_TYPES = {"application/zip", "application/x-ole-storage"}
+
+
+def sniff_mime_type(head: bytes, file_name: str) -> str:
+    """MIME type from the leading bytes of a file, falling back to its name."""
+    guessed = mimetypes.guess_type(file_name)[0] or ""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, mime_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            if mime_type in CONTAINER_TYPES and guessed:
+                return guessed
+            return mime_type
+    return guessed
+
+
+class HashedUploadedFile(TemporaryUploadedFile):
+    """A spooled upload together with what was learnt while receiving it.
+
+    ``hasher`` holds the SHA-256 state after the last byte, so callers derive
+    further digests from ``hasher.copy()`` without reading the file.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.head = b""
+        self.sniffed_content_type = ""
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        # Skip TemporaryFileUploadHandler.new_file, which would spool to a plain TemporaryUploadedFile.
+        super(TemporaryFileUploadHandler, self).new_file(*args, **kwargs)
+        if settings.FILE_UPLOAD_TEMP_DIR:
+            os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        self.file = HashedUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.received = 0
+        # Resolved per file rather than when the handler is installed, which
+        # happens before the request is authenticated.
+        user = getattr(self.request, "user", None)
+        self.remaining = user.remaining_storage() if user is not None and user.is_authenticated else None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.remaining is not None and self.received > self.remaining:
+            self.file.close()
+            raise StorageQuotaExceeded()
+        self.file.hasher.update(raw_data)
+        if len(self.file.head) < SNIFF_BYTES:
+            self.file.head += raw_data[: SNIFF_BYTES - len(self.file.head)]
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.sniffed_content_type = sniff_mime_type(upload.head, upload.name)
+        return upload
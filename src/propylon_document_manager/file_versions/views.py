@@ -0,0 +1,71 @@
+import os
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header, parse_etags
+from django.views.decorators.http import require_safe
+
+from .access import record_download
+from .models import FileVersion
+from .signedurls import verify_download
+
+
+def _local_path(storage, name: str) -> str | None:
+    """Path of ``name`` on this host, if the web server can send it from there."""
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        return None
+    # Tiered storage reports the hot path of files moved to the cold tier.
+    return path if os.path.isfile(path) else None
+
+
+def _file_response(payload: dict) -> HttpResponse:
+    storage = FileVersion._meta.get_field("file").storage
+    content_type = payload["type"] or "application/octet-stream"
+    offload = settings.FILE_VERSION_SIGNED_URLS["OFFLOAD"]
+    path = _local_path(storage, payload["name"]) if offload else None
+    if path is not None:
+        response = HttpResponse(content_type=content_type)
+        if offload == "x-accel-redirect":
+            prefix = settings.FILE_VERSION_SIGNED_URLS["ACCEL_PREFIX"].rstrip("/")
+            response["X-Accel-Redirect"] = quote(f"{prefix}/{payload['name']}")
+        else:
+            response["X-Sendfile"] = path
+        response["Content-Disposition"] = content_disposition_header(True, payload["file_name"])
+        return response
+    try:
+        handle = storage.open(payload["name"], "rb")
+    except FileNotFoundError:
+        raise Http404("File not found")
+    return FileResponse(handle, as_attachment=True, filename=payload["file_name"], content_type=content_type)
+
+
+@require_safe
+def signed_download(request, token, file_name):
+    """Serve a pre-signed download URL, see :mod:`.signedurls`.
+
+    Only the token is trusted: the file name in the URL is there for clients
+    that name saved files after it.
+    """
+    try:
+        payload = verify_download(token)
+    except signing.SignatureExpired:
+        return HttpResponseForbidden("Download URL expired")
+    except signing.BadSignature:
+        return HttpResponseForbidden("Invalid download URL")
+
+    etag = f'"{payload["hash"]}"'
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = _file_response(payload)
+        if request.method == "GET":
+            record_download(payload["id"], flush=False)
+    response["ETag"] = etag
+    patch_cache_control(response, max_age=max(0, payload["exp"] - int(time.time())))
+    return response
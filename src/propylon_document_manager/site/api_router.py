@@ -4,6 +4,7 @@ from rest_framework.routers import DefaultRouter, SimpleRouter
 from propylon_document_manager.file_versions.api.views import (
     FileDownloadViewSet,
     FileVersionViewSet,
+    MultipartUploadViewSet,
     UserViewSet,
 )
 
@@ -16,6 +17,7 @@ router.register(r"file_versions", FileVersionViewSet)
 router.register(r"users", UserViewSet, basename="user")
 
 router.register(r"files", FileDownloadViewSet, basename="files")
+router.register(r"uploads", MultipartUploadViewSet, basename="upload")
 
 app_name = "api"
 urlpatterns = router.urls
@@ -53,6 +53,23 @@ DATABASES = {
 }
 # https://docs.djangoproject.com/en/stable/ref/settings/#std:setting-DEFAULT_AUTO_FIELD
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+# PRAGMAs applied to every new SQLite connection, see
+# propylon_document_manager.file_versions.db. WAL lets readers proceed while an
+# upload commits; busy_timeout makes writers queue instead of failing.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": env.int("SQLITE_BUSY_TIMEOUT_MS", default=5000),
+    "synchronous": "NORMAL",
+    "mmap_size": env.int("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024),
+    "cache_size": env.int("SQLITE_CACHE_SIZE", default=-64 * 1024),
+}
+# Aliases of DATABASES entries that replicate "default". GET requests of the
+# file endpoints read from them unless the user wrote within the last
+# DATABASE_REPLICA_STICKINESS seconds.
+DATABASE_REPLICAS = env.list("DATABASE_REPLICAS", default=[])
+DATABASE_REPLICA_STICKINESS = env.int("DATABASE_REPLICA_STICKINESS", default=5)
+# https://docs.djangoproject.com/en/dev/ref/settings/#database-routers
+DATABASE_ROUTERS = ["propylon_document_manager.file_versions.db.PrimaryReplicaRouter"]
 
 # URLS
 # ------------------------------------------------------------------------------
@@ -131,6 +148,7 @@ AUTH_PASSWORD_VALIDATORS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "propylon_document_manager.file_versions.middleware.ResponseCompressionMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -162,6 +180,12 @@ STATICFILES_FINDERS = [
 MEDIA_ROOT = str(APPS_DIR / "media")
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "/media/"
+# https://docs.djangoproject.com/en/dev/ref/settings/#file-upload-temp-dir
+# Uploads are spooled on the file system of MEDIA_ROOT so that storing them is
+# a rename rather than a copy, but outside of it: MEDIA_ROOT may be served by
+# the web server, and spooled uploads, multipart parts and thumbnail locks
+# must never be.
+FILE_UPLOAD_TEMP_DIR = env("DJANGO_FILE_UPLOAD_TEMP_DIR", default=str(APPS_DIR / "upload-spool"))
 
 # TEMPLATES
 # ------------------------------------------------------------------------------
@@ -288,6 +312,110 @@ CORS_ALLOW_ALL_ORIGINS = True
 # Your stuff...
 # ------------------------------------------------------------------------------
 
+# File versions
+# ------------------------------------------------------------------------------
+# Retention policies applied by the enforce_retention command, see
+# propylon_document_manager.file_versions.retention for the format.
+FILE_VERSION_RETENTION_POLICIES = env.json("FILE_VERSION_RETENTION_POLICIES", default=[])
+# Callable naming stored files, see propylon_document_manager.file_versions.storage.
+# Existing files are moved to a new layout with the relayout_file_versions command.
+FILE_VERSION_STORAGE_LAYOUT = env(
+    "FILE_VERSION_STORAGE_LAYOUT",
+    default="propylon_document_manager.file_versions.storage.sharded_layout",
+)
+FILE_VERSION_STORAGE_FANOUT_DEPTH = env.int("FILE_VERSION_STORAGE_FANOUT_DEPTH", default=2)
+# Storage class of FileVersion.file and what it flushes to disk before a save
+# returns ("none", "file" or "directory"), see file_versions.storage.
+FILE_VERSION_STORAGE_BACKEND = env(
+    "FILE_VERSION_STORAGE_BACKEND",
+    default="propylon_document_manager.file_versions.storage.CommittingFileSystemStorage",
+)
+FILE_VERSION_STORAGE_FSYNC = env("FILE_VERSION_STORAGE_FSYNC", default="file")
+# Cold tier of TieredStorage, when it is the storage backend, for the
+# tier_file_versions command.
+FILE_VERSION_TIERING = {
+    "COLD_BACKEND": env(
+        "FILE_VERSION_COLD_STORAGE_BACKEND", default="django.core.files.storage.FileSystemStorage"
+    ),
+    "COLD_OPTIONS": {"location": env("FILE_VERSION_COLD_STORAGE_LOCATION", default=str(APPS_DIR / "media-cold"))},
+    # gzip files in the cold tier.
+    "COMPRESS": env.bool("FILE_VERSION_COLD_STORAGE_COMPRESS", default=False),
+    # Versions unread for this many days are moved to the cold tier.
+    "COLD_AFTER_DAYS": env.int("FILE_VERSION_COLD_AFTER_DAYS", default=90),
+    # Have tier_file_versions move cold versions downloaded since they went cold
+    # back to the hot tier; downloads themselves always read the cold copy.
+    "PROMOTE_ON_ACCESS": env.bool("FILE_VERSION_PROMOTE_ON_ACCESS", default=True),
+}
+# Chunk sizes in bytes of ChunkedStorage, when it is the storage backend, see
+# propylon_document_manager.file_versions.chunking. AVG_SIZE must be a power of two.
+FILE_VERSION_CHUNKING = {
+    "MIN_SIZE": env.int("FILE_VERSION_CHUNK_MIN_SIZE", default=16 * 1024),
+    "AVG_SIZE": env.int("FILE_VERSION_CHUNK_AVG_SIZE", default=64 * 1024),
+    "MAX_SIZE": env.int("FILE_VERSION_CHUNK_MAX_SIZE", default=256 * 1024),
+}
+# Multipart uploads, see propylon_document_manager.file_versions.multipart. Uploads
+# left open longer than EXPIRE_AFTER_HOURS are removed by expire_multipart_uploads.
+FILE_VERSION_MULTIPART = {
+    "MAX_PARTS": env.int("FILE_VERSION_MULTIPART_MAX_PARTS", default=10000),
+    "EXPIRE_AFTER_HOURS": env.int("FILE_VERSION_MULTIPART_EXPIRE_AFTER_HOURS", default=24),
+}
+# How downloads buffer FileVersion.download_count and last_accessed_at before
+# writing them, see propylon_document_manager.file_versions.access.
+FILE_VERSION_ACCESS_STATS = {
+    "FLUSH_INTERVAL": env.float("FILE_VERSION_ACCESS_STATS_FLUSH_INTERVAL", default=30.0),
+    "MAX_PENDING": env.int("FILE_VERSION_ACCESS_STATS_MAX_PENDING", default=1000),
+}
+# In-process LRU (and optional host-wide mmap tier) for small hot downloads, see
+# propylon_document_manager.file_versions.blobcache. MAX_BYTES = 0 disables it.
+FILE_VERSION_BLOB_CACHE = {
+    "MAX_BYTES": env.int("FILE_VERSION_BLOB_CACHE_BYTES", default=64 * 1024 * 1024),
+    "MAX_ITEM_BYTES": env.int("FILE_VERSION_BLOB_CACHE_ITEM_BYTES", default=1024 * 1024),
+    "SHARED_DIR": env("FILE_VERSION_BLOB_CACHE_SHARED_DIR", default=None),
+    "SHARED_MAX_BYTES": env.int("FILE_VERSION_BLOB_CACHE_SHARED_BYTES", default=512 * 1024 * 1024),
+}
+# Bytes each user may store unless User.storage_quota says otherwise; None for no limit.
+FILE_VERSION_DEFAULT_STORAGE_QUOTA = env.int("FILE_VERSION_DEFAULT_STORAGE_QUOTA", default=None)
+# Thumbnail sizes clients may request and how they are encoded, see
+# propylon_document_manager.file_versions.thumbnails.
+FILE_VERSION_THUMBNAILS = {
+    "SIZES": env.list("FILE_VERSION_THUMBNAIL_SIZES", cast=int, default=[64, 128, 256, 512]),
+    "FORMAT": env("FILE_VERSION_THUMBNAIL_FORMAT", default="WEBP"),
+    "QUALITY": env.int("FILE_VERSION_THUMBNAIL_QUALITY", default=80),
+}
+# Polling and lifetime of Server-Sent Events change streams, see
+# propylon_document_manager.file_versions.changefeed.
+FILE_VERSION_CHANGE_STREAM = {
+    "POLL_INTERVAL": env.float("FILE_VERSION_CHANGE_STREAM_POLL_INTERVAL", default=1.0),
+    "HEARTBEAT": env.float("FILE_VERSION_CHANGE_STREAM_HEARTBEAT", default=15.0),
+    "MAX_DURATION": env.float("FILE_VERSION_CHANGE_STREAM_MAX_DURATION", default=300.0),
+}
+# Pre-signed, expiring download URLs, see propylon_document_manager.file_versions.signedurls.
+# OFFLOAD hands files to the web server: None, "x-accel-redirect" (nginx, with an internal
+# location ACCEL_PREFIX aliasing MEDIA_ROOT) or "x-sendfile".
+FILE_VERSION_SIGNED_URLS = {
+    "MAX_AGE": env.int("FILE_VERSION_SIGNED_URL_MAX_AGE", default=3600),
+    "MAX_AGE_LIMIT": env.int("FILE_VERSION_SIGNED_URL_MAX_AGE_LIMIT", default=7 * 24 * 3600),
+    "OFFLOAD": env("FILE_VERSION_SIGNED_URL_OFFLOAD", default=None),
+    "ACCEL_PREFIX": env("FILE_VERSION_SIGNED_URL_ACCEL_PREFIX", default="/protected-media/"),
+}
+# Negotiated gzip/Brotli compression of API responses, see
+# propylon_document_manager.file_versions.middleware. Brotli needs the brotli package.
+FILE_VERSION_COMPRESSION = {
+    "MIN_SIZE": env.int("FILE_VERSION_COMPRESSION_MIN_SIZE", default=1024),
+    "GZIP_LEVEL": env.int("FILE_VERSION_COMPRESSION_GZIP_LEVEL", default=6),
+    "BROTLI_QUALITY": env.int("FILE_VERSION_COMPRESSION_BROTLI_QUALITY", default=5),
+    "CONTENT_TYPES": env.list(
+        "FILE_VERSION_COMPRESSION_CONTENT_TYPES",
+        default=["application/json", "application/vnd.propylon.columnar+json", "application/msgpack"],
+    ),
+}
+# Sizing of the per-process Bloom filter answering upload preflight checks, see
+# propylon_document_manager.file_versions.bloom.
+FILE_VERSION_BLOOM_FILTER = {
+    "CAPACITY": env.int("FILE_VERSION_BLOOM_CAPACITY", default=1_000_000),
+    "ERROR_RATE": env.float("FILE_VERSION_BLOOM_ERROR_RATE", default=0.01),
+}
+
 # drf-spectacular
 # ------------------------------------------------------------------------------
 SPECTACULAR_SETTINGS = {
@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import (
     SpectacularAPIView,
@@ -7,13 +8,19 @@ from drf_spectacular.views import (
 )
 from rest_framework.authtoken.views import obtain_auth_token
 
+from propylon_document_manager.file_versions.views import signed_download
+
 # API URLS
 urlpatterns = [
     # API base url
     path("api/", include("propylon_document_manager.site.api_router")),
+    # Pre-signed downloads, checked without database or auth queries
+    path("signed/<str:token>/<str:file_name>", signed_download, name="signed-download"),
     # DRF auth token
     path("api-auth/", include("rest_framework.urls")),
     path("auth-token/", obtain_auth_token),
+    # Django Admin
+    path(settings.ADMIN_URL, admin.site.urls),
     # API Documentation
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
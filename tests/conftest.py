@@ -9,9 +9,33 @@ def enable_db_access_for_all_tests(db):
 
 @pytest.fixture(autouse=True)
 def media_storage(settings, tmpdir):
-    settings.MEDIA_ROOT = tmpdir.strpath
+    settings.MEDIA_ROOT = tmpdir.join("media").strpath
+    settings.FILE_UPLOAD_TEMP_DIR = tmpdir.join("uploads").strpath
+
+
+@pytest.fixture(autouse=True)
+def blob_cache(settings):
+    # Reassigning the setting gives every test an empty download cache.
+    settings.FILE_VERSION_BLOB_CACHE = {**settings.FILE_VERSION_BLOB_CACHE}
+
+
+@pytest.fixture(autouse=True)
+def content_index(settings):
+    # Likewise rebuilds the preflight Bloom filter from each test's database.
+    settings.FILE_VERSION_BLOOM_FILTER = {**settings.FILE_VERSION_BLOOM_FILTER}
+
+
+@pytest.fixture(autouse=True)
+def access_stats(settings):
+    # And starts every test with an empty download statistics buffer.
+    settings.FILE_VERSION_ACCESS_STATS = {**settings.FILE_VERSION_ACCESS_STATS}
 
 
 @pytest.fixture
 def user(db) -> User:
     return UserFactory()
+
+
+@pytest.fixture
+def admin(db) -> User:
+    return User.objects.create_superuser("admin@example.com", "Admin", "AdminPassw0rd!")
@@ -15,6 +15,15 @@ SECRET_KEY = env(
 # https://docs.djangoproject.com/en/dev/ref/settings/#test-runner
 TEST_RUNNER = "django.test.runner.DiscoverRunner"
 
+# DATABASES
+# ------------------------------------------------------------------------------
+# Stand-in replica for the read routing tests; it is only created for tests
+# that request it and only used when DATABASE_REPLICAS lists it.
+DATABASES["replica"] = {  # noqa: F405
+    "ENGINE": "django.db.backends.sqlite3",
+    "NAME": "propylon_document_manager_replica.sqlite",
+}
+
 # PASSWORDS
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#password-hashers
@@ -0,0 +1,131 @@
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions import access
+from propylon_document_manager.file_versions.access import flush_access_stats, get_access_buffer, record_download
+from propylon_document_manager.file_versions.models import FileVersion
+
+pytestmark = pytest.mark.django_db
+
+POPULAR_URL = "/api/file_versions/popular/"
+
+
+class TestAccessStats:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user, settings):
+        settings.FILE_VERSION_ACCESS_STATS = {"FLUSH_INTERVAL": 3600, "MAX_PENDING": 1000}
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def upload(self, name):
+        return self.client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile(name, name.encode()), "path": "docs"},
+            format="multipart",
+        ).data["id"]
+
+    def download(self, pk, times=1):
+        for _ in range(times):
+            assert self.client.get(f"/api/files/{pk}/").status_code == status.HTTP_200_OK
+
+    def test_downloads_are_buffered_and_flushed_in_bulk(self):
+        first, second = self.upload("a.txt"), self.upload("b.txt")
+        FileVersion.objects.update(last_accessed_at=timezone.now() - timedelta(days=30))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.download(first, times=3)
+            self.download(second)
+        assert not [query for query in queries if query["sql"].startswith("UPDATE")]
+        assert FileVersion.objects.get(pk=first).download_count == 0
+
+        with CaptureQueriesContext(connection) as queries:
+            assert flush_access_stats() == 2
+        assert len(queries) == 1
+        counts = dict(FileVersion.objects.values_list("pk", "download_count"))
+        assert counts == {first: 3, second: 1}
+        assert FileVersion.objects.get(pk=first).last_accessed_at > timezone.now() - timedelta(minutes=1)
+        assert flush_access_stats() == 0
+
+    def test_full_buffer_flushes_on_the_next_download(self, settings):
+        settings.FILE_VERSION_ACCESS_STATS = {"FLUSH_INTERVAL": 3600, "MAX_PENDING": 2}
+        first, second = self.upload("a.txt"), self.upload("b.txt")
+
+        self.download(first)
+        assert FileVersion.objects.get(pk=first).download_count == 0
+        self.download(second)
+
+        assert dict(FileVersion.objects.values_list("pk", "download_count")) == {first: 1, second: 1}
+
+    def test_flush_never_moves_last_access_backwards(self):
+        pk = self.upload("a.txt")
+        later = timezone.now() + timedelta(hours=1)
+        FileVersion.objects.filter(pk=pk).update(last_accessed_at=later)
+
+        get_access_buffer().record(pk, timezone.now())
+        flush_access_stats()
+
+        version = FileVersion.objects.get(pk=pk)
+        assert (version.download_count, version.last_accessed_at) == (1, later)
+
+    def test_popular_lists_own_most_downloaded_versions(self, admin):
+        first, second = self.upload("a.txt"), self.upload("b.txt")
+        self.upload("c.txt")
+        self.download(first)
+        self.download(second, times=2)
+        flush_access_stats()
+
+        response = self.client.get(POPULAR_URL, {"fields": "id,file_name"})
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data["results"]
+        assert [(result["file_version"], result["download_count"]) for result in results] == [
+            ({"id": second, "file_name": "b.txt"}, 2),
+            ({"id": first, "file_name": "a.txt"}, 1),
+        ]
+        assert results[0]["last_accessed_at"].endswith("Z")
+        assert len(self.client.get(POPULAR_URL, {"limit": 1}).data["results"]) == 1
+
+        other = APIClient()
+        other.force_authenticate(admin)
+        assert other.get(POPULAR_URL).data["results"] == []
+
+    def test_admin_lists_versions_read_only(self, admin):
+        pk = self.upload("a.txt")
+        client = Client()
+        client.force_login(admin)
+
+        response = client.get(reverse("admin:file_versions_fileversion_changelist"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b"a.txt" in response.content
+        response = client.post(
+            reverse("admin:file_versions_fileversion_changelist"),
+            {"action": "delete_selected", "_selected_action": [pk], "post": "yes"},
+        )
+        assert FileVersion.all_objects.filter(pk=pk, deleted_at=None).exists()
+        response = client.post(reverse("admin:file_versions_fileversion_delete", args=[pk]), {"post": "yes"})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert FileVersion.all_objects.filter(pk=pk).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_background_flush_writes_due_statistics(user, settings):
+    settings.FILE_VERSION_ACCESS_STATS = {"FLUSH_INTERVAL": 3600, "MAX_PENDING": 1}
+    version = FileVersion.objects.create_next_version(
+        user=user, path="docs", file_name="a.txt", file=SimpleUploadedFile("a.txt", b"a")
+    )
+
+    record_download(version.pk, flush=False)
+    access._flusher.join(timeout=5)
+
+    version.refresh_from_db()
+    assert version.download_count == 1
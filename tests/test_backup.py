@@ -0,0 +1,92 @@
+import json
+import tarfile
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from propylon_document_manager.file_versions.models import FileVersion, FileVersionChange, User
+
+pytestmark = pytest.mark.django_db
+
+
+def make_version(user, name="doc.txt", content=b"hello", version_number=1):
+    return FileVersion.objects.create(
+        file_name=name,
+        version_number=version_number,
+        created_by=user,
+        file=SimpleUploadedFile(name, content),
+        path="docs",
+    )
+
+
+class TestBackupAndRestore:
+    def test_incremental_backup_only_contains_new_versions(self, user, tmp_path):
+        watermark = tmp_path / "watermark.json"
+        first = make_version(user)
+        call_command(
+            "backup_file_versions", str(tmp_path / "one.tar"), watermark_file=str(watermark), stdout=StringIO()
+        )
+        assert json.loads(watermark.read_text())["to_id"] == first.pk
+
+        second = make_version(user, version_number=2, content=b"second")
+        call_command(
+            "backup_file_versions", str(tmp_path / "two.tar"), watermark_file=str(watermark), stdout=StringIO()
+        )
+
+        with tarfile.open(tmp_path / "two.tar") as archive:
+            media = [name for name in archive.getnames() if name.startswith("media/")]
+        assert media == ["media/" + second.file.name]
+        assert json.loads(watermark.read_text())["to_id"] == second.pk
+
+    def test_restore_recreates_rows_users_and_files(self, user, tmp_path):
+        original = make_version(user, content=b"restore me")
+        archive = str(tmp_path / "backup.tar.gz")
+        call_command("backup_file_versions", archive, stdout=StringIO())
+
+        expected = FileVersion.objects.values().get()
+        storage = original.file.storage
+        storage.delete(original.file.name)
+        FileVersion.objects.all().delete()
+        User.objects.all().delete()
+
+        call_command("restore_file_versions", archive, stdout=StringIO())
+
+        restored = FileVersion.objects.get()
+        assert restored.pk == original.pk
+        assert restored.created_at == expected["created_at"]
+        assert restored.created_by.email == user.email
+        assert restored.created_by.password == user.password
+        assert restored.file.read() == b"restore me"
+
+    def test_restoring_twice_is_idempotent(self, user, tmp_path):
+        make_version(user)
+        archive = str(tmp_path / "backup.tar")
+        call_command("backup_file_versions", archive, stdout=StringIO())
+
+        call_command("restore_file_versions", archive, archive, stdout=StringIO())
+        assert FileVersion.objects.count() == 1
+
+    def test_restore_over_existing_versions_leaves_them_untouched(self, user, tmp_path):
+        kept = make_version(user, content=b"kept")
+        FileVersion.objects.filter(pk=kept.pk).update(download_count=3)
+        archive = str(tmp_path / "backup.tar")
+        call_command("backup_file_versions", archive, stdout=StringIO())
+        archived = FileVersion.objects.values("created_at", "download_count", "last_accessed_at").get()
+
+        moved = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        FileVersion.objects.filter(pk=kept.pk).update(created_at=moved)
+
+        out = StringIO()
+        call_command("restore_file_versions", archive, stdout=out)
+
+        assert "Restored 0 file versions" in out.getvalue()
+        assert FileVersion.objects.get(pk=kept.pk).created_at == moved
+        assert FileVersionChange.objects.filter(file_version_id=kept.pk).count() == 1
+
+        FileVersion.objects.all().delete()
+        call_command("restore_file_versions", archive, stdout=out)
+        restored = FileVersion.objects.values("created_at", "download_count", "last_accessed_at").get()
+        assert restored == archived
@@ -0,0 +1,147 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions import blobcache
+from propylon_document_manager.file_versions.blobcache import BlobCache, SharedBlobTier, get_blob_cache
+
+DIGEST_A = "a" * 64
+DIGEST_B = "b" * 64
+DIGEST_C = "c" * 64
+
+
+class TestBlobCache:
+    def test_evicts_least_recently_used(self):
+        cache = BlobCache(max_bytes=8, max_item_bytes=4)
+        cache.put(DIGEST_A, b"aaaa")
+        cache.put(DIGEST_B, b"bbbb")
+        assert cache.get(DIGEST_A) == b"aaaa"
+
+        cache.put(DIGEST_C, b"cccc")
+
+        assert cache.get(DIGEST_B) is None
+        assert cache.get(DIGEST_A) == b"aaaa"
+        assert cache.stats()["evictions"] == 1
+
+    def test_large_blobs_are_not_cached(self):
+        cache = BlobCache(max_bytes=100, max_item_bytes=4)
+        assert cache.get_or_load(DIGEST_A, 5, lambda: b"x" * 5) is None
+        assert cache.stats()["items"] == 0
+
+    def test_get_or_load_loads_once(self):
+        cache = BlobCache(max_bytes=100, max_item_bytes=10)
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return b"data"
+
+        assert cache.get_or_load(DIGEST_A, 4, loader) == b"data"
+        assert cache.get_or_load(DIGEST_A, 4, loader) == b"data"
+        assert len(loads) == 1
+        assert cache.stats()["hit_ratio"] == 0.5
+
+    def test_shared_tier_is_visible_to_other_processes(self, tmp_path):
+        writer = BlobCache(100, 10, SharedBlobTier(str(tmp_path), 100))
+        reader = BlobCache(100, 10, SharedBlobTier(str(tmp_path), 100))
+
+        writer.put(DIGEST_A, b"shared")
+
+        assert reader.get(DIGEST_A) == b"shared"
+        assert reader.stats()["shared_hits"] == 1
+
+    def test_shared_tier_respects_budget(self, tmp_path):
+        tier = SharedBlobTier(str(tmp_path), max_bytes=8)
+        tier.put(DIGEST_A, b"aaaa")
+        tier.put(DIGEST_B, b"bbbb")
+        tier.put(DIGEST_C, b"cccc")
+
+        assert sum(path.stat().st_size for path in tmp_path.iterdir()) <= 8
+        assert tier.get(DIGEST_C) == b"cccc"
+
+    def test_shared_hits_reuse_the_mapping(self, tmp_path, monkeypatch):
+        tier = SharedBlobTier(str(tmp_path), 100)
+        tier.put(DIGEST_A, b"mapped")
+        assert tier.get(DIGEST_A) == b"mapped"
+
+        def fail(*args, **kwargs):
+            raise AssertionError("the blob was opened again")
+
+        monkeypatch.setattr(blobcache.os, "open", fail)
+
+        assert tier.get(DIGEST_A) == b"mapped"
+
+    def test_shared_budget_is_enforced_without_rescanning(self, tmp_path, monkeypatch):
+        writer = SharedBlobTier(str(tmp_path), max_bytes=8)
+        writer.put(DIGEST_A, b"aaaa")
+        tier = SharedBlobTier(str(tmp_path), max_bytes=8)
+        scandir = blobcache.os.scandir
+        scans = []
+
+        def counting_scandir(*args, **kwargs):
+            scans.append(1)
+            return scandir(*args, **kwargs)
+
+        monkeypatch.setattr(blobcache.os, "scandir", counting_scandir)
+        for digest in (DIGEST_B, DIGEST_C, "d" * 64):
+            tier.put(digest, digest[:4].encode())
+
+        assert len(scans) == 1
+        assert sorted(path.name for path in tmp_path.iterdir()) == [DIGEST_C, "d" * 64]
+
+
+@pytest.mark.django_db
+class TestCachedDownloads:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        self.client = APIClient()
+
+    def test_repeated_download_is_served_from_cache(self, user):
+        self.client.force_authenticate(user)
+        data = self.client.post(
+            reverse("api:fileversion-list"),
+            {"upload": SimpleUploadedFile("hot.txt", b"hot bill"), "path": "docs"},
+            format="multipart",
+        ).data
+        url = reverse("api:files-detail", args=[data["id"]])
+        assert b"".join(self.client.get(url).streaming_content) == b"hot bill"
+
+        # Subsequent downloads never touch storage.
+        file_version = user.file_versions.get()
+        file_version.file.storage.delete(file_version.file.name)
+        response = self.client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b"".join(response.streaming_content) == b"hot bill"
+        assert response["Content-Disposition"] == 'attachment; filename="hot.txt"'
+        assert get_blob_cache().stats()["hits"] == 1
+
+    def test_identical_revisions_share_one_entry(self, user):
+        self.client.force_authenticate(user)
+        urls = []
+        for _ in range(2):
+            data = self.client.post(
+                reverse("api:fileversion-list"),
+                {"upload": SimpleUploadedFile("same.txt", b"same bytes"), "path": "docs"},
+                format="multipart",
+            ).data
+            urls.append(reverse("api:files-detail", args=[data["id"]]))
+
+        for url in urls:
+            assert b"".join(self.client.get(url).streaming_content) == b"same bytes"
+
+        assert get_blob_cache().stats()["misses"] == 1
+        assert get_blob_cache().stats()["hits"] == 1
+
+    def test_cache_stats_require_admin(self, user, admin):
+        self.client.force_authenticate(user)
+        assert self.client.get("/api/files/cache-stats/").status_code == status.HTTP_403_FORBIDDEN
+
+        self.client.force_authenticate(admin)
+        response = self.client.get("/api/files/cache-stats/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["enabled"] is True
+        assert {"hits", "misses", "evictions", "hit_ratio"} <= set(response.data)
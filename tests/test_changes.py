@@ -0,0 +1,119 @@
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.models import FileVersion, FileVersionChange
+
+pytestmark = pytest.mark.django_db
+
+CHANGES_URL = "/api/file_versions/changes/"
+STREAM_URL = "/api/file_versions/changes/stream/"
+
+
+def parse_events(body: str) -> list[dict]:
+    events = []
+    for frame in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if line and not line.startswith(":"))
+        if "data" in fields:
+            events.append({"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])})
+    return events
+
+
+class TestChangeFeed:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.user = user
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def upload(self, name="a.txt", content=b"content"):
+        return self.client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile(name, content), "path": "docs"},
+            format="multipart",
+        ).data
+
+    def test_returns_creations_and_deletions_in_order(self):
+        first = self.upload()
+        second = self.upload(name="b.txt")
+        self.client.delete(f"/api/file_versions/{first['id']}/")
+
+        response = self.client.get(CHANGES_URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        changes = response.data["changes"]
+        assert [(change["kind"], change["file_version_id"]) for change in changes] == [
+            ("created", first["id"]),
+            ("created", second["id"]),
+            ("deleted", first["id"]),
+        ]
+        assert changes[0]["path"] == "docs"
+        assert changes[0]["file_name"] == "a.txt"
+        assert changes[0]["version_number"] == 1
+        assert response.data["cursor"] == changes[-1]["id"]
+        assert response.data["has_more"] is False
+
+    def test_returns_only_the_delta_after_the_cursor(self):
+        self.upload()
+        cursor = self.client.get(CHANGES_URL).data["cursor"]
+        latest = self.upload()
+
+        response = self.client.get(CHANGES_URL, {"cursor": cursor})
+
+        assert [change["file_version_id"] for change in response.data["changes"]] == [latest["id"]]
+        unchanged = self.client.get(CHANGES_URL, {"cursor": response.data["cursor"]})
+        assert unchanged.data == {"changes": [], "cursor": response.data["cursor"], "has_more": False}
+
+    def test_pages_with_limit(self):
+        for name in ("a.txt", "b.txt", "c.txt"):
+            self.upload(name=name)
+
+        page = self.client.get(CHANGES_URL, {"limit": 2})
+        rest = self.client.get(CHANGES_URL, {"cursor": page.data["cursor"], "limit": 2})
+
+        assert len(page.data["changes"]) == 2
+        assert page.data["has_more"] is True
+        assert len(rest.data["changes"]) == 1
+        assert rest.data["has_more"] is False
+
+    def test_purge_records_deletions(self, django_capture_on_commit_callbacks):
+        self.upload()
+        self.upload(name="b.txt")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            FileVersion.objects.filter(created_by=self.user).purge()
+
+        kinds = list(FileVersionChange.objects.filter(user=self.user).values_list("kind", flat=True))
+        assert kinds == ["created", "created", "deleted", "deleted"]
+
+    def test_hides_other_users_changes(self, admin):
+        self.upload()
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        assert client.get(CHANGES_URL).data["changes"] == []
+
+    def test_stream_resumes_after_last_event_id(self, settings):
+        settings.FILE_VERSION_CHANGE_STREAM = {"POLL_INTERVAL": 0.01, "HEARTBEAT": 0.01, "MAX_DURATION": 0.05}
+        self.upload()
+        cursor = self.client.get(CHANGES_URL).data["cursor"]
+        latest = self.upload(name="b.txt")
+
+        response = self.client.get(STREAM_URL, headers={"Accept": "text/event-stream", "Last-Event-ID": str(cursor)})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("text/event-stream")
+        body = b"".join(response.streaming_content).decode()
+        events = parse_events(body)
+        assert [(event["event"], event["data"]["file_version_id"]) for event in events] == [("created", latest["id"])]
+        assert events[0]["id"] > cursor
+        assert ": keepalive" in body
+
+    def test_stream_requires_authentication(self):
+        response = APIClient().get(STREAM_URL, headers={"Accept": "text/event-stream"})
+
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+        assert response.content.startswith(b"event: error\n")
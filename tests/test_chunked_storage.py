@@ -0,0 +1,215 @@
+import io
+import os
+import random
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions import models
+from propylon_document_manager.file_versions import storage as storage_module
+from propylon_document_manager.file_versions.api.exceptions import StorageQuotaExceeded
+from propylon_document_manager.file_versions.chunking import iter_chunks
+from propylon_document_manager.file_versions.models import FileVersion, user_directory_path
+from propylon_document_manager.file_versions.storage import ChunkedStorage
+
+pytestmark = pytest.mark.django_db
+
+
+def document(size=256 * 1024, seed=1) -> bytes:
+    return random.Random(seed).randbytes(size)
+
+
+def edited(data: bytes, at: int, insert: bytes = b"an amended section") -> bytes:
+    return data[:at] + insert + data[at:]
+
+
+def chunk_bytes(storage: ChunkedStorage) -> int:
+    total = 0
+    for directory, _, files in os.walk(os.path.join(storage.location, storage.CHUNK_DIRECTORY)):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(settings):
+    settings.FILE_VERSION_CHUNKING = {"MIN_SIZE": 1024, "AVG_SIZE": 4096, "MAX_SIZE": 16384}
+
+
+class TestChunking:
+    def test_chunks_reassemble_within_size_bounds(self):
+        data = document()
+
+        chunks = list(iter_chunks(io.BytesIO(data)))
+
+        assert b"".join(chunks) == data
+        assert all(1024 <= len(chunk) <= 16384 for chunk in chunks[:-1])
+        assert 16 < len(chunks) < 256
+
+    def test_an_edit_only_changes_nearby_chunks(self):
+        data = document()
+
+        before = set(iter_chunks(io.BytesIO(data)))
+        after = list(iter_chunks(io.BytesIO(edited(data, 100_000))))
+
+        assert len([chunk for chunk in after if chunk not in before]) <= 2
+
+
+class TestChunkedStorage:
+    @pytest.fixture(autouse=True)
+    def _setup(self, settings):
+        os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        self.storage = ChunkedStorage()
+
+    def test_reads_back_files_with_seeking(self):
+        data = document()
+        name = self.storage.save("user_1/docs/act.pdf", ContentFile(data))
+
+        assert self.storage.size(name) == len(data)
+        with self.storage.open(name) as handle:
+            assert handle.size == len(data)
+            assert handle.read() == data
+            handle.seek(70_000)
+            assert handle.read(5000) == data[70_000:75_000]
+        with pytest.raises(NotImplementedError):
+            self.storage.path(name)
+
+    def test_revisions_store_only_changed_chunks(self):
+        data = document()
+        self.storage.save("user_1/docs/rev_1-act.pdf", ContentFile(data))
+        single = chunk_bytes(self.storage)
+
+        self.storage.save("user_1/docs/rev_2-act.pdf", ContentFile(edited(data, 100_000)))
+        self.storage.save("user_1/docs/rev_3-act.pdf", ContentFile(edited(data, 200_000)))
+
+        assert chunk_bytes(self.storage) < single + 3 * 16384
+
+    def test_collect_chunks_removes_only_unreferenced_chunks(self, monkeypatch):
+        monkeypatch.setattr(FileVersion._meta.get_field("file"), "storage", self.storage)
+        kept = self.storage.save("user_1/docs/a.bin", ContentFile(document(seed=1)))
+        dropped = self.storage.save("user_1/docs/b.bin", ContentFile(document(seed=2)))
+        self.storage.delete(dropped)
+        out = StringIO()
+
+        call_command("collect_chunks", grace=60, stdout=out)
+        assert "Deleted 0 unreferenced chunks" in out.getvalue()
+
+        call_command("collect_chunks", grace=0, stdout=out)
+
+        assert "Deleted 0 " not in out.getvalue().splitlines()[-1]
+        with self.storage.open(kept) as handle:
+            assert handle.read() == document(seed=1)
+        assert chunk_bytes(self.storage) == 256 * 1024
+
+    def test_collect_chunks_spares_chunks_reused_during_the_sweep(self, monkeypatch):
+        monkeypatch.setattr(FileVersion._meta.get_field("file"), "storage", self.storage)
+        self.storage.delete(self.storage.save("user_1/docs/a.bin", ContentFile(document(seed=3))))
+        for directory, _, files in os.walk(os.path.join(self.storage.location, self.storage.CHUNK_DIRECTORY)):
+            for file_name in files:
+                os.utime(os.path.join(directory, file_name), (0, 0))
+        stat = os.stat
+        reused = []
+
+        def stat_then_reuse(path, *args, **kwargs):
+            # An upload of the same content commits between the look at the chunk and its removal.
+            result = stat(path, *args, **kwargs)
+            if not reused:
+                monkeypatch.setattr(os, "stat", stat)
+                reused.append(self.storage.save("user_1/docs/b.bin", ContentFile(document(seed=3))))
+            return result
+
+        monkeypatch.setattr(os, "stat", stat_then_reuse)
+        call_command("collect_chunks", grace=0, stdout=StringIO())
+
+        with self.storage.open(reused[0]) as handle:
+            assert handle.read() == document(seed=3)
+
+    def test_collect_chunks_removes_abandoned_staged_files(self, monkeypatch):
+        monkeypatch.setattr(FileVersion._meta.get_field("file"), "storage", self.storage)
+        staged = self.storage.stage(ContentFile(document(seed=4)))
+        os.utime(self.storage._full_path(staged), (0, 0))
+        out = StringIO()
+
+        call_command("collect_chunks", grace=0, stdout=out)
+
+        assert "and 1 abandoned staged files" in out.getvalue()
+        assert not self.storage.exists(staged)
+        assert chunk_bytes(self.storage) == 0
+
+    def test_collect_chunks_requires_chunked_storage(self):
+        with pytest.raises(CommandError):
+            call_command("collect_chunks", stdout=StringIO())
+
+
+def test_versions_of_a_large_document_share_chunks(user, settings, monkeypatch):
+    os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+    storage = ChunkedStorage()
+    monkeypatch.setattr(FileVersion._meta.get_field("file"), "storage", storage)
+    client = APIClient()
+    client.force_authenticate(user)
+    revisions = [document(), edited(document(), 50_000), edited(document(), 150_000)]
+
+    ids = [
+        client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile("act.pdf", content), "path": "acts"},
+            format="multipart",
+        ).data["id"]
+        for content in revisions
+    ]
+
+    for pk, content in zip(ids, revisions):
+        response = client.get(f"/api/files/{pk}/")
+        assert b"".join(response.streaming_content) == content
+    assert FileVersion.objects.get(pk=ids[1]).file_size == len(revisions[1])
+    assert chunk_bytes(storage) < 1.5 * len(revisions[0])
+
+
+class TestChunkedVersions:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user, settings, monkeypatch):
+        os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        self.user = user
+        self.storage = ChunkedStorage()
+        monkeypatch.setattr(FileVersion._meta.get_field("file"), "storage", self.storage)
+
+    def test_content_is_chunked_before_the_write_transaction(self, monkeypatch):
+        chunk, immediate_atomic = storage_module.iter_chunks, models.immediate_atomic
+        events = []
+
+        def tracked_chunks(content):
+            events.append("chunk")
+            return chunk(content)
+
+        def tracked_atomic():
+            events.append("lock")
+            return immediate_atomic()
+
+        monkeypatch.setattr(storage_module, "iter_chunks", tracked_chunks)
+        monkeypatch.setattr(models, "immediate_atomic", tracked_atomic)
+
+        version = FileVersion.objects.create_next_version(
+            self.user, "acts", "act.pdf", SimpleUploadedFile("act.pdf", document())
+        )
+
+        assert events == ["chunk", "lock"]
+        assert version.file.name == user_directory_path(version, "act.pdf")
+        with version.file.open() as handle:
+            assert handle.read() == document()
+        assert not os.listdir(self.storage._full_path(self.storage.STAGING_DIRECTORY))
+
+    def test_refused_version_leaves_no_manifest(self, settings):
+        settings.FILE_VERSION_DEFAULT_STORAGE_QUOTA = 1024
+
+        with pytest.raises(StorageQuotaExceeded):
+            FileVersion.objects.create_next_version(
+                self.user, "acts", "act.pdf", SimpleUploadedFile("act.pdf", document())
+            )
+
+        assert not os.listdir(self.storage._full_path(self.storage.STAGING_DIRECTORY))
+        assert not FileVersion.objects.exists()
+        assert chunk_bytes(self.storage) > 0
+        assert not [name for name in os.listdir(self.storage.location) if name.startswith("user_")]
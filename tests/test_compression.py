@@ -0,0 +1,122 @@
+import gzip
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.api.renderers import to_columns
+from propylon_document_manager.file_versions.middleware import negotiate_encoding
+from propylon_document_manager.file_versions.models import FileVersion
+
+pytestmark = pytest.mark.django_db
+
+LIST_URL = "/api/file_versions/"
+
+
+@pytest.fixture
+def versions(user):
+    return [
+        FileVersion.objects.create(
+            file_name=f"doc{number}.pdf",
+            version_number=1,
+            created_by=user,
+            file=SimpleUploadedFile(f"doc{number}.pdf", b"%d" % number),
+            path="legislation/bills/2024",
+        )
+        for number in range(20)
+    ]
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("br;q=0, *", "gzip"),
+        ("identity", None),
+        ("*;q=0", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header, ["br", "gzip"]) == expected
+
+
+def test_to_columns():
+    page = {"count": 2, "results": [{"id": 1, "path": "a"}, {"id": 2, "path": "b"}], "errors": ["x"]}
+
+    assert to_columns(page) == {
+        "count": 2,
+        "results": {"columns": ["id", "path"], "rows": [[1, "a"], [2, "b"]]},
+        "errors": ["x"],
+    }
+    assert to_columns([{"id": 1}, {"path": "a"}]) == [{"id": 1}, {"path": "a"}]
+    assert to_columns({"results": []}) == {"results": []}
+
+
+class TestResponseCompression:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user, versions, settings):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.config = settings.FILE_VERSION_COMPRESSION = {**settings.FILE_VERSION_COMPRESSION, "MIN_SIZE": 1024}
+
+    def test_gzips_large_listings(self):
+        plain = self.client.get(LIST_URL)
+        response = self.client.get(LIST_URL, headers={"Accept-Encoding": "gzip"})
+
+        assert response["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response["Vary"]
+        assert int(response["Content-Length"]) < len(plain.content) / 2
+        assert gzip.decompress(response.content) == plain.content
+        assert not plain.has_header("Content-Encoding")
+        assert "Accept-Encoding" in plain["Vary"]
+
+    def test_leaves_small_refused_and_streamed_responses_alone(self, versions):
+        self.config["MIN_SIZE"] = 1024 * 1024
+        small = self.client.get(LIST_URL, headers={"Accept-Encoding": "gzip"})
+        self.config["MIN_SIZE"] = 0
+        refused = self.client.get(LIST_URL, headers={"Accept-Encoding": "gzip;q=0"})
+        download = self.client.get(f"/api/files/{versions[0].pk}/", headers={"Accept-Encoding": "gzip"})
+
+        for response in (small, refused, download):
+            assert not response.has_header("Content-Encoding")
+        assert b"".join(download.streaming_content) == b"0"
+
+    def test_uses_brotli_when_installed(self):
+        brotli = pytest.importorskip("brotli")
+
+        response = self.client.get(LIST_URL, headers={"Accept-Encoding": "gzip, br"})
+
+        assert response["Content-Encoding"] == "br"
+        assert json.loads(brotli.decompress(response.content))["count"] == 20
+
+
+class TestCompactRenderers:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user, versions):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_columnar_listing_holds_the_same_records(self):
+        listing = self.client.get(LIST_URL, {"fields": "id,file_name,path"}).json()
+
+        by_accept = self.client.get(
+            LIST_URL, {"fields": "id,file_name,path"}, headers={"Accept": "application/vnd.propylon.columnar+json"}
+        )
+        by_format = self.client.get(LIST_URL, {"fields": "id,file_name,path", "format": "columnar"})
+
+        assert by_accept["Content-Type"] == "application/vnd.propylon.columnar+json"
+        assert by_accept.content == by_format.content
+        table = json.loads(by_accept.content)["results"]
+        assert table["columns"] == ["id", "file_name", "path"]
+        assert [dict(zip(table["columns"], row)) for row in table["rows"]] == listing["results"]
+        assert len(by_accept.content) < len(json.dumps(listing, separators=(",", ":")))
+
+    def test_messagepack_listing(self):
+        msgpack = pytest.importorskip("msgpack")
+
+        response = self.client.get(LIST_URL, headers={"Accept": "application/msgpack"})
+
+        assert msgpack.unpackb(response.content) == self.client.get(LIST_URL).json()
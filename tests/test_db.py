@@ -0,0 +1,42 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from propylon_document_manager.file_versions.db import immediate_atomic
+
+
+def _pragma(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+
+class TestSqliteTuning:
+    def test_connection_pragmas_are_applied(self, settings):
+        assert _pragma("busy_timeout") == settings.SQLITE_PRAGMAS["busy_timeout"]
+        assert _pragma("synchronous") == 1  # NORMAL
+        assert _pragma("cache_size") == settings.SQLITE_PRAGMAS["cache_size"]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_immediate_atomic_begins_immediate_transaction(self):
+        with CaptureQueriesContext(connection) as queries:
+            with immediate_atomic():
+                assert connection.in_atomic_block
+
+        assert queries.captured_queries[0]["sql"] == "BEGIN IMMEDIATE"
+
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                pass
+        assert queries.captured_queries[0]["sql"] == "BEGIN"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_immediate_atomic_rolls_back_on_error(self, user):
+        with pytest.raises(RuntimeError):
+            with immediate_atomic():
+                user.name = "changed"
+                user.save()
+                raise RuntimeError
+
+        user.refresh_from_db()
+        assert user.name != "changed"
@@ -0,0 +1,94 @@
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.api.serializers import FileVersionReadSerializer, FileVersionSerializer
+from propylon_document_manager.file_versions.models import FileVersion
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def versions(user):
+    return [
+        FileVersion.objects.create(
+            file_name=f"doc{number}.pdf",
+            version_number=1,
+            created_by=user,
+            file=SimpleUploadedFile(f"doc{number}.pdf", b"%d" % number),
+            path="docs/bills",
+        )
+        for number in range(3)
+    ]
+
+
+class TestFileVersionReadSerializer:
+    def test_output_is_byte_identical(self, versions):
+        queryset = FileVersion.objects.order_by("pk")
+        reader = FileVersionReadSerializer()
+
+        fast = JSONRenderer().render(reader.many(reader.rows(queryset)))
+        full = JSONRenderer().render(FileVersionSerializer(queryset, many=True).data)
+
+        assert fast == full
+
+    def test_list_and_retrieve_match_model_serializer(self, user, versions):
+        client = APIClient()
+        client.force_authenticate(user)
+
+        listing = client.get(reverse("api:fileversion-list"))
+        detail = client.get(reverse("api:fileversion-detail", args=[versions[0].pk]))
+
+        expected = FileVersionSerializer(FileVersion.objects.all(), many=True).data
+        assert listing.content == JSONRenderer().render(
+            {"count": 3, "next": None, "previous": None, "results": expected}
+        )
+        assert detail.content == JSONRenderer().render(FileVersionSerializer(versions[0]).data)
+
+    def test_retrieve_with_invalid_pk_returns_404(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        assert client.get("/api/file_versions/abc/").status_code == 404
+
+    def test_benchmark_command_checks_equivalence(self, versions):
+        out = StringIO()
+        call_command("benchmark_serialization", repeat=1, stdout=out)
+        assert "Outputs identical over 3 rows" in out.getvalue()
+
+
+class TestSparseFieldsets:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_fields_limit_output_and_columns(self, versions):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("api:fileversion-list"), {"fields": "file_name,id"})
+
+        assert response.data["results"][0] == {"id": versions[0].pk, "file_name": "doc0.pdf"}
+        select = queries.captured_queries[-1]["sql"]
+        assert '"content_hash"' not in select
+        assert '"file_name"' in select
+
+    def test_exclude_drops_fields(self, versions):
+        response = self.client.get(
+            reverse("api:fileversion-detail", args=[versions[0].pk]), {"exclude": "content_hash,created_at"}
+        )
+
+        assert "content_hash" not in response.data
+        assert "created_at" not in response.data
+        assert response.data["file_name"] == "doc0.pdf"
+
+    def test_unknown_fields_are_rejected(self, versions):
+        response = self.client.get(reverse("api:fileversion-list"), {"fields": "id,upload,owner"})
+
+        assert response.status_code == 400
+        assert "owner" in response.data["fields"][0]
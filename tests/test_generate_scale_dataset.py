@@ -0,0 +1,82 @@
+import hashlib
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from propylon_document_manager.file_versions.models import FileVersion, User, compute_content_hash
+
+pytestmark = pytest.mark.django_db
+
+
+def _generate(**options):
+    defaults = {"users": 2, "documents": 3, "versions": 3, "depth": 2, "mean_size": 64, "seed": 7}
+    defaults.update(options)
+    call_command("generate_scale_dataset", stdout=StringIO(), **defaults)
+
+
+def _snapshot():
+    return [
+        (
+            file_version.created_by.email,
+            file_version.path,
+            file_version.file_name,
+            file_version.version_number,
+            hashlib.sha256(file_version.file.read()).hexdigest(),
+        )
+        for file_version in FileVersion.objects.order_by("created_by__email", "file_name", "version_number")
+    ]
+
+
+class TestGenerateScaleDataset:
+    def test_generates_users_and_version_chains(self):
+        _generate()
+
+        assert User.objects.filter(email__startswith="scale-user-7-").count() == 2
+        assert FileVersion.objects.count() >= 6
+        for file_version in FileVersion.objects.all():
+            data = file_version.file.read()
+            assert len(data) == file_version.file_size
+            assert file_version.content_hash == compute_content_hash(
+                data, file_version.version_number, file_version.created_by_id
+            )
+
+    def test_same_seed_produces_same_dataset(self):
+        _generate()
+        first = _snapshot()
+        FileVersion.objects.all().delete()
+        User.objects.all().delete()
+
+        _generate()
+        assert _snapshot() == first
+
+    def test_rerun_keeps_existing_versions(self):
+        _generate()
+        first = _snapshot()
+
+        out = StringIO()
+        call_command(
+            "generate_scale_dataset",
+            stdout=out,
+            users=3,
+            documents=3,
+            versions=3,
+            depth=2,
+            mean_size=64,
+            seed=7,
+        )
+
+        assert f"({len(first)} already present)" in out.getvalue()
+        assert [row for row in _snapshot() if not row[0].endswith("-2@example.com")] == first
+
+    def test_metadata_only_skips_storage(self):
+        _generate(metadata_only=True, size_distribution="fixed")
+
+        file_version = FileVersion.objects.first()
+        assert file_version.file_size == 64
+        assert not file_version.file.storage.exists(file_version.file.name)
+
+    def test_rejects_non_positive_options(self):
+        with pytest.raises(CommandError):
+            _generate(users=0)
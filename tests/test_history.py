@@ -0,0 +1,86 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+HISTORY_URL = "/api/file_versions/history/"
+
+
+class TestDocumentHistory:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        for content in (b"a", b"bb", b"ccc", b"dddd"):
+            self.client.post(
+                "/api/file_versions/",
+                {"upload": SimpleUploadedFile("bill.txt", content), "path": "docs"},
+                format="multipart",
+            )
+        self.client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile("other.txt", b"x"), "path": "docs"},
+            format="multipart",
+        )
+
+    def test_returns_ordered_versions_and_summary(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(HISTORY_URL, {"path": "docs", "file_name": "bill.txt"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [version["version_number"] for version in response.data["versions"]] == [1, 2, 3, 4]
+        summary = response.data["summary"]
+        assert summary["count"] == 4
+        assert summary["total_bytes"] == 10
+        assert summary["first_version"] == 1
+        assert summary["latest_version"] == 4
+        assert summary["first_created_at"] == response.data["versions"][0]["created_at"]
+        assert summary["last_created_at"] == response.data["versions"][-1]["created_at"]
+        assert response.data["next_from_version"] is None
+        assert len(queries) == 1
+
+    def test_range_selection_and_paging(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                HISTORY_URL,
+                {"path": "docs", "file_name": "bill.txt", "from_version": 2, "limit": 2, "fields": "file_size"},
+            )
+
+        assert response.data["versions"] == [{"file_size": 2}, {"file_size": 3}]
+        assert response.data["next_from_version"] == 4
+        assert response.data["summary"]["count"] == 4
+        assert response.data["summary"]["first_version"] == 1
+        assert len(queries) == 1
+
+        response = self.client.get(
+            HISTORY_URL, {"path": "docs", "file_name": "bill.txt", "to_version": 1, "fields": "version_number"}
+        )
+        assert response.data["versions"] == [{"version_number": 1}]
+
+    def test_empty_range_still_reports_the_document(self):
+        response = self.client.get(HISTORY_URL, {"path": "docs", "file_name": "bill.txt", "from_version": 9})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["versions"] == []
+        assert response.data["summary"]["latest_version"] == 4
+
+    def test_unknown_document_returns_404(self):
+        response = self.client.get(HISTORY_URL, {"path": "docs", "file_name": "missing.txt"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_requires_path_and_file_name(self):
+        response = self.client.get(HISTORY_URL, {"path": "docs"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "file_name" in response.data
+
+    def test_other_users_cannot_see_history(self, django_user_model):
+        eve = django_user_model.objects.create_user(email="eve@example.com", name="Eve", password="HackMe123!")
+        self.client.force_authenticate(eve)
+
+        response = self.client.get(HISTORY_URL, {"path": "docs", "file_name": "bill.txt"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,113 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.models import FileVersion
+
+pytestmark = pytest.mark.django_db
+
+LOOKUP_URL = "/api/file_versions/lookup/"
+
+
+class TestBatchLookup:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.user = user
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.versions = {}
+        for path, name, content in [
+            ("docs", "a.txt", b"a1"),
+            ("docs", "a.txt", b"a2"),
+            ("docs", "b.txt", b"b1"),
+            ("archive", "c.txt", b"c1"),
+        ]:
+            data = self.client.post(
+                "/api/file_versions/",
+                {"upload": SimpleUploadedFile(name, content), "path": path},
+                format="multipart",
+            ).data
+            self.versions[content] = data
+
+    def lookup(self, body, **params):
+        query = "&".join(f"{key}={value}" for key, value in params.items())
+        return self.client.post(f"{LOOKUP_URL}?{query}" if query else LOOKUP_URL, body, format="json")
+
+    def test_resolves_latest_and_specific_revisions_in_request_order(self):
+        response = self.lookup(
+            {
+                "documents": [
+                    {"path": "docs", "file_name": "a.txt"},
+                    {"path": "docs", "file_name": "a.txt", "revision": 1},
+                    {"path": "archive", "file_name": "c.txt"},
+                    {"path": "docs", "file_name": "missing.txt"},
+                    {"path": "archive", "file_name": "a.txt"},
+                ]
+            }
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        resolved = [entry["file_version"] for entry in response.data["documents"]]
+        assert resolved[0]["id"] == self.versions[b"a2"]["id"]
+        assert resolved[1]["id"] == self.versions[b"a1"]["id"]
+        assert resolved[2]["id"] == self.versions[b"c1"]["id"]
+        assert resolved[3] is None
+        assert resolved[4] is None
+        assert response.data["documents"][1]["revision"] == 1
+        assert resolved[0] == self.client.get(f"/api/file_versions/{resolved[0]['id']}/").data
+
+    def test_resolves_hashes(self):
+        content_hash = self.versions[b"b1"]["content_hash"]
+
+        response = self.lookup({"hashes": [content_hash.upper(), "0" * 64]})
+
+        assert response.data["hashes"] == [
+            {
+                "content_hash": content_hash,
+                "file_version": self.client.get(f"/api/file_versions/{self.versions[b'b1']['id']}/").data,
+            },
+            {"content_hash": "0" * 64, "file_version": None},
+        ]
+
+    def test_uses_a_few_set_based_queries(self):
+        documents = [{"path": "docs", "file_name": f"doc-{index}.txt"} for index in range(1200)]
+        documents.append({"path": "docs", "file_name": "b.txt"})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.lookup({"documents": documents})
+
+        assert len(queries) == 3
+        assert response.data["documents"][-1]["file_version"]["id"] == self.versions[b"b1"]["id"]
+
+    def test_supports_sparse_fieldsets(self):
+        response = self.lookup({"documents": [{"path": "docs", "file_name": "b.txt"}]}, fields="id,version_number")
+
+        assert response.data["documents"][0]["file_version"] == {
+            "id": self.versions[b"b1"]["id"],
+            "version_number": 1,
+        }
+
+    def test_only_resolves_own_versions(self, admin):
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.post(
+            LOOKUP_URL,
+            {
+                "documents": [{"path": "docs", "file_name": "a.txt"}],
+                "hashes": [self.versions[b"a1"]["content_hash"]],
+            },
+            format="json",
+        )
+
+        assert response.data["documents"][0]["file_version"] is None
+        assert response.data["hashes"][0]["file_version"] is None
+
+    def test_rejects_empty_and_malformed_requests(self):
+        assert self.lookup({}).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.lookup({"hashes": ["xyz"]}).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.lookup({"documents": [{"path": "docs"}]}).status_code == status.HTTP_400_BAD_REQUEST
+        assert FileVersion.objects.count() == 4
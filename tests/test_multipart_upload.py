@@ -0,0 +1,157 @@
+import hashlib
+import os
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.api import views
+from propylon_document_manager.file_versions.models import FileVersion, MultipartUpload, MultipartUploadPart
+from propylon_document_manager.file_versions.multipart import upload_directory
+
+pytestmark = pytest.mark.django_db
+
+UPLOADS_URL = "/api/uploads/"
+
+
+class TestMultipartUpload:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.user = user
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def start(self, path="archive", file_name="dump.bin"):
+        response = self.client.post(UPLOADS_URL, {"path": path, "file_name": file_name}, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.data["id"]
+
+    def put_part(self, upload_id, part_number, data, client=None, **headers):
+        return (client or self.client).put(
+            f"{UPLOADS_URL}{upload_id}/parts/{part_number}/",
+            data,
+            content_type="application/octet-stream",
+            headers=headers,
+        )
+
+    def complete(self, upload_id, **body):
+        return self.client.post(f"{UPLOADS_URL}{upload_id}/complete/", body, format="json")
+
+    def test_parts_sent_out_of_order_join_into_a_version(self):
+        parts = [b"%PDF-1.7 first part ", b"second part ", b"third part"]
+        upload_id = self.start(file_name="report.pdf")
+
+        for number in (3, 1, 2):
+            response = self.put_part(upload_id, number, parts[number - 1])
+            assert response.status_code == status.HTTP_200_OK
+            assert response.data == {
+                "part_number": number,
+                "size": len(parts[number - 1]),
+                "sha256": hashlib.sha256(parts[number - 1]).hexdigest(),
+            }
+        response = self.complete(upload_id)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        content = b"".join(parts)
+        version = FileVersion.objects.get(pk=response.data["id"])
+        assert (version.path, version.file_name, version.version_number) == ("archive", "report.pdf", 1)
+        assert version.content_digest == hashlib.sha256(content).hexdigest()
+        assert version.file_size == len(content)
+        assert version.mime_type == "application/pdf"
+        with version.file.open("rb") as handle:
+            assert handle.read() == content
+        assert not MultipartUpload.objects.exists()
+        assert not os.path.exists(upload_directory(upload_id))
+
+    def test_resent_part_replaces_the_earlier_one_and_selection_is_honoured(self):
+        upload_id = self.start()
+        self.put_part(upload_id, 1, b"stale")
+        self.put_part(upload_id, 1, b"fresh-")
+        self.put_part(upload_id, 2, b"unused")
+        self.put_part(upload_id, 3, b"tail")
+
+        assert [part["part_number"] for part in self.client.get(f"{UPLOADS_URL}{upload_id}/").data["parts"]] == [
+            1,
+            2,
+            3,
+        ]
+        version = FileVersion.objects.get(pk=self.complete(upload_id, parts=[1, 3]).data["id"])
+
+        with version.file.open("rb") as handle:
+            assert handle.read() == b"fresh-tail"
+
+    def test_rejects_bad_checksums_missing_parts_and_completed_uploads(self):
+        upload_id = self.start()
+
+        bad = self.put_part(upload_id, 1, b"data", **{"X-Content-SHA256": "0" * 64})
+        assert bad.status_code == status.HTTP_400_BAD_REQUEST
+        assert self.complete(upload_id).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.put_part(upload_id, 0, b"data").status_code == status.HTTP_400_BAD_REQUEST
+
+        self.put_part(upload_id, 1, b"data")
+        assert self.complete(upload_id, parts=[1, 2]).status_code == status.HTTP_400_BAD_REQUEST
+        MultipartUpload.objects.filter(pk=upload_id).update(state=MultipartUpload.COMPLETING)
+        assert self.put_part(upload_id, 2, b"more").status_code == status.HTTP_409_CONFLICT
+        assert self.complete(upload_id).status_code == status.HTTP_409_CONFLICT
+
+    def test_part_racing_a_complete_is_refused(self, monkeypatch):
+        upload_id = self.start()
+        self.put_part(upload_id, 1, b"first")
+        receive_body = views.receive_body
+        completed = []
+
+        def receive_then_complete(request, file_name):
+            # The upload is completed while the late part is still being received.
+            spooled = receive_body(request, file_name)
+            monkeypatch.setattr(views, "receive_body", receive_body)
+            completed.append(self.complete(upload_id))
+            return spooled
+
+        monkeypatch.setattr(views, "receive_body", receive_then_complete)
+        response = self.put_part(upload_id, 2, b"late")
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert completed[0].status_code == status.HTTP_201_CREATED
+        assert not MultipartUploadPart.objects.exists()
+        assert not os.path.exists(upload_directory(upload_id))
+        with FileVersion.objects.get(pk=completed[0].data["id"]).file.open("rb") as handle:
+            assert handle.read() == b"first"
+
+    def test_enforces_quota_across_parts(self, settings):
+        settings.FILE_VERSION_DEFAULT_STORAGE_QUOTA = 10
+        upload_id = self.start()
+
+        assert self.put_part(upload_id, 1, b"123456").status_code == status.HTTP_200_OK
+        assert self.put_part(upload_id, 2, b"123456").status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    def test_uploads_are_private_and_can_be_aborted(self, admin):
+        upload_id = self.start()
+        self.put_part(upload_id, 1, b"data")
+        other = APIClient()
+        other.force_authenticate(admin)
+
+        assert other.get(f"{UPLOADS_URL}{upload_id}/").status_code == status.HTTP_404_NOT_FOUND
+        assert self.put_part(upload_id, 2, b"data", client=other).status_code == status.HTTP_404_NOT_FOUND
+
+        assert self.client.delete(f"{UPLOADS_URL}{upload_id}/").status_code == status.HTTP_204_NO_CONTENT
+        assert not os.path.exists(upload_directory(upload_id))
+
+    def test_expired_uploads_are_removed(self):
+        stale, fresh, completing = self.start(), self.start(file_name="other.bin"), self.start(file_name="big.bin")
+        self.put_part(stale, 1, b"data")
+        self.put_part(completing, 1, b"data")
+        two_days_ago = timezone.now() - timedelta(days=2)
+        MultipartUpload.objects.filter(pk__in=[stale, completing]).update(created_at=two_days_ago)
+        MultipartUpload.objects.filter(pk=completing).update(state=MultipartUpload.COMPLETING)
+        out = StringIO()
+
+        call_command("expire_multipart_uploads", stdout=out)
+
+        assert "Removed 1 expired uploads" in out.getvalue()
+        assert {str(pk) for pk in MultipartUpload.objects.values_list("pk", flat=True)} == {fresh, completing}
+        assert not os.path.exists(upload_directory(stale))
+        assert os.path.exists(upload_directory(completing))
@@ -0,0 +1,171 @@
+import hashlib
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions import bloom as bloom_module
+from propylon_document_manager.file_versions import models
+from propylon_document_manager.file_versions.bloom import BloomFilter, might_have_content, remember_content
+from propylon_document_manager.file_versions.models import FileVersion, User, compute_content_hash
+
+pytestmark = pytest.mark.django_db
+
+PREFLIGHT_URL = "/api/file_versions/preflight/"
+CONTENT = b"quarterly report"
+
+
+def preflight_body(content=CONTENT, **overrides):
+    return {
+        "content_digest": hashlib.sha256(content).hexdigest(),
+        "file_size": len(content),
+        "path": "reports",
+        "file_name": "q3.txt",
+        **overrides,
+    }
+
+
+class TestBloomFilter:
+    def test_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f"1:{index:064x}" for index in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        assert all(key in bloom for key in keys)
+
+    def test_false_positive_rate_is_near_target(self):
+        bloom = BloomFilter(1000, 0.01)
+        for index in range(1000):
+            bloom.add(f"1:{index:064x}")
+        false_positives = sum(f"2:{index:064x}" in bloom for index in range(10000))
+        assert false_positives < 300
+
+    def test_lookups_do_not_wait_for_a_build(self, monkeypatch):
+        build = bloom_module._build
+        during_build = []
+
+        def build_while_checking():
+            # A concurrent preflight and upload while the table is scanned.
+            during_build.append(might_have_content(1, "a" * 64))
+            remember_content(1, "b" * 64)
+            return build()
+
+        monkeypatch.setattr(bloom_module, "_build", build_while_checking)
+
+        assert not might_have_content(1, "c" * 64)
+        assert during_build == [True]
+        assert might_have_content(1, "b" * 64)
+
+
+class TestUploadPreflight:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.user = user
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def upload(self, content=CONTENT, name="q3.txt", path="reports"):
+        return self.client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile(name, content), "path": path},
+            format="multipart",
+        )
+
+    def test_unknown_content_requires_upload_without_queries(self):
+        self.client.post(PREFLIGHT_URL, preflight_body(b"warm up the filter"), format="json")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(PREFLIGHT_URL, preflight_body(), format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"upload_required": True}
+        assert len(queries) == 0
+        assert not FileVersion.objects.exists()
+
+    def test_known_content_creates_version_by_reference(self):
+        first = self.upload().data
+
+        response = self.client.post(PREFLIGHT_URL, preflight_body(path="archive", file_name="q3.txt"), format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["upload_required"] is False
+        created = response.data["file_version"]
+        assert created["version_number"] == 2
+        assert created["path"] == "archive"
+        assert created["content_digest"] == first["content_digest"]
+        assert FileVersion.objects.get(pk=created["id"]).file.name == FileVersion.objects.get(pk=first["id"]).file.name
+
+        download = self.client.get(f"/api/files/{created['id']}/")
+        assert b"".join(download.streaming_content if download.streaming else [download.content]) == CONTENT
+
+    def test_reference_copies_content_metadata(self):
+        first = self.upload().data
+
+        response = self.client.post(PREFLIGHT_URL, preflight_body(file_name="q3.backup"), format="json")
+
+        created = FileVersion.objects.get(pk=response.data["file_version"]["id"])
+        assert created.mime_type == first["mime_type"] == "text/plain"
+        assert created.file_size == len(CONTENT)
+        assert created.content_digest == first["content_digest"]
+        assert created.content_hash == compute_content_hash(CONTENT, 1, self.user.pk)
+
+    def test_reference_is_read_before_the_write_transaction(self, monkeypatch):
+        self.upload()
+        storage = FileVersion._meta.get_field("file").storage
+        open_file, immediate_atomic = storage.open, models.immediate_atomic
+        events = []
+
+        def tracked_open(*args, **kwargs):
+            events.append("read")
+            return open_file(*args, **kwargs)
+
+        def tracked_atomic():
+            events.append("lock")
+            return immediate_atomic()
+
+        monkeypatch.setattr(storage, "open", tracked_open)
+        monkeypatch.setattr(models, "immediate_atomic", tracked_atomic)
+
+        response = self.client.post(PREFLIGHT_URL, preflight_body(file_name="copy.txt"), format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert events == ["read", "lock"]
+
+    def test_other_users_content_is_never_shared(self):
+        other = User.objects.create_user(email="other@example.com", name="Other", password="Passw0rd!")
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        other_client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile("q3.txt", CONTENT), "path": "reports"},
+            format="multipart",
+        )
+
+        response = self.client.post(PREFLIGHT_URL, preflight_body(), format="json")
+
+        assert response.data == {"upload_required": True}
+
+    def test_size_mismatch_requires_upload(self):
+        self.upload()
+
+        response = self.client.post(PREFLIGHT_URL, preflight_body(file_size=len(CONTENT) + 1), format="json")
+
+        assert response.data == {"upload_required": True}
+
+    def test_rejects_malformed_digest(self):
+        response = self.client.post(PREFLIGHT_URL, preflight_body(content_digest="abc"), format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "content_digest" in response.data
+
+    def test_deleting_a_sharing_version_keeps_the_stored_file(self, django_capture_on_commit_callbacks):
+        first = self.upload().data
+        second = self.client.post(PREFLIGHT_URL, preflight_body(), format="json").data["file_version"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            FileVersion.objects.filter(pk=first["id"]).purge()
+
+        assert FileVersion.objects.get(pk=second["id"]).file.read() == CONTENT
@@ -0,0 +1,71 @@
+import hashlib
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.models import FileVersion, compute_content_hash
+
+pytestmark = pytest.mark.django_db
+
+PDF = b"%PDF-1.7\n" + b"1" * 200_000
+
+
+class TestRawBodyUpload:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.user = user
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def put(self, url, body, **headers):
+        return self.client.generic("PUT", url, body, content_type="application/octet-stream", headers=headers)
+
+    def test_creates_successive_versions(self):
+        first = self.put("/api/files/reports/2024/q3.pdf/", PDF)
+        second = self.put("/api/files/reports/2024/q3.pdf/", b"%PDF-1.7\nrevised")
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert (first.data["version_number"], second.data["version_number"]) == (1, 2)
+        assert first.data["path"] == "reports/2024"
+        assert first.data["file_name"] == "q3.pdf"
+        file_version = FileVersion.objects.get(pk=first.data["id"])
+        assert file_version.file_size == len(PDF)
+        assert file_version.mime_type == "application/pdf"
+        assert file_version.content_hash == compute_content_hash(PDF, 1, self.user.pk)
+        with file_version.file.open("rb") as handle:
+            assert handle.read() == PDF
+
+    def test_is_downloadable_from_the_same_url(self):
+        self.put("/api/files/reports/q3.pdf/", PDF)
+
+        response = self.client.get("/api/files/reports/q3.pdf/")
+
+        assert b"".join(response.streaming_content) == PDF
+
+    def test_verifies_declared_checksum(self):
+        good = self.put("/api/files/reports/a.bin/", PDF, **{"X-Content-SHA256": hashlib.sha256(PDF).hexdigest()})
+        bad = self.put("/api/files/reports/b.bin/", PDF, **{"X-Content-SHA256": "0" * 64})
+
+        assert good.status_code == status.HTTP_201_CREATED
+        assert bad.status_code == status.HTTP_400_BAD_REQUEST
+        assert not FileVersion.objects.filter(file_name="b.bin").exists()
+
+    def test_rejects_invalid_path_and_empty_body(self):
+        assert self.put("/api/files/re:ports/a.bin/", PDF).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.put("/api/files/reports/a.bin/", b"").status_code == status.HTTP_400_BAD_REQUEST
+        assert not FileVersion.objects.exists()
+
+    def test_enforces_quota(self):
+        self.user.storage_quota = 1000
+        self.user.save()
+
+        response = self.put("/api/files/reports/a.bin/", PDF)
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert not FileVersion.objects.exists()
+
+    def test_requires_authentication(self):
+        response = APIClient().generic("PUT", "/api/files/reports/a.bin/", PDF)
+
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
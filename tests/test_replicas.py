@@ -0,0 +1,72 @@
+import pytest
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.models import FileVersion, User
+
+pytestmark = pytest.mark.django_db(databases=["default", "replica"])
+
+
+class TestReplicaRouting:
+    list_url = reverse("api:fileversion-list")
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, settings, user):
+        settings.DATABASE_REPLICAS = ["replica"]
+        settings.DATABASE_REPLICA_STICKINESS = 60
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        # The replica knows the user but has not received any file versions yet.
+        User.objects.using("replica").create(pk=user.pk, email=user.email, name=user.name)
+
+    def _upload(self):
+        return self.client.post(
+            self.list_url,
+            {"upload": SimpleUploadedFile("doc.txt", b"primary"), "path": "docs"},
+            format="multipart",
+        )
+
+    def test_reads_after_own_write_use_primary(self):
+        file_id = self._upload().data["id"]
+
+        response = self.client.get(self.list_url)
+
+        assert [item["id"] for item in response.data["results"]] == [file_id]
+
+    def test_reads_use_replica_once_stickiness_expires(self):
+        self._upload()
+        cache.clear()
+
+        response = self.client.get(self.list_url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"] == []
+
+    def test_downloads_are_served_from_replica(self, user):
+        replicated = FileVersion(
+            file_name="doc.txt",
+            version_number=1,
+            created_by_id=user.pk,
+            file=SimpleUploadedFile("doc.txt", b"replicated"),
+            path="docs",
+        )
+        replicated.save(using="replica")
+
+        response = self.client.get(reverse("api:files-detail", args=[replicated.pk]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b"".join(response.streaming_content) == b"replicated"
+        assert not FileVersion.objects.using("default").exists()
+
+    def test_deletes_use_primary(self):
+        file_id = self._upload().data["id"]
+        cache.clear()
+
+        response = self.client.delete(reverse("api:fileversion-detail", args=[file_id]))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not FileVersion.objects.using("default").filter(pk=file_id).exists()
@@ -0,0 +1,114 @@
+import datetime
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from propylon_document_manager.file_versions.models import FileVersion
+from propylon_document_manager.file_versions.retention import RetentionPolicy
+
+pytestmark = pytest.mark.django_db
+
+NOW = datetime.datetime(2026, 6, 15, 12, tzinfo=datetime.timezone.utc)
+
+
+def history(*days_ago):
+    """Versions numbered from 1, created the given number of days before NOW."""
+    return [(number, number, NOW - datetime.timedelta(days=days)) for number, days in enumerate(days_ago, 1)]
+
+
+class TestRetentionPolicy:
+    def test_keep_last(self):
+        policy = RetentionPolicy(keep_last=2)
+        assert policy.prune(history(5, 4, 3, 2), NOW) == [2, 1]
+
+    def test_latest_version_is_always_kept(self):
+        assert RetentionPolicy().prune(history(3, 2, 1), NOW) == [2, 1]
+
+    def test_keep_daily_keeps_newest_version_per_day(self):
+        policy = RetentionPolicy(keep_daily_days=2)
+        # Versions 2 and 3 share a day, version 1 is outside the window.
+        assert policy.prune(history(5, 1, 1, 0), NOW) == [2, 1]
+
+    def test_keep_monthly(self):
+        policy = RetentionPolicy(keep_monthly=True)
+        assert policy.prune(history(400, 380, 40, 0), NOW) == [1]
+
+    def test_keep_monthly_months_limits_window(self):
+        policy = RetentionPolicy(keep_monthly=True, keep_monthly_months=3)
+        assert policy.prune(history(400, 40, 0), NOW) == [1]
+
+    def test_matches_user_and_path_prefix(self):
+        policy = RetentionPolicy(user="a@example.com", path_prefix="drafts")
+        assert policy.matches("a@example.com", "drafts/2024")
+        assert not policy.matches("a@example.com", "drafts-old")
+        assert not policy.matches("b@example.com", "drafts")
+
+
+class TestEnforceRetentionCommand:
+    def _make_versions(self, user, count, path="docs"):
+        versions = []
+        for number in range(1, count + 1):
+            versions.append(
+                FileVersion.objects.create(
+                    file_name="doc.txt",
+                    version_number=number,
+                    created_by=user,
+                    file=SimpleUploadedFile("doc.txt", b"v%d" % number),
+                    path=path,
+                )
+            )
+        return versions
+
+    def test_prunes_rows_and_files(self, user, settings, django_capture_on_commit_callbacks):
+        settings.FILE_VERSION_RETENTION_POLICIES = [{"keep_last": 2}]
+        versions = self._make_versions(user, 4)
+        storage = versions[0].file.storage
+
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("enforce_retention", batch_size=1, stdout=StringIO())
+
+        assert list(FileVersion.objects.order_by("version_number").values_list("version_number", flat=True)) == [3, 4]
+        assert not storage.exists(versions[0].file.name)
+        assert storage.exists(versions[3].file.name)
+
+    def test_dry_run_deletes_nothing(self, user, settings):
+        settings.FILE_VERSION_RETENTION_POLICIES = [{"keep_last": 1}]
+        self._make_versions(user, 3)
+
+        out = StringIO()
+        call_command("enforce_retention", dry_run=True, stdout=out)
+
+        assert FileVersion.objects.count() == 3
+        assert "Would delete 2" in out.getvalue()
+
+    def test_unmatched_documents_are_untouched(self, user, settings):
+        settings.FILE_VERSION_RETENTION_POLICIES = [{"path_prefix": "drafts", "keep_last": 1}]
+        self._make_versions(user, 3)
+
+        call_command("enforce_retention", stdout=StringIO())
+        assert FileVersion.objects.count() == 3
+
+
+def test_purge_keeps_files_shared_with_remaining_versions(user, django_capture_on_commit_callbacks):
+    first = FileVersion.objects.create(
+        file_name="doc.txt",
+        version_number=1,
+        created_by=user,
+        file=SimpleUploadedFile("doc.txt", b"shared"),
+        path="docs",
+    )
+    second = FileVersion.objects.create(
+        file_name="doc.txt",
+        version_number=2,
+        created_by=user,
+        file=SimpleUploadedFile("doc.txt", b"other"),
+        path="docs",
+    )
+    FileVersion.objects.filter(pk=second.pk).update(file=first.file.name)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        FileVersion.objects.filter(pk=first.pk).purge()
+
+    assert first.file.storage.exists(first.file.name)
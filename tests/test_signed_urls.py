@@ -0,0 +1,117 @@
+from urllib.parse import urlsplit
+
+import pytest
+from django.core import signing
+from django.core.checks import run_checks
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions import access
+from propylon_document_manager.file_versions.access import flush_access_stats
+from propylon_document_manager.file_versions.models import FileVersion
+from propylon_document_manager.file_versions.signedurls import sign_download, verify_download
+
+pytestmark = pytest.mark.django_db
+
+
+class TestSignedDownloads:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        pk = self.client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile("report.pdf", b"%PDF-1.7 signed"), "path": "reports"},
+            format="multipart",
+        ).data["id"]
+        self.version = FileVersion.objects.get(pk=pk)
+
+    def sign(self, **params):
+        response = self.client.get(f"/api/file_versions/{self.version.pk}/signed_url/", params)
+        assert response.status_code == status.HTTP_200_OK
+        return urlsplit(response.data["url"]).path
+
+    def test_downloads_without_credentials_or_queries(self, django_assert_num_queries):
+        url = self.sign(expires_in=60)
+
+        with django_assert_num_queries(0):
+            response = APIClient().get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b"".join(response.streaming_content) == b"%PDF-1.7 signed"
+        assert response["Content-Type"] == "application/pdf"
+        assert 'filename="report.pdf"' in response["Content-Disposition"]
+        assert response["ETag"] == f'"{self.version.content_hash}"'
+        assert 0 < int(response["Cache-Control"].split("max-age=")[1]) <= 60
+        flush_access_stats()
+        self.version.refresh_from_db()
+        assert self.version.download_count == 1
+
+    def test_due_statistics_are_flushed_in_the_background(self, settings, monkeypatch, django_assert_num_queries):
+        settings.FILE_VERSION_ACCESS_STATS = {"FLUSH_INTERVAL": 3600, "MAX_PENDING": 1}
+        url = self.sign()
+        started = []
+        monkeypatch.setattr(access, "_flush_in_background", lambda: started.append(True))
+
+        with django_assert_num_queries(0):
+            response = APIClient().get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert started == [True]
+        assert flush_access_stats() == 1
+
+    def test_revalidation_is_answered_from_the_token(self, django_assert_num_queries):
+        url = self.sign()
+
+        with django_assert_num_queries(0):
+            response = APIClient().get(url, headers={"If-None-Match": f'"{self.version.content_hash}"'})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_rejects_tampered_and_expired_tokens(self):
+        token, _ = sign_download(self.version, expires_in=60)
+        forged = signing.dumps({**verify_download(token), "name": "user_2/secret.pdf"}, salt="other")
+        expired, _ = sign_download(self.version, expires_in=-1)
+
+        for bad in (token[:-2] + "xx", forged, expired):
+            response = APIClient().get(f"/signed/{bad}/report.pdf")
+            assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert APIClient().post(f"/signed/{token}/report.pdf").status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    def test_limits_lifetime_and_ownership(self, admin):
+        url = f"/api/file_versions/{self.version.pk}/signed_url/"
+        other = APIClient()
+        other.force_authenticate(admin)
+
+        assert self.client.get(url, {"expires_in": 10**9}).status_code == status.HTTP_400_BAD_REQUEST
+        assert other.get(url).status_code == status.HTTP_404_NOT_FOUND
+        assert APIClient().get(url).status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+    def test_missing_files_are_not_found(self):
+        url = self.sign()
+        self.version.file.storage.delete(self.version.file.name)
+
+        assert APIClient().get(url).status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize(
+        "offload, header", [("x-accel-redirect", "X-Accel-Redirect"), ("x-sendfile", "X-Sendfile")]
+    )
+    def test_offloads_to_the_web_server(self, settings, offload, header):
+        settings.FILE_VERSION_SIGNED_URLS = {**settings.FILE_VERSION_SIGNED_URLS, "OFFLOAD": offload}
+
+        response = APIClient().get(self.sign())
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == b""
+        expected = {
+            "x-accel-redirect": f"/protected-media/{self.version.file.name}",
+            "x-sendfile": self.version.file.path,
+        }[offload]
+        assert response[header] == expected
+        assert 'filename="report.pdf"' in response["Content-Disposition"]
+
+    def test_unknown_offload_fails_the_checks(self, settings):
+        settings.FILE_VERSION_SIGNED_URLS = {**settings.FILE_VERSION_SIGNED_URLS, "OFFLOAD": "sendfile"}
+
+        assert "file_versions.E001" in [message.id for message in run_checks()]
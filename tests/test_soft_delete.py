@@ -0,0 +1,158 @@
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.models import FileVersion, FileVersionChange, StorageUsage
+
+pytestmark = pytest.mark.django_db
+
+DELETE_PREFIX_URL = "/api/file_versions/delete_prefix/"
+
+
+class TestSoftDelete:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.user = user
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def upload(self, path="docs", name="a.txt", content=b"content"):
+        return self.client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile(name, content), "path": path},
+            format="multipart",
+        ).data
+
+    def test_delete_hides_the_version_until_it_is_purged(self, django_capture_on_commit_callbacks):
+        created = self.upload()
+        stored = FileVersion.objects.get(pk=created["id"]).file.name
+        storage = FileVersion._meta.get_field("file").storage
+
+        assert self.client.delete(f"/api/file_versions/{created['id']}/").status_code == status.HTTP_204_NO_CONTENT
+
+        assert self.client.get(f"/api/file_versions/{created['id']}/").status_code == status.HTTP_404_NOT_FOUND
+        assert FileVersion.all_objects.get(pk=created["id"]).deleted_at is not None
+        assert storage.exists(stored)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("purge_deleted_file_versions", stdout=StringIO())
+
+        assert not FileVersion.all_objects.filter(pk=created["id"]).exists()
+        assert not storage.exists(stored)
+
+    def test_delete_prefix_marks_the_whole_folder_in_one_update(self):
+        kept = [self.upload(path="docs-old"), self.upload(path="docsx", name="b.txt"), self.upload(path="other")]
+        deleted = [self.upload(path="docs"), self.upload(path="docs/2024", name="b.txt"), self.upload(path="docs/a/b")]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(DELETE_PREFIX_URL, {"path": "docs/"}, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"path": "docs", "deleted": 3}
+        writes = [query["sql"] for query in queries if query["sql"].startswith(("UPDATE", "INSERT", "DELETE"))]
+        assert len(writes) == 1
+        assert writes[0].startswith('UPDATE "file_versions_fileversion"')
+        remaining = {item["id"] for item in self.client.get("/api/file_versions/").data["results"]}
+        assert remaining == {version["id"] for version in kept}
+        assert set(FileVersion.all_objects.exclude(deleted_at=None).values_list("pk", flat=True)) == {
+            version["id"] for version in deleted
+        }
+
+    def test_deletions_are_recorded_in_short_batches(self):
+        for index in range(5):
+            self.upload(name=f"{index}.txt", content=b"x" * (index + 1))
+        FileVersion.objects.filter(created_by=self.user).under_path("docs").soft_delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            recorded = FileVersion.all_objects.record_deletions(batch_size=2)
+
+        assert recorded == 5
+        updates = [query["sql"] for query in queries if query["sql"].startswith('UPDATE "file_versions_fileversion"')]
+        assert len(updates) == 3
+        usage = StorageUsage.objects.get(user=self.user, prefix="docs")
+        assert (usage.bytes_used, usage.version_count) == (0, 0)
+        assert FileVersionChange.objects.filter(kind=FileVersionChange.DELETED).count() == 5
+        assert FileVersion.all_objects.record_deletions() == 0
+
+    def test_delete_releases_usage_and_logs_once(self, django_capture_on_commit_callbacks):
+        self.upload(content=b"aaaa")
+        self.upload(path="docs/sub", name="b.txt", content=b"bb")
+
+        self.client.post(DELETE_PREFIX_URL, {"path": "docs"}, format="json")
+
+        usage = StorageUsage.objects.get(user=self.user, prefix="docs")
+        assert (usage.bytes_used, usage.version_count) == (6, 2)
+        call_command("purge_deleted_file_versions", older_than=60, stdout=StringIO())
+        usage.refresh_from_db()
+        assert (usage.bytes_used, usage.version_count) == (0, 0)
+        assert FileVersion.all_objects.count() == 2
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("purge_deleted_file_versions", batch_size=1, stdout=StringIO())
+        usage.refresh_from_db()
+        assert (usage.bytes_used, usage.version_count) == (0, 0)
+        kinds = list(FileVersionChange.objects.filter(user=self.user).values_list("kind", flat=True))
+        assert kinds == ["created", "created", "deleted", "deleted"]
+
+    def test_purge_releases_unrecorded_deletions(self, django_capture_on_commit_callbacks):
+        created = self.upload(content=b"aaaa")
+        FileVersion.objects.filter(pk=created["id"]).soft_delete()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            FileVersion.all_objects.filter(pk=created["id"]).purge()
+
+        usage = StorageUsage.objects.get(user=self.user, prefix="docs")
+        assert (usage.bytes_used, usage.version_count) == (0, 0)
+        assert FileVersionChange.objects.filter(kind=FileVersionChange.DELETED).count() == 1
+
+    def test_reconcile_counts_deletions_until_recorded(self):
+        self.upload(content=b"aaaa")
+        self.client.post(DELETE_PREFIX_URL, {"path": "docs"}, format="json")
+
+        assert StorageUsage.objects.reconcile() == 0
+        FileVersion.all_objects.record_deletions()
+        assert StorageUsage.objects.reconcile() == 0
+
+    def test_numbering_continues_past_deleted_versions(self):
+        first = self.upload()
+        self.client.delete(f"/api/file_versions/{first['id']}/")
+
+        assert self.upload()["version_number"] == 2
+
+    def test_purge_keeps_files_shared_with_live_versions(self, django_capture_on_commit_callbacks):
+        first = self.upload(content=b"same")
+        self.client.delete(f"/api/file_versions/{first['id']}/")
+        name = FileVersion.all_objects.get(pk=first["id"]).file.name
+        FileVersion.objects.create_next_version(self.user, "docs", "copy.txt", name)
+        storage = FileVersion._meta.get_field("file").storage
+
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("purge_deleted_file_versions", stdout=StringIO())
+
+        assert storage.exists(name)
+
+    def test_purge_respects_grace_period(self):
+        first = self.upload()
+        self.client.delete(f"/api/file_versions/{first['id']}/")
+
+        call_command("purge_deleted_file_versions", older_than=60, stdout=StringIO())
+
+        assert FileVersion.all_objects.filter(pk=first["id"]).exists()
+
+    def test_delete_prefix_only_touches_own_versions(self, admin):
+        created = self.upload()
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.post(DELETE_PREFIX_URL, {"path": "docs"}, format="json")
+
+        assert response.data["deleted"] == 0
+        assert FileVersion.objects.filter(pk=created["id"]).exists()
+
+    def test_delete_prefix_validates_path(self):
+        assert self.client.post(DELETE_PREFIX_URL, {"path": "/docs"}, format="json").status_code == 400
@@ -0,0 +1,78 @@
+import os
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from propylon_document_manager.file_versions.models import FileVersion
+
+pytestmark = pytest.mark.django_db
+
+FLAT_LAYOUT = "propylon_document_manager.file_versions.storage.flat_layout"
+
+
+def make_version(user, version_number=1, content=b"hello"):
+    return FileVersion.objects.create(
+        file_name="doc.txt",
+        version_number=version_number,
+        created_by=user,
+        file=SimpleUploadedFile("doc.txt", content),
+        path="docs/bills",
+    )
+
+
+class TestStorageLayout:
+    def test_sharded_layout_fans_out_below_user_directory(self, user, settings):
+        settings.FILE_VERSION_STORAGE_FANOUT_DEPTH = 2
+        parts = make_version(user).file.name.split("/")
+
+        assert parts[0] == f"user_{user.pk}"
+        assert all(len(shard) == 2 for shard in parts[1:3])
+        assert parts[3:] == ["docs", "bills", "rev_1-doc.txt"]
+
+    def test_flat_layout_keeps_legacy_names(self, user, settings):
+        settings.FILE_VERSION_STORAGE_LAYOUT = FLAT_LAYOUT
+        assert make_version(user).file.name == f"user_{user.pk}/docs/bills/rev_1-doc.txt"
+
+
+class TestRelayoutCommand:
+    def test_moves_files_and_updates_rows(self, user, settings):
+        settings.FILE_VERSION_STORAGE_LAYOUT = FLAT_LAYOUT
+        versions = [make_version(user, number, b"v%d" % number) for number in (1, 2)]
+        storage = versions[0].file.storage
+        settings.FILE_VERSION_STORAGE_LAYOUT = "propylon_document_manager.file_versions.storage.sharded_layout"
+
+        call_command("relayout_file_versions", batch_size=1, stdout=StringIO())
+
+        for old in versions:
+            moved = FileVersion.objects.get(pk=old.pk)
+            assert moved.file.name != old.file.name
+            assert moved.file.name.count("/") == 5
+            assert moved.file.read() == b"v%d" % old.version_number
+            assert not storage.exists(old.file.name)
+
+    def test_shared_files_move_once(self, user, settings):
+        settings.FILE_VERSION_STORAGE_LAYOUT = FLAT_LAYOUT
+        first = make_version(user)
+        second = make_version(user, 2)
+        FileVersion.objects.filter(pk=second.pk).update(file=first.file.name)
+        os.remove(second.file.path)
+        settings.FILE_VERSION_STORAGE_LAYOUT = "propylon_document_manager.file_versions.storage.sharded_layout"
+
+        call_command("relayout_file_versions", stdout=StringIO())
+
+        names = set(FileVersion.objects.values_list("file", flat=True))
+        assert len(names) == 1
+        assert FileVersion.objects.get(pk=second.pk).file.read() == b"hello"
+
+    def test_dry_run_moves_nothing(self, user, settings):
+        settings.FILE_VERSION_STORAGE_LAYOUT = FLAT_LAYOUT
+        version = make_version(user)
+        settings.FILE_VERSION_STORAGE_LAYOUT = "propylon_document_manager.file_versions.storage.sharded_layout"
+
+        out = StringIO()
+        call_command("relayout_file_versions", dry_run=True, stdout=out)
+
+        assert FileVersion.objects.get(pk=version.pk).file.name == version.file.name
+        assert "Would move 1" in out.getvalue()
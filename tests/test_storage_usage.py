@@ -0,0 +1,129 @@
+import hashlib
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.api.exceptions import StorageQuotaExceeded
+from propylon_document_manager.file_versions.models import FileVersion, StorageUsage
+
+pytestmark = pytest.mark.django_db
+
+
+def usage_of(user):
+    return {usage.prefix: (usage.bytes_used, usage.version_count) for usage in StorageUsage.objects.filter(user=user)}
+
+
+class TestStorageUsage:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.user = user
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def upload(self, content, name="a.txt", path="docs"):
+        return self.client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile(name, content), "path": path},
+            format="multipart",
+        )
+
+    def test_counts_uploads_per_top_level_prefix(self):
+        self.upload(b"aaaa", path="docs/2024")
+        self.upload(b"bb", name="b.txt", path="docs")
+        self.upload(b"c", path="drafts/q1")
+
+        assert usage_of(self.user) == {"docs": (6, 2), "drafts": (1, 1)}
+
+    def test_deletes_release_usage(self, django_capture_on_commit_callbacks):
+        first = self.upload(b"aaaa").data
+        second = self.upload(b"bb").data
+
+        self.client.delete(f"/api/file_versions/{first['id']}/")
+        assert usage_of(self.user) == {"docs": (2, 1)}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            FileVersion.objects.filter(pk=second["id"]).purge()
+        assert usage_of(self.user) == {"docs": (0, 0)}
+
+    def test_me_reports_usage_and_quota(self, settings):
+        settings.FILE_VERSION_DEFAULT_STORAGE_QUOTA = 1000
+        self.upload(b"aaaa", path="docs/2024")
+        self.upload(b"c", path="drafts")
+
+        response = self.client.get("/api/users/me/")
+
+        assert response.data["storage"] == {
+            "quota": 1000,
+            "bytes_used": 5,
+            "version_count": 2,
+            "prefixes": [
+                {"prefix": "docs", "bytes_used": 4, "version_count": 1},
+                {"prefix": "drafts", "bytes_used": 1, "version_count": 1},
+            ],
+        }
+
+    def test_upload_over_quota_is_refused_from_content_length(self):
+        self.user.storage_quota = 100
+        self.user.save()
+
+        response = self.upload(b"x" * 200)
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert not FileVersion.objects.exists()
+
+    def test_quota_counts_existing_usage(self):
+        self.user.storage_quota = 2048
+        self.user.save()
+        assert self.upload(b"x" * 1024).status_code == status.HTTP_201_CREATED
+        # Only the file counts, not the multipart framing around it.
+        assert self.upload(b"y" * 1024).status_code == status.HTTP_201_CREATED
+
+        response = self.upload(b"z")
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert FileVersion.objects.count() == 2
+
+    def test_quota_is_checked_when_the_version_is_written(self):
+        self.upload(b"x" * 10)
+        self.user.storage_quota = 15
+        self.user.save()
+
+        with pytest.raises(StorageQuotaExceeded):
+            FileVersion.objects.create_next_version(self.user, "docs", "b.txt", SimpleUploadedFile("b.txt", b"y" * 6))
+
+        assert FileVersion.objects.count() == 1
+        assert usage_of(self.user) == {"docs": (10, 1)}
+
+    def test_preflight_respects_quota(self):
+        self.upload(b"x" * 600)
+        self.user.storage_quota = 1000
+        self.user.save()
+
+        response = self.client.post(
+            "/api/file_versions/preflight/",
+            {
+                "content_digest": hashlib.sha256(b"x" * 600).hexdigest(),
+                "file_size": 600,
+                "path": "docs",
+                "file_name": "a.txt",
+            },
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    def test_reconcile_repairs_drift(self):
+        self.upload(b"aaaa", path="docs")
+        self.upload(b"bb", path="drafts")
+        StorageUsage.objects.filter(user=self.user, prefix="docs").update(bytes_used=999)
+        StorageUsage.objects.filter(user=self.user, prefix="drafts").delete()
+        StorageUsage.objects.create(user=self.user, prefix="gone", bytes_used=5, version_count=1)
+
+        call_command("reconcile_storage_usage", "--dry-run")
+        assert usage_of(self.user)["docs"] == (999, 1)
+
+        call_command("reconcile_storage_usage", "--user", self.user.email)
+        assert usage_of(self.user) == {"docs": (4, 1), "drafts": (2, 1)}
@@ -0,0 +1,141 @@
+import io
+import shutil
+import threading
+import time
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions import thumbnails
+from propylon_document_manager.file_versions.models import FileVersion
+
+pytestmark = pytest.mark.django_db
+
+
+def png_bytes(width=800, height=600) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(output, "PNG")
+    return output.getvalue()
+
+
+class TestThumbnails:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def upload(self, content, name="photo.png"):
+        response = self.client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile(name, content), "path": "pictures"},
+            format="multipart",
+        )
+        return response.data["id"]
+
+    def thumbnail(self, pk, size=128, **headers):
+        return self.client.get(f"/api/file_versions/{pk}/thumbnail/", {"size": size}, headers=headers)
+
+    def test_renders_bounded_thumbnail_with_strong_caching(self):
+        pk = self.upload(png_bytes())
+
+        response = self.thumbnail(pk)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "image/webp"
+        assert "immutable" in response["Cache-Control"]
+        assert "private" in response["Cache-Control"]
+        assert response["ETag"] == f'"{FileVersion.objects.get(pk=pk).content_digest}-128"'
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            assert image.size == (128, 96)
+
+    def test_revalidation_returns_not_modified(self, monkeypatch):
+        pk = self.upload(png_bytes())
+        etag = self.thumbnail(pk)["ETag"]
+        monkeypatch.setattr(thumbnails, "render_thumbnail", lambda *args: pytest.fail("rendered again"))
+
+        response = self.thumbnail(pk, **{"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_versions_with_the_same_content_share_a_rendition(self, monkeypatch):
+        first = self.upload(png_bytes())
+        second = self.upload(png_bytes(), name="copy.png")
+        self.thumbnail(first)
+
+        def fail(*args):
+            raise AssertionError("rendered again")
+
+        monkeypatch.setattr(thumbnails, "render_thumbnail", fail)
+
+        assert self.thumbnail(second).status_code == status.HTTP_200_OK
+
+    def test_rejects_unconfigured_size(self):
+        pk = self.upload(png_bytes())
+
+        assert self.thumbnail(pk, size=100).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_no_preview_for_other_types_or_broken_images(self):
+        text = self.upload(b"plain text", name="notes.txt")
+        broken = self.upload(b"\x89PNG\r\n\x1a\nnot really", name="broken.png")
+
+        assert self.thumbnail(text).status_code == status.HTTP_404_NOT_FOUND
+        assert self.thumbnail(broken).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_other_users_versions_are_not_found(self, admin):
+        pk = self.upload(png_bytes())
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get(f"/api/file_versions/{pk}/thumbnail/", {"size": 128})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.skipif(shutil.which("pdftoppm") is None, reason="poppler-utils is not installed")
+    def test_renders_first_page_of_pdf(self):
+        pdf = (
+            b"%PDF-1.1\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+            b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+            b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 400 200]>>endobj\n"
+            b"trailer<</Root 1 0 R>>\n%%EOF\n"
+        )
+        pk = self.upload(pdf, name="memo.pdf")
+
+        response = self.thumbnail(pk)
+
+        assert response.status_code == status.HTTP_200_OK
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            assert max(image.size) == 128
+
+
+def test_concurrent_requests_render_once(user, monkeypatch):
+    client = APIClient()
+    client.force_authenticate(user)
+    pk = client.post(
+        "/api/file_versions/",
+        {"upload": SimpleUploadedFile("photo.png", png_bytes()), "path": "pictures"},
+        format="multipart",
+    ).data["id"]
+    file_version = FileVersion.objects.get(pk=pk)
+    renders = []
+    render = thumbnails.render_thumbnail
+
+    def slow_render(*args):
+        renders.append(1)
+        time.sleep(0.05)
+        return render(*args)
+
+    monkeypatch.setattr(thumbnails, "render_thumbnail", slow_render)
+    names = []
+    workers = [
+        threading.Thread(target=lambda: names.append(thumbnails.get_thumbnail(file_version, 256))) for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(renders) == 1
+    assert len(set(names)) == 1
@@ -0,0 +1,199 @@
+import os
+import shutil
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.access import flush_access_stats
+from propylon_document_manager.file_versions.models import FileVersion
+from propylon_document_manager.file_versions.storage import TieredStorage
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def tiering(settings, tmpdir):
+    settings.FILE_VERSION_TIERING = {
+        **settings.FILE_VERSION_TIERING,
+        "COLD_OPTIONS": {"location": tmpdir.join("cold").strpath},
+        "COMPRESS": False,
+        "PROMOTE_ON_ACCESS": False,
+    }
+    os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+    return settings.FILE_VERSION_TIERING
+
+
+class TestTieredStorage:
+    @pytest.fixture(autouse=True)
+    def _setup(self, tiering):
+        self.tiering = tiering
+        self.storage = TieredStorage()
+
+    @pytest.mark.parametrize("compress", [False, True])
+    def test_reads_files_from_either_tier(self, compress):
+        self.tiering["COMPRESS"] = compress
+        name = self.storage.save("user_1/docs/a.txt", ContentFile(b"payload" * 100))
+
+        assert self.storage.demote(name)
+
+        assert not self.storage.is_hot(name)
+        assert self.storage.exists(name)
+        assert self.storage.size(name) == 700
+        with self.storage.open(name, "rb") as handle:
+            assert handle.read() == b"payload" * 100
+        cold_name = name + ".gz" if compress else name
+        assert self.storage.cold.exists(cold_name)
+        assert (self.storage.cold.size(cold_name) < 700) is compress
+
+        assert self.storage.promote(name)
+
+        assert self.storage.is_hot(name)
+        assert not self.storage.cold.exists(cold_name)
+        with self.storage.open(name, "rb") as handle:
+            assert handle.read() == b"payload" * 100
+
+    def test_moves_are_idempotent_and_delete_clears_both_tiers(self):
+        name = self.storage.save("user_1/docs/a.txt", ContentFile(b"payload"))
+
+        assert not self.storage.promote(name)
+        assert self.storage.demote(name)
+        assert not self.storage.demote(name)
+        self.storage.delete(name)
+
+        assert not self.storage.exists(name)
+
+    def test_concurrent_promotions_both_succeed(self, monkeypatch):
+        name = self.storage.save("user_1/docs/a.txt", ContentFile(b"payload"))
+        self.storage.demote(name)
+        copy = shutil.copyfileobj
+        nested = []
+
+        def copy_and_promote_again(source, target):
+            # The second promotion starts and finishes while the first copies.
+            monkeypatch.setattr(shutil, "copyfileobj", copy)
+            nested.append(self.storage.promote(name))
+            copy(source, target)
+
+        monkeypatch.setattr(shutil, "copyfileobj", copy_and_promote_again)
+
+        assert self.storage.promote(name)
+        assert nested == [True]
+        with self.storage.open(name, "rb") as handle:
+            assert handle.read() == b"payload"
+        assert os.listdir(os.path.dirname(self.storage.path(name))) == ["a.txt"]
+
+    def test_new_names_avoid_cold_files(self):
+        name = self.storage.save("user_1/docs/a.txt", ContentFile(b"old"))
+        self.storage.demote(name)
+
+        assert self.storage.save("user_1/docs/a.txt", ContentFile(b"new")) != name
+
+
+class TestTierCommand:
+    @pytest.fixture(autouse=True)
+    def _setup(self, user, tiering, monkeypatch):
+        self.tiering = tiering
+        self.storage = TieredStorage()
+        monkeypatch.setattr(FileVersion._meta.get_field("file"), "storage", self.storage)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def upload(self, name="a.txt", content=b"content", days_unread=0):
+        pk = self.client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile(name, content), "path": "docs"},
+            format="multipart",
+        ).data["id"]
+        FileVersion.objects.filter(pk=pk).update(last_accessed_at=timezone.now() - timedelta(days=days_unread))
+        return FileVersion.objects.get(pk=pk)
+
+    def tier(self, **options):
+        out = StringIO()
+        call_command("tier_file_versions", stdout=out, **options)
+        return out.getvalue()
+
+    def test_moves_unread_versions_to_the_cold_tier(self):
+        stale = self.upload(days_unread=120)
+        fresh = self.upload(name="b.txt", content=b"fresh", days_unread=1)
+
+        assert "Would move 1 files" in self.tier(dry_run=True)
+        assert "Moved 1 files" in self.tier()
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        assert stale.storage_tier == FileVersion.COLD
+        assert not self.storage.is_hot(stale.file.name)
+        assert fresh.storage_tier == FileVersion.HOT
+        assert "Moved 0 files" in self.tier(days=30)
+
+    def test_downloads_read_cold_versions_and_can_promote_them(self):
+        stale = self.upload(days_unread=120)
+        self.tier()
+
+        response = self.client.get(f"/api/files/{stale.pk}/")
+
+        assert b"".join(response.streaming_content) == b"content"
+        flush_access_stats()
+        stale.refresh_from_db()
+        assert stale.storage_tier == FileVersion.COLD
+        assert stale.last_accessed_at > timezone.now() - timedelta(minutes=1)
+
+        self.tiering["PROMOTE_ON_ACCESS"] = True
+        response = self.client.get(f"/api/files/{stale.pk}/")
+
+        # The download is served from the cold tier and only queues the promotion.
+        assert b"".join(response.streaming_content) == b"content"
+        assert not self.storage.is_hot(stale.file.name)
+        flush_access_stats()
+        output = self.tier()
+
+        assert "Promoted 1 files" in output
+        assert "Moved 0 files" in output
+        stale.refresh_from_db()
+        assert stale.storage_tier == FileVersion.HOT
+        assert self.storage.is_hot(stale.file.name)
+
+    def test_files_shared_with_recently_read_versions_stay_hot(self, user):
+        stale = self.upload(days_unread=120)
+        shared = FileVersion.objects.create_next_version(user, "docs", "copy.txt", stale.file.name)
+
+        self.tier()
+
+        stale.refresh_from_db()
+        assert stale.storage_tier == FileVersion.HOT
+        assert shared.file.name == stale.file.name
+
+    def test_preflight_reference_keeps_the_cold_tier(self):
+        stale = self.upload(days_unread=120)
+        self.tier()
+
+        response = self.client.post(
+            "/api/file_versions/preflight/",
+            {
+                "content_digest": stale.content_digest,
+                "file_size": stale.file_size,
+                "path": "archive",
+                "file_name": "a.txt",
+            },
+            format="json",
+        )
+
+        created = FileVersion.objects.get(pk=response.data["file_version"]["id"])
+        assert created.storage_tier == FileVersion.COLD
+        FileVersion.objects.filter(pk=created.pk).update(last_accessed_at=timezone.now() - timedelta(days=1))
+        self.tiering["PROMOTE_ON_ACCESS"] = True
+        self.client.get(f"/api/files/{created.pk}/")
+        flush_access_stats()
+        assert "Promoted 1 files" in self.tier()
+
+    def test_requires_tiered_storage(self, monkeypatch):
+        monkeypatch.setattr(FileVersion._meta.get_field("file"), "storage", object())
+
+        with pytest.raises(CommandError):
+            self.tier()
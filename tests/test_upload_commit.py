@@ -0,0 +1,104 @@
+import errno
+import os
+
+import pytest
+from django.core.checks import run_checks
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management import call_command
+
+from propylon_document_manager.file_versions import storage as storage_module
+from propylon_document_manager.file_versions.storage import CommittingFileSystemStorage
+
+
+def spooled(content: bytes) -> TemporaryUploadedFile:
+    upload = TemporaryUploadedFile("a.bin", "application/octet-stream", len(content), None)
+    upload.write(content)
+    upload.seek(0)
+    return upload
+
+
+class TestCommittingFileSystemStorage:
+    @pytest.fixture(autouse=True)
+    def _setup(self, settings):
+        os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        self.storage = CommittingFileSystemStorage()
+
+    def test_commits_spooled_upload_by_rename(self):
+        with spooled(b"payload") as upload:
+            temp_path = upload.temporary_file_path()
+            inode = os.stat(temp_path).st_ino
+
+            name = self.storage.save("user_1/docs/a.bin", upload)
+
+        assert name == "user_1/docs/a.bin"
+        assert os.stat(self.storage.path(name)).st_ino == inode
+        assert not os.path.exists(temp_path)
+        with self.storage.open(name, "rb") as handle:
+            assert handle.read() == b"payload"
+
+    def test_never_replaces_an_existing_file(self):
+        self.storage.save("docs/a.bin", ContentFile(b"first"))
+
+        with spooled(b"second") as upload:
+            name = self.storage.save("docs/a.bin", upload)
+
+        assert name != "docs/a.bin"
+        with self.storage.open("docs/a.bin", "rb") as handle:
+            assert handle.read() == b"first"
+        with self.storage.open(name, "rb") as handle:
+            assert handle.read() == b"second"
+
+    def test_copies_across_devices(self, monkeypatch):
+        def cross_device_link(source, target):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(storage_module.os, "link", cross_device_link)
+
+        with spooled(b"payload") as upload:
+            name = self.storage.save("docs/a.bin", upload)
+
+        with self.storage.open(name, "rb") as handle:
+            assert handle.read() == b"payload"
+
+    @pytest.mark.parametrize("policy", ["none", "file", "directory"])
+    def test_fsync_policies(self, settings, policy):
+        settings.FILE_VERSION_STORAGE_FSYNC = policy
+
+        with spooled(b"payload") as upload:
+            assert self.storage.save("docs/a.bin", upload) == "docs/a.bin"
+        assert self.storage.save("docs/b.bin", ContentFile(b"payload")) == "docs/b.bin"
+
+    def test_rejects_unknown_fsync_policy(self, settings):
+        settings.FILE_VERSION_STORAGE_FSYNC = "always"
+
+        with spooled(b"payload") as upload, pytest.raises(ImproperlyConfigured):
+            self.storage.save("docs/a.bin", upload)
+
+
+class TestUploadTempDirCheck:
+    def test_warns_without_upload_temp_dir(self, settings):
+        settings.FILE_UPLOAD_TEMP_DIR = None
+
+        assert "file_versions.W001" in [message.id for message in run_checks()]
+
+    def test_silent_when_temp_dir_shares_the_media_file_system(self):
+        ids = [message.id for message in run_checks()]
+
+        assert "file_versions.W001" not in ids
+        assert "file_versions.W002" not in ids
+        assert "file_versions.W003" not in ids
+
+    def test_warns_when_temp_dir_is_inside_media_root(self, settings):
+        settings.FILE_UPLOAD_TEMP_DIR = f"{settings.MEDIA_ROOT}/.uploads"
+
+        assert "file_versions.W003" in [message.id for message in run_checks()]
+
+
+def test_benchmark_upload_commit(capsys):
+    call_command("benchmark_upload_commit", "--size", "65536", "--runs", "1")
+
+    output = capsys.readouterr().out
+    assert "rename:" in output
+    assert "copy:" in output
@@ -0,0 +1,128 @@
+import hashlib
+
+import pytest
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.middleware.csrf import _get_new_csrf_string
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from propylon_document_manager.file_versions.api.exceptions import StorageQuotaExceeded
+from propylon_document_manager.file_versions.models import FileVersion, compute_content_hash
+from propylon_document_manager.file_versions.uploadhandlers import (
+    HashedUploadedFile,
+    HashingUploadHandler,
+    sniff_mime_type,
+)
+
+pytestmark = pytest.mark.django_db
+
+PDF = b"%PDF-1.7\n" + b"0" * 100
+
+
+class TestSniffMimeType:
+    def test_magic_bytes_win_over_extension(self):
+        assert sniff_mime_type(PDF, "report.txt") == "application/pdf"
+
+    def test_zip_containers_keep_extension_type(self):
+        assert sniff_mime_type(b"PK\x03\x04rest", "memo.docx") == (
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
+        assert sniff_mime_type(b"PK\x03\x04rest", "archive") == "application/zip"
+
+    def test_unknown_bytes_fall_back_to_extension(self):
+        assert sniff_mime_type(b"hello", "notes.txt") == "text/plain"
+        assert sniff_mime_type(b"hello", "notes") == ""
+
+
+class TestHashingUploadHandler:
+    def handler(self, user):
+        request = RequestFactory().post("/")
+        request.user = user
+        handler = HashingUploadHandler(request)
+        handler.new_file("upload", "a.pdf", "application/octet-stream", None)
+        return handler
+
+    def test_collects_digest_size_and_type_while_receiving(self, user):
+        handler = self.handler(user)
+        for start in range(0, len(PDF), 16):
+            handler.receive_data_chunk(PDF[start : start + 16], start)
+        upload = handler.file_complete(len(PDF))
+
+        assert isinstance(upload, HashedUploadedFile)
+        assert upload.hasher.hexdigest() == hashlib.sha256(PDF).hexdigest()
+        assert upload.size == len(PDF)
+        assert upload.sniffed_content_type == "application/pdf"
+        assert upload.read() == PDF
+
+    def test_stops_once_quota_is_crossed(self, user):
+        user.storage_quota = 50
+        user.save()
+        handler = self.handler(user)
+
+        handler.receive_data_chunk(PDF[:40], 0)
+        with pytest.raises(StorageQuotaExceeded):
+            handler.receive_data_chunk(PDF[40:80], 40)
+
+
+class TestUploadWithoutRereading:
+    def test_upload_fields_come_from_the_handler(self, user, monkeypatch):
+        def fail(*args, **kwargs):
+            raise AssertionError("the upload was read back")
+
+        monkeypatch.setattr(HashedUploadedFile, "read", fail)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile("scan.bin", PDF), "path": "docs"},
+            format="multipart",
+        )
+
+        file_version = FileVersion.objects.get(pk=response.data["id"])
+        assert file_version.content_hash == compute_content_hash(PDF, 1, user.pk)
+        assert file_version.content_digest == hashlib.sha256(PDF).hexdigest()
+        assert file_version.file_size == len(PDF)
+        assert file_version.mime_type == "application/pdf"
+        with file_version.file.open("rb") as handle:
+            assert handle.read() == PDF
+
+
+class TestSessionUpload:
+    @pytest.mark.parametrize("token_in", ["form", "header"])
+    def test_csrf_checked_session_upload_is_hashed(self, user, token_in):
+        user.set_password("Passw0rd!")
+        user.save()
+        client = APIClient(enforce_csrf_checks=True)
+        client.login(email=user.email, password="Passw0rd!")
+        token = _get_new_csrf_string()
+        client.cookies[settings.CSRF_COOKIE_NAME] = token
+        data = {"upload": SimpleUploadedFile("scan.bin", PDF), "path": "docs"}
+        headers = {}
+        if token_in == "form":
+            data["csrfmiddlewaretoken"] = token
+        else:
+            headers["HTTP_X_CSRFTOKEN"] = token
+
+        response = client.post("/api/file_versions/", data, format="multipart", **headers)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["content_digest"] == hashlib.sha256(PDF).hexdigest()
+        assert response.data["mime_type"] == "application/pdf"
+
+    def test_session_upload_without_csrf_token_is_refused(self, user):
+        user.set_password("Passw0rd!")
+        user.save()
+        client = APIClient(enforce_csrf_checks=True)
+        client.login(email=user.email, password="Passw0rd!")
+
+        response = client.post(
+            "/api/file_versions/",
+            {"upload": SimpleUploadedFile("scan.bin", PDF), "path": "docs"},
+            format="multipart",
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not FileVersion.objects.exists()